@@ -1,36 +1,23 @@
 from flask import Flask
-from flask_session import Session
-from routes import symptom, select, detail, name, start
-from config import FLASK_SECRET_KEY
-from config import REDIS_HOST
-from config import REDIS_PORT
-from config import REDIS_PASSWORD
-import redis,subprocess,json,os,sys,shutil,glob
+from routes import symptom, select, detail, name, start, admin
+from services import metrics, llm, corpus_reload, profiling, session_store, circuit_breaker, admission
+from services.redis_client import redis_client
+from config import FLASK_SECRET_KEY, FAST_START
+from services import rag_service
+from services.rag_service import active_corpus_dir
+from rag.corpus_store import CorpusReader, list_corpora
+import redis
 
 
 
 app = Flask(__name__)
 
-# Flask-Session 설정
-app.redis = redis.StrictRedis(
-    host=REDIS_HOST,
-    port=REDIS_PORT,
-    password=REDIS_PASSWORD,
-    decode_responses = False
-)
-
-app.config['SESSION_TYPE'] = 'redis'
-app.config['SESSION_PERMANENT'] = False
-app.config['SESSION_SERIALIZER'] = 'json'
-app.config['SESSION_ENCODING'] = 'utf-8'
-app.config['SESSION_REDIS'] = app.redis  # app.redis 사용
+# 세션 설정 (Redis + msgpack, 바뀐 경우에만 저장. 보관 시간은 SESSION_TTL)
+app.redis = redis_client
 app.config['JSON_AS_ASCII'] = False
 
-
-# Flask-Session 초기화 (app 객체 생성 직후)
-Session(app)
-
-# app.config['PERMANENT_SESSION_LIFETIME'] = 600  #10분동안 세션 유지 (먄약 위 옵션 True 사용 시시)
+# 세션 저장소 초기화 (app 객체 생성 직후)
+session_store.init_app(app)
 
 # 연결 테스트 (선택 사항)
 try:
@@ -46,57 +33,43 @@ app.register_blueprint(select.bp, url_prefix='/api/medicine')
 app.register_blueprint(detail.bp, url_prefix='/api/medicine')
 app.register_blueprint(name.bp, url_prefix='/api/medicine')
 app.register_blueprint(start.bp, url_prefix='/api/medicine') 
-
-# docs 폴더에 문서가 있다고 가정
-DOCS_DIR = "rag/docs"
-CORPUS_DIR = "rag/data/corpus"
-DATA_DIR1 = "rag/data/paragraphs"
-DATA_DIR2 = "rag/data/summaries"
-DATA_DIR3 = "rag/data/clusters"
-DATA_DIR4 = "rag/data/corpus"
+app.register_blueprint(admin.bp, url_prefix='/api/admin')
+
+# 계측 (METRICS_ENABLED / SERVER_TIMING_ENABLED 설정 시에만 동작)
+metrics.init_app(app)
+# 요청 단위 프로파일링 (PROFILING_ENABLED 설정 시에만 동작)
+profiling.init_app(app)
+# 요청별 LLM 호출 마감 시간
+llm.init_app(app)
+# 회로 차단기로 대체 응답을 쓴 요청에 "degraded": true 표시
+circuit_breaker.init_app(app)
+# 라우트별 수용 제어 (넘치면 503, 계측 훅 뒤에 등록해서 거절된 요청도 기록)
+admission.init_app(app)
+# RAG 코퍼스 무중단 교체 (RAG_WATCH_INTERVAL 설정 시 rag/docs 변경 감시)
+corpus_reload.init_app(app)
+# 검색 모델 로드 (FAST_START면 백그라운드에서 모델과 코퍼스를 미리 로드)
+rag_service.warm_up(background=FAST_START)
 
 def run_preprocessing_pipeline():
-    # 1. 문서 전처리
-    subprocess.run([sys.executable, "rag/preprocess.py"], check=True)
-    # 2. 키워드 요약
-    subprocess.run([sys.executable, "rag/keyword_summary.py"], check=True)
-    # 3. 클러스터링
-    subprocess.run([sys.executable, "rag/cluster.py"], check=True)
-    # 4. 코퍼스 빌드
-    subprocess.run([sys.executable, "rag/corpus.py"], check=True)
+    corpus_reload.run_pipeline()
 
 def load_corpus():
-    if not os.path.exists(CORPUS_DIR) or not os.listdir(CORPUS_DIR):
+    corpus_dir, _ = active_corpus_dir()
+    if not list_corpora(corpus_dir):
         print("코퍼스 디렉터리가 없거나 비어 있어요. 파이프라인을 먼저 실행합니다.")
         run_preprocessing_pipeline()
 
+    # 임베딩은 memory-map된 행을 그대로 사용 (float 파싱 없음)
     corpus = []
-    for filepath in glob.glob(os.path.join(CORPUS_DIR, '*.json')):
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            corpus.extend(data)
+    for path in list_corpora(corpus_dir):
+        for record, embedding in CorpusReader(path).iter_with_embeddings():
+            record["embedding"] = embedding
+            corpus.append(record)
     return corpus
 
 if __name__ == '__main__':
-    import os
-
-    # data 폴더 내 모든 내용 삭제
-    if os.path.exists(DATA_DIR1):
-        shutil.rmtree(DATA_DIR1)
-
-    if os.path.exists(DATA_DIR2):
-        shutil.rmtree(DATA_DIR2)
-
-    if os.path.exists(DATA_DIR3):
-        shutil.rmtree(DATA_DIR3)
-
-    if os.path.exists(DATA_DIR4):
-        shutil.rmtree(DATA_DIR4)
-
-    # 빈 data 폴더 새로 생성
-    os.makedirs(DATA_DIR1, exist_ok=True)
-    os.makedirs(DATA_DIR2, exist_ok=True)
-    os.makedirs(DATA_DIR3, exist_ok=True)
-    os.makedirs(DATA_DIR4, exist_ok=True)
+    # 문서가 마지막 코퍼스 버전 이후 바뀌었으면 새 버전을 만들어 교체 (바뀐 게 없으면 재빌드 생략)
+    # 실행 중에는 /api/admin/corpus/reload 또는 RAG_WATCH_INTERVAL 감시로 재시작 없이 교체
+    corpus_reload.build_if_stale()
     corpus = load_corpus()
     app.run('0.0.0.0', port=5000, debug=False)
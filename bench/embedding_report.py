@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.embedding_store import DTYPES, EmbeddingStore, normalize
+
+# 문단 임베딩 저장 dtype별 메모리 절감과 검색 품질 손실 보고서
+# - 기준: float32 전체 행렬의 정확한 top-k
+# - 측정: dtype x 재점수 후보 수마다 recall@k(기준 top-k 중 찾은 비율), 쿼리당 점수 계산 시간, 상주 메모리
+# 쿼리: --queries 파일(한 줄에 질문 하나, 검색 모델로 인코딩) 또는 문단 벡터에 잡음을 더한 합성 쿼리
+
+
+def synthetic_corpus(size, dim, clusters, seed):
+    # 실제 문단 임베딩처럼 주제별로 뭉쳐 있는 벡터 (균일 난수는 서로 거의 직교해서 recall 측정이 무의미)
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size)
+    return centers[labels] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+
+
+def load_corpus_matrix(corpus_dir):
+    from services import rag_service
+    from rag import embedding_store
+
+    corpus = rag_service.build_corpus_cache(corpus_dir)
+    matrix = embedding_store.load_full(os.path.join(corpus_dir, rag_service.PASSAGE_EMBEDDINGS_DIR))
+    if matrix is None:
+        raise SystemExit("float32 원본이 없는 저장소입니다. RAG_EMBEDDING_DTYPE=float32 또는 원본을 남기는 설정으로 다시 만들어주세요.")
+    return matrix, corpus["contexts"]
+
+
+def make_queries(args, matrix):
+    if args.queries:
+        from services import rag_service
+        with open(args.queries, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+        return normalize(rag_service.get_model().encode([f"query: {q}" for q in questions], convert_to_numpy=True))
+    rng = np.random.default_rng(args.seed + 1)
+    picked = matrix[rng.choice(len(matrix), min(args.num_queries, len(matrix)), replace=False)]
+    noise = rng.standard_normal(picked.shape).astype(np.float32)
+    return normalize(normalize(picked) + args.noise * normalize(noise))
+
+
+def exact_top_k(full, queries, k):
+    scores = queries @ full.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def measure(store, queries, truth, k, rescore):
+    hits = 0
+    started = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        ranked, _ = store.search(query, rescore=rescore)
+        hits += len(expected & set(ranked[:k].tolist()))
+    elapsed = time.perf_counter() - started
+    return hits / (len(queries) * k), elapsed / len(queries) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="문단 임베딩 저장 dtype별 메모리 절감과 recall 손실을 float32와 비교합니다.")
+    parser.add_argument("--corpus", help="코퍼스 폴더 (기본: 서비스 중인 코퍼스, --synthetic이면 사용 안 함)")
+    parser.add_argument("--synthetic", type=int, default=0, help="검색 모델 없이 합성 벡터 N개로 측정")
+    parser.add_argument("--dim", type=int, default=768, help="합성 벡터 차원")
+    parser.add_argument("--clusters", type=int, default=200, help="합성 벡터 주제 수")
+    parser.add_argument("--queries", help="질문 파일 (한 줄에 하나, 검색 모델로 인코딩)")
+    parser.add_argument("--num-queries", type=int, default=200, help="합성 쿼리 수 (--queries가 없을 때)")
+    parser.add_argument("--noise", type=float, default=0.5, help="합성 쿼리에 더할 잡음 크기")
+    parser.add_argument("--k", type=int, default=10, help="recall@k의 k")
+    parser.add_argument("--dtypes", default=",".join(DTYPES), help="비교할 dtype 목록")
+    parser.add_argument("--rescore", default="0,20,50", help="재점수 후보 수 목록")
+    parser.add_argument("--workers", type=int, default=4, help="워커 수 (프로세스별 float32 텐서 대비 전체 메모리 추정용)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        matrix = synthetic_corpus(args.synthetic, args.dim, args.clusters, args.seed)
+        source = f"합성 벡터 {args.synthetic}개"
+    else:
+        from services.rag_service import active_corpus_dir
+        corpus_dir = args.corpus or active_corpus_dir()[0]
+        matrix, _ = load_corpus_matrix(corpus_dir)
+        source = corpus_dir
+
+    full = normalize(matrix)
+    queries = make_queries(args, full)
+    k = min(args.k, len(full))
+    truth = exact_top_k(full, queries, k)
+    baseline_bytes = full.nbytes
+    print(f"{source}: 벡터 {len(full)}개 x {full.shape[1]}차원, 쿼리 {len(queries)}개, recall@{k}")
+    print(f"float32 기준 {baseline_bytes / 1024 ** 2:.1f}MB, 워커 {args.workers}개가 각자 올리면 {baseline_bytes * args.workers / 1024 ** 2:.1f}MB")
+    print(f"\n{'dtype':<8}{'재점수':>6}{'상주 MB':>10}{'절감':>8}{'recall':>9}{'ms/쿼리':>10}")
+
+    results = {"source": source, "count": len(full), "dim": int(full.shape[1]), "queries": len(queries), "k": k,
+               "float32_bytes": baseline_bytes, "workers": args.workers, "rows": []}
+    for dtype in args.dtypes.split(","):
+        store = EmbeddingStore.from_matrix(full, dtype, keep_full=True)
+        for rescore in [int(n) for n in args.rescore.split(",")]:
+            if dtype == "float32" and rescore:
+                continue
+            recall, query_ms = measure(store, queries, truth, k, rescore)
+            row = {
+                "dtype": dtype,
+                "rescore": rescore,
+                "resident_bytes": store.nbytes,
+                "saved": round(1 - store.nbytes / baseline_bytes, 4),
+                "recall": round(recall, 4),
+                "query_ms": round(query_ms, 3),
+            }
+            results["rows"].append(row)
+            print(f"{dtype:<8}{rescore:>6}{store.nbytes / 1024 ** 2:>10.1f}{row['saved']:>8.0%}{recall:>9.4f}{query_ms:>10.2f}")
+
+    print("\n저장소는 memory-map으로 열려 워커끼리 페이지 캐시를 공유합니다. 재점수용 float32 원본은 후보 행만 읽습니다.")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 완료: {args.output}")
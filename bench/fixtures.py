@@ -0,0 +1,181 @@
+import os
+import random
+
+# 합성 카탈로그 생성을 위한 어휘 (e약은요 API 형식을 흉내냄)
+BRANDS = [
+    "타이레놀정", "게보린정", "판콜에이내복액", "펜잘큐정", "베아제정", "훼스탈플러스정",
+    "겔포스엠현탁액", "부루펜정", "지르텍정", "카베진코와정", "둘코락스에스장용정", "스트렙실허니앤레몬트로키",
+    "물파스", "버물리겔", "후시딘연고", "마데카솔케어연고", "아로나민골드정", "게루삼엠정",
+]
+
+SYMPTOM_GROUPS = [
+    ("감기의 제증상", ["콧물", "코막힘", "재채기", "인후통", "기침", "가래", "오한", "발열", "두통"]),
+    ("통증", ["두통", "치통", "생리통", "근육통", "관절통", "요통", "신경통"]),
+    ("소화기 증상", ["소화불량", "식욕감퇴", "복부팽만감", "속쓰림", "위산과다", "구역"]),
+    ("변비", ["변비", "배변곤란", "복부팽만감"]),
+    ("알레르기 증상", ["알레르기성 비염", "두드러기", "가려움증", "재채기", "콧물"]),
+    ("피부 증상", ["벌레물린데", "가려움", "습진", "피부염", "상처", "화상"]),
+    ("피로", ["피로감", "무기력감", "육체피로", "눈의 피로"]),
+    ("인후 증상", ["인후통", "구내염", "입냄새", "구취"]),
+]
+
+USE_METHODS = [
+    "성인은 1회 1~2정, 1일 3~4회 필요시 복용합니다. 복용 간격은 4~6시간 이상으로 합니다.",
+    "성인 및 15세 이상은 1회 1병(20 mL), 1일 3회 식후 30분에 복용합니다.",
+    "성인은 1회 1포, 1일 3회 식간 및 취침 시에 복용합니다.",
+    "1일 수회 적당량을 환부에 바릅니다.",
+    "성인은 1회 2정, 1일 1회 취침 전에 복용합니다.",
+]
+
+WARNINGS = [
+    "매일 세 잔 이상 정기적으로 술을 마시는 사람이 이 약이나 다른 해열 진통제를 복용해야 할 경우 반드시 의사 또는 약사와 상의해야 합니다.",
+    "이 약에 과민증 환자, 소화성궤양 환자, 심한 혈액 이상 환자는 이 약을 복용하지 마십시오.",
+    "이 약을 복용하기 전에 간장애 환자, 신장애 환자, 임부 또는 임신하고 있을 가능성이 있는 여성은 의사 또는 약사와 상의하십시오.",
+    "정해진 용법과 용량을 잘 지키십시오.",
+    "3~4일간 복용하여도 증상의 개선이 없을 경우 복용을 중지하고 의사 또는 약사와 상의하십시오.",
+    "졸음이 올 수 있으므로 운전이나 기계조작은 피하십시오.",
+]
+
+
+def _paragraph(text):
+    return f"<p>{text}</p>"
+
+
+def make_medicine(idx, rng):
+    brand = rng.choice(BRANDS)
+    dose = rng.choice([100, 200, 250, 300, 500, 650])
+    group, symptoms = rng.choice(SYMPTOM_GROUPS)
+    picked = rng.sample(symptoms, k=min(len(symptoms), rng.randint(2, 5)))
+
+    efcy = f"이 약은 {group}({', '.join(picked)})의 완화에 사용합니다."
+    # 실제 API 데이터처럼 엔티티와 인라인 태그를 섞어 둠
+    efcy_html = _paragraph(efcy.replace("(", "&#40;").replace(")", "&#41;"))
+    if rng.random() < 0.3:
+        efcy_html += _paragraph(f"<sup>※</sup>&nbsp;{rng.choice(picked)}에 특히 효과가 있습니다.")
+
+    warnings = rng.sample(WARNINGS, k=rng.randint(2, 4))
+    return {
+        "itemSeq": str(200000000 + idx),
+        "itemName": f"{brand} {dose}밀리그램 {idx}호",
+        "engName": f"Synthetic Tab. {dose}mg No.{idx}",
+        "entpName": rng.choice(["(주)한국얀센", "삼진제약(주)", "동화약품(주)", "대웅제약(주)"]),
+        "efcyQesitm": efcy_html,
+        "useMethodQesitm": _paragraph(rng.choice(USE_METHODS)),
+        "atpnQesitm": "".join(_paragraph(w) for w in warnings),
+        "weight": round(rng.uniform(1.0, 3.0), 2),
+    }
+
+
+def make_catalogue(n, seed=42):
+    """
+    N개의 합성 의약품 문서를 생성합니다. seed가 같으면 항상 같은 카탈로그가 나옵니다.
+    """
+    rng = random.Random(seed)
+    return [make_medicine(i, rng) for i in range(n)]
+
+
+def seed_collection(collection, n, seed=42):
+    collection.delete_many({})
+    docs = make_catalogue(n, seed=seed)
+    if docs:
+        collection.insert_many(docs)
+    return len(docs)
+
+
+# 벤치마크/부하 테스트에서 사용하는 언어별 입력 문장
+SYMPTOM_INPUTS = {
+    "ko": ["머리가 아프고 열이 나요", "콧물이 나고 재채기가 자주 나와", "속이 더부룩하고 소화가 잘 안돼", "모기에 물려서 간지러워요"],
+    "en": ["I have a headache and fever", "runny nose and sneezing", "my stomach feels bloated", "bug bite is itchy"],
+    "ja": ["頭が痛くて熱があります", "鼻水とくしゃみが出ます", "胃がもたれて消化が悪いです"],
+    "zh": ["头痛发烧", "流鼻涕打喷嚏", "胃胀消化不良"],
+}
+
+START_KEYWORDS = {
+    "ko": {"symptom": "증상", "name": "약"},
+    "en": {"symptom": "symptom", "name": "medicine"},
+    "ja": {"symptom": "症状", "name": "薬"},
+    "zh": {"symptom": "症状", "name": "药"},
+}
+
+FALLBACK_INPUTS = [
+    "타이레놀 하루에 몇 번 먹어요?",
+    "타이레놀 먹고 커피 마셔도 되나요?",
+    "게보린정 공복에 먹어도 돼요?",
+]
+
+
+def name_input(rng):
+    return f"{rng.choice(BRANDS)} 먹어도 되나요?"
+
+
+# RAG 파이프라인 벤치마크용 합성 복약 안내 문서 (rag/docs의 블로그형 .docx 흉내)
+GUIDANCE_QUESTIONS = [
+    "{brand} {symptom}에 먹어도 되나요?",
+    "{brand}은 하루에 몇 번 먹어야 하나요?",
+    "{brand}과 술을 같이 먹어도 되나요?",
+    "{symptom}이 있을 때 {brand} 말고 다른 약도 있나요?",
+    "{brand}은 공복에 먹어도 괜찮나요?",
+]
+GUIDANCE_ANSWERS = [
+    "{brand}은 {group}에 쓰는 약으로 {symptom} 완화에 도움이 됩니다. {use}",
+    "{use} {warning}",
+    "{symptom} 증상이 심하지 않다면 {brand}으로 충분하지만 {warning}",
+    "{brand}은 {group}({symptoms})에 사용합니다. {warning}",
+]
+GUIDANCE_NOTES = [
+    "{group} 증상이 계속되면 약국이나 병원에서 상담을 받는 것이 좋습니다.",
+    "{brand}을 다른 {group} 약과 함께 먹으면 같은 성분을 두 번 먹게 될 수 있습니다.",
+    "어린이나 노약자는 {brand} 복용 전에 약사와 상의하세요. {warning}",
+]
+# 전처리에서 걸러지는 인사/광고 문단
+GUIDANCE_NOISE = [
+    "안녕하세요 오늘은 {group} 약에 대해 알아보겠습니다.",
+    "읽어주셔서 감사합니다 다음 시간에 또 만나요.",
+    "공감과 댓글 부탁드립니다.",
+]
+
+
+def make_guidance_paragraphs(n, rng):
+    """
+    질문 + 답변, 일반 안내, 인사/광고 문단이 섞인 N개의 문단
+    """
+    paragraphs = []
+    while len(paragraphs) < n:
+        brand = rng.choice(BRANDS)
+        group, symptoms = rng.choice(SYMPTOM_GROUPS)
+        fields = {
+            "brand": brand,
+            "group": group,
+            "symptom": rng.choice(symptoms),
+            "symptoms": ", ".join(rng.sample(symptoms, k=min(len(symptoms), 3))),
+            "use": rng.choice(USE_METHODS),
+            "warning": rng.choice(WARNINGS),
+        }
+        roll = rng.random()
+        if roll < 0.05:
+            paragraphs.append(rng.choice(GUIDANCE_NOISE).format(**fields))
+        elif roll < 0.55:
+            paragraphs.append(f"{len(paragraphs) + 1}. {rng.choice(GUIDANCE_QUESTIONS).format(**fields)}")
+            paragraphs.append(rng.choice(GUIDANCE_ANSWERS).format(**fields))
+        else:
+            paragraphs.append(rng.choice(GUIDANCE_NOTES).format(**fields))
+    return paragraphs[:n]
+
+
+def write_guidance_docs(folder, paragraphs, per_doc=50, seed=42):
+    """
+    문서당 per_doc개 문단씩 합성 .docx를 만들고 문서 수를 돌려줍니다.
+    """
+    from docx import Document
+
+    rng = random.Random(seed)
+    texts = make_guidance_paragraphs(paragraphs, rng)
+    os.makedirs(folder, exist_ok=True)
+    count = 0
+    for start in range(0, len(texts), per_doc):
+        document = Document()
+        for text in texts[start:start + per_doc]:
+            document.add_paragraph(text)
+        count += 1
+        document.save(os.path.join(folder, f"synthetic{count:05d}.docx"))
+    return count
@@ -0,0 +1,53 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.stub_openai import StubOpenAIServer
+
+
+def start_stub(latency=None, model_latency=None, seed=0, **options):
+    return StubOpenAIServer(latency=latency, model_latency=model_latency, seed=seed, **options).start()
+
+
+def load_offline_app(openai_base_url, mongo_uri=None, redis_host=None, redis_port=None, before_import=None):
+    """
+    외부 서비스 없이 Flask 앱을 불러옵니다.
+    - mongo_uri가 없으면 mongomock, redis_host가 없으면 fakeredis를 사용합니다.
+    - 라우트들이 import 시점에 클라이언트를 만들기 때문에 반드시 app import 전에 호출해야 합니다.
+    - before_import가 있으면 환경 준비가 끝난 뒤 app import 직전에 호출합니다.
+    """
+    os.chdir(REPO_ROOT)
+    os.environ["OPENAI_BASE_URL"] = openai_base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("FLASK_SECRET_KEY", "bench-secret")
+
+    if mongo_uri:
+        os.environ["MONGODB_URI"] = mongo_uri
+    else:
+        import mongomock
+        import pymongo
+        # 모든 라우트가 같은 인메모리 DB를 보도록 하나의 클라이언트를 공유
+        shared_mongo = mongomock.MongoClient()
+        pymongo.MongoClient = lambda *args, **kwargs: shared_mongo
+
+    if redis_host:
+        os.environ["REDIS_HOST"] = redis_host
+        os.environ["REDIS_PORT"] = str(redis_port or 6379)
+    else:
+        import fakeredis
+        import redis
+        shared_redis = fakeredis.FakeStrictRedis()
+        redis.StrictRedis = lambda *args, **kwargs: shared_redis
+
+    if before_import is not None:
+        before_import()
+    from app import app
+    app.config["TESTING"] = True
+    return app
+
+
+def get_collection():
+    from routes import symptom
+    return symptom.collection
@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from bench.fixtures import make_catalogue
+from services.html_text import html_to_text
+
+FIELDS = ["efcyQesitm", "useMethodQesitm", "atpnQesitm"]
+
+
+def bs4_text(markup, strip):
+    return BeautifulSoup(markup or "", "html.parser").get_text(strip=strip)
+
+
+def load_fields(args):
+    if args.mongo_uri:
+        from pymongo import MongoClient
+        collection = MongoClient(args.mongo_uri)['K_Medi_Guide']['Api']
+        projection = {field: 1 for field in FIELDS}
+        docs = collection.find({}, projection).limit(args.size) if args.size else collection.find({}, projection)
+    else:
+        docs = make_catalogue(args.size or 10000, seed=args.seed)
+    return [doc.get(field) or "" for doc in docs for field in FIELDS]
+
+
+def measure(func, texts, strip, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text, strip)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BeautifulSoup get_text와 services.html_text 비교 (결과 일치 + 속도)")
+    parser.add_argument("--mongo-uri", help="주면 실제 카탈로그(K_Medi_Guide.Api)를 사용, 없으면 합성 카탈로그")
+    parser.add_argument("--size", type=int, default=0, help="문서 수 (0이면 Mongo 전체 / 합성 10000개)")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 측정 횟수 (최솟값 사용)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    texts = load_fields(args)
+    print(f"필드 {len(texts)}개 ({len(texts) // len(FIELDS)}개 문서 x {len(FIELDS)})")
+
+    results = {"fields": len(texts), "modes": {}}
+    for strip in (True, False):
+        mismatches = [t for t in texts if bs4_text(t, strip) != html_to_text(t, strip)]
+        bs4_s = measure(bs4_text, texts, strip, args.repeat)
+        fast_s = measure(html_to_text, texts, strip, args.repeat)
+        mode = "get_text(strip=True)" if strip else "get_text()"
+        results["modes"][mode] = {
+            "mismatches": len(mismatches),
+            "bs4_us_per_field": round(bs4_s / len(texts) * 1e6, 2),
+            "html_text_us_per_field": round(fast_s / len(texts) * 1e6, 2),
+            "speedup": round(bs4_s / fast_s, 1) if fast_s else None,
+        }
+        r = results["modes"][mode]
+        print(f"\n[{mode}] 불일치 {r['mismatches']}개")
+        print(f"  BeautifulSoup : {r['bs4_us_per_field']:>8} µs/필드 (전체 {bs4_s:.3f}s)")
+        print(f"  html_text     : {r['html_text_us_per_field']:>8} µs/필드 (전체 {fast_s:.3f}s) → {r['speedup']}배")
+        for text in mismatches[:5]:
+            print(f"  불일치 예: {text[:120]!r}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 완료: {args.output}")
@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# 시작 시간 예산 점검
+# 1) import 단계: 자식 프로세스를 -X importtime으로 띄워 app import 시간과 무거운 모듈 로드 여부를 측정
+#    (백그라운드 워밍업이 섞이지 않도록 이 단계에서는 warm_up을 끔)
+# 2) 첫 요청까지 시간: 프로세스 시작부터 /makeSession 첫 응답까지, 그리고 검색 모델/코퍼스 준비 완료까지
+# 예산을 넘기면 종료 코드 1 (CI에서 시작 시간 회귀 감지용)
+
+# 요청 경로에서 import 시점에 로드되면 안 되는 모듈 (FAST_START 기준)
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "keybert", "sklearn", "matplotlib", "bs4"]
+DUMMY_OPENAI_URL = "http://127.0.0.1:9/v1"
+
+
+def child_import(args):
+    import mongomock, fakeredis, pymongo, redis  # noqa: F401  (하네스의 스텁 import는 측정에서 제외)
+    from bench.harness import load_offline_app
+
+    def disable_warm_up():
+        from services import rag_service
+        rag_service.warm_up = lambda background=False: None
+
+    started = time.perf_counter()
+    if args.live:
+        disable_warm_up()
+        import app  # noqa: F401
+    else:
+        load_offline_app(DUMMY_OPENAI_URL, before_import=disable_warm_up)
+    import_ms = (time.perf_counter() - started) * 1000
+    print(json.dumps({
+        "import_ms": round(import_ms, 1),
+        "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+    }))
+
+
+def child_first_request(args):
+    from bench.harness import load_offline_app
+    if args.live:
+        from app import app
+    else:
+        app = load_offline_app(DUMMY_OPENAI_URL)
+    response = app.test_client().post("/api/medicine/makeSession")
+    first_request_at = time.time()
+
+    from services import rag_service
+    ready_at = None
+    deadline = time.time() + args.ready_timeout
+    while args.ready_timeout and time.time() < deadline:
+        if rag_service.is_ready():
+            ready_at = time.time()
+            break
+        time.sleep(0.05)
+    print(json.dumps({"status": response.status_code, "first_request_at": first_request_at, "ready_at": ready_at}))
+
+
+def parse_importtime(stderr, top):
+    """
+    -X importtime 출력에서 app(과 rag_service) 바로 아래 모듈을 누적 시간순으로 정리
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # 패키지 이름 앞 공백: 기본 1칸 + 중첩 단계마다 2칸
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+
+    children = []
+    pending = []
+    for depth, name, _, cumulative in entries:
+        if depth == 0:
+            if name in ("app", "services.rag_service"):
+                children.extend(pending)
+            pending = []
+        elif depth == 1:
+            pending.append((name, cumulative))
+    children.sort(key=lambda x: x[1], reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in children[:top]]
+
+
+def run_child(mode, args, importtime=False):
+    env = dict(os.environ, FAST_START="true" if args.fast_start else "false", PYTHONUNBUFFERED="1")
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "--child", mode, "--ready-timeout", str(args.ready_timeout)]
+    if args.live:
+        command.append("--live")
+    started = time.time()
+    result = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-3000:], file=sys.stderr)
+        raise SystemExit(f"자식 프로세스 실패 ({mode})")
+    return started, json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="앱 import 시간과 첫 요청까지 시간을 측정하고 예산을 넘으면 실패합니다.")
+    parser.add_argument("--budget-ms", type=float, default=3000, help="app import 시간 예산(ms)")
+    parser.add_argument("--first-request-budget-ms", type=float, default=0, help="프로세스 시작~첫 응답 예산(ms), 0이면 검사 안 함")
+    parser.add_argument("--no-fast-start", dest="fast_start", action="store_false", help="FAST_START=false로 측정")
+    parser.add_argument("--ready-timeout", type=float, default=0, help="검색 모델/코퍼스 준비 완료까지 기다릴 최대 시간(초), 0이면 측정 안 함")
+    parser.add_argument("--live", action="store_true", help="스텁 대신 실제 환경 변수(.env)의 Mongo/Redis로 app import")
+    parser.add_argument("--top", type=int, default=15, help="출력할 무거운 import 개수")
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    parser.add_argument("--child", choices=["import", "first_request"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "import":
+        child_import(args)
+        sys.exit(0)
+    if args.child == "first_request":
+        child_first_request(args)
+        sys.exit(0)
+
+    _, imported, stderr = run_child("import", args, importtime=True)
+    slowest = parse_importtime(stderr, args.top)
+    started, first, _ = run_child("first_request", args)
+    first_request_ms = (first["first_request_at"] - started) * 1000
+    ready_ms = (first["ready_at"] - started) * 1000 if first["ready_at"] else None
+
+    print(f"FAST_START={'true' if args.fast_start else 'false'}")
+    print(f"app import            : {imported['import_ms']:>9.1f} ms (예산 {args.budget_ms:.0f} ms)")
+    print(f"첫 응답(/makeSession) : {first_request_ms:>9.1f} ms (status {first['status']}, 인터프리터 시작 포함)")
+    if args.ready_timeout:
+        print(f"검색 모델/코퍼스 준비  : {f'{ready_ms:9.1f} ms' if ready_ms else '시간 초과'}")
+    print(f"import 시점에 로드된 무거운 모듈: {', '.join(imported['heavy_modules']) or '없음'}")
+    print("\n가장 오래 걸린 import (누적):")
+    for entry in slowest:
+        print(f"  {entry['module']:<40}{entry['cumulative_ms']:>10.1f} ms")
+
+    failures = []
+    if imported["import_ms"] > args.budget_ms:
+        failures.append(f"app import {imported['import_ms']:.0f} ms > 예산 {args.budget_ms:.0f} ms")
+    if args.first_request_budget_ms and first_request_ms > args.first_request_budget_ms:
+        failures.append(f"첫 응답 {first_request_ms:.0f} ms > 예산 {args.first_request_budget_ms:.0f} ms")
+    if args.fast_start and imported["heavy_modules"]:
+        failures.append(f"FAST_START인데 import 시점에 로드됨: {', '.join(imported['heavy_modules'])}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "fast_start": args.fast_start,
+                "import_ms": imported["import_ms"],
+                "first_request_ms": round(first_request_ms, 1),
+                "ready_ms": round(ready_ms, 1) if ready_ms else None,
+                "heavy_modules": imported["heavy_modules"],
+                "slowest_imports": slowest,
+                "failures": failures,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 완료: {args.output}")
+
+    if failures:
+        print("\n시작 시간 예산 초과:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+from bench.fixtures import FALLBACK_INPUTS, START_KEYWORDS, SYMPTOM_INPUTS, name_input
+
+STEPS = ["makeSession", "start", "start_fallback", "symptom", "name", "select", "detail"]
+
+
+class StepStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)     # 5xx / 네트워크 오류
+        self.failures = defaultdict(int)   # 4xx (약을 못 찾음 등 정상적인 실패 응답)
+        self.sessions = 0
+        self.completed_sessions = 0
+
+    def record(self, step, elapsed, status):
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            if status is None or status >= 500:
+                self.errors[step] += 1
+            elif status >= 400:
+                self.failures[step] += 1
+
+    def report(self, elapsed):
+        steps = {}
+        total = 0
+        total_errors = 0
+        for step in STEPS:
+            values = self.latencies.get(step)
+            if not values:
+                continue
+            ms = np.array(values) * 1000
+            total += len(values)
+            total_errors += self.errors[step]
+            steps[step] = {
+                "count": len(values),
+                "error_rate": round(self.errors[step] / len(values), 4),
+                "fail_rate": round(self.failures[step] / len(values), 4),
+                "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                "p95_ms": round(float(np.percentile(ms, 95)), 1),
+                "p99_ms": round(float(np.percentile(ms, 99)), 1),
+            }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "sessions_per_s": round(self.completed_sessions / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "sessions": self.sessions,
+            "completed_sessions": self.completed_sessions,
+            "steps": steps,
+        }
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(","):
+        lang, _, weight = item.partition("=")
+        mix[lang] = float(weight or 1)
+    return mix
+
+
+class VirtualUser:
+    """
+    쿠키(세션)를 유지하면서 /makeSession → /start → /symptom 또는 /name → /select → /detail 흐름을 걷는 가상 사용자
+    """
+    def __init__(self, base_url, args, stats, seed):
+        self.base_url = base_url.rstrip("/")
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(seed)
+        self.langs = list(args.lang_mix)
+        self.lang_weights = [args.lang_mix[l] for l in self.langs]
+
+    def call(self, client, step, path, payload=None):
+        started = time.perf_counter()
+        try:
+            resp = client.post(f"{self.base_url}{path}", json=payload or {})
+            status = resp.status_code
+            body = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+        except (httpx.HTTPError, ValueError):
+            status, body = None, {}
+        self.stats.record(step, time.perf_counter() - started, status)
+        if self.args.think_time:
+            time.sleep(self.rng.uniform(0, self.args.think_time))
+        return status, body
+
+    def run_session(self):
+        with self.stats.lock:
+            self.stats.sessions += 1
+        lang = self.rng.choices(self.langs, weights=self.lang_weights)[0]
+        keywords = START_KEYWORDS.get(lang, START_KEYWORDS["ko"])
+
+        # 세션마다 새 쿠키 저장소를 사용
+        with httpx.Client(timeout=self.args.timeout) as client:
+            status, _ = self.call(client, "makeSession", "/makeSession")
+            if status != 200:
+                return
+
+            if self.rng.random() < self.args.fallback_prob:
+                self.call(client, "start_fallback", "/start", {"input": self.rng.choice(FALLBACK_INPUTS), "lang": lang})
+
+            branch = "symptom" if self.rng.random() < self.args.symptom_prob else "name"
+            status, _ = self.call(client, "start", "/start", {"input": keywords[branch], "lang": lang})
+            if status != 200:
+                return
+
+            # 약을 못 찾으면 최대 3회까지 다시 입력
+            candidates = []
+            for _ in range(3):
+                if branch == "symptom":
+                    text = self.rng.choice(SYMPTOM_INPUTS.get(lang, SYMPTOM_INPUTS["ko"]))
+                else:
+                    text = name_input(self.rng)
+                status, body = self.call(client, branch, f"/{branch}", {"input": text})
+                candidates = body.get("medicine_candidates") or []
+                if candidates or body.get("next") == "/start" or status is None or status >= 500:
+                    break
+            if not candidates:
+                return
+
+            status, _ = self.call(client, "select", "/select", {"input": self.rng.choice(candidates)["name_ko"]})
+            if status != 200:
+                return
+            reply = "YES" if self.rng.random() < self.args.detail_prob else "NO"
+            self.call(client, "detail", "/detail", {"input": reply})
+
+        with self.stats.lock:
+            self.stats.completed_sessions += 1
+
+    def run_until(self, deadline):
+        while time.monotonic() < deadline:
+            self.run_session()
+
+
+def run_stage(base_url, users, args):
+    stats = StepStats()
+    deadline = time.monotonic() + args.duration
+    threads = []
+    started = time.perf_counter()
+    for i in range(users):
+        user = VirtualUser(base_url, args, stats, seed=args.seed + i)
+        t = threading.Thread(target=user.run_until, args=(deadline,), daemon=True)
+        threads.append(t)
+        t.start()
+        if args.ramp_up:
+            time.sleep(args.ramp_up / users)
+    for t in threads:
+        t.join()
+    return stats.report(time.perf_counter() - started)
+
+
+def print_stage(users, report):
+    print(f"\n[동시 사용자 {users}명] {report['throughput_rps']} req/s, 세션 {report['sessions_per_s']}/s, 오류율 {report['error_rate']:.2%}")
+    print(f"  {'step':<16}{'n':>7}{'err':>8}{'fail':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for step, r in report["steps"].items():
+        print(f"  {step:<16}{r['count']:>7}{r['error_rate']:>8.2%}{r['fail_rate']:>8.2%}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+
+def start_offline_server(args):
+    """
+    스텁 OpenAI + mongomock + fakeredis로 앱을 띄우고 로컬 주소를 돌려줍니다.
+    """
+    from werkzeug.serving import make_server
+    from bench.fixtures import seed_collection
+    from bench.harness import get_collection, load_offline_app, start_stub
+
+    stub = start_stub(args.latency, seed=args.seed)
+    app = load_offline_app(stub.url)
+    seed_collection(get_collection(), args.catalogue_size, seed=args.seed)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/api/medicine"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="대화 흐름 기반 부하 생성기")
+    parser.add_argument("--base-url", default="http://localhost:5000/api/medicine")
+    parser.add_argument("--users", default="10", help="동시 사용자 수. 콤마로 여러 단계를 주면 순서대로 실행 (예: 10,20,40,80)")
+    parser.add_argument("--duration", type=float, default=60.0, help="단계별 실행 시간(초)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="사용자 투입에 걸리는 시간(초)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="요청 사이 최대 대기 시간(초)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="요청 타임아웃(초)")
+    parser.add_argument("--lang-mix", type=parse_mix, default=parse_mix("ko=0.6,en=0.2,ja=0.1,zh=0.1"))
+    parser.add_argument("--symptom-prob", type=float, default=0.7, help="/symptom 분기 확률 (나머지는 /name)")
+    parser.add_argument("--detail-prob", type=float, default=0.8, help="/detail 에서 YES로 답할 확률")
+    parser.add_argument("--fallback-prob", type=float, default=0.2, help="처음에 자유 질문(/start fallback)을 할 확률")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--offline", action="store_true", help="스텁 OpenAI/mongomock/fakeredis로 앱을 직접 띄워서 측정")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="--offline 사용 시 스텁 OpenAI 지연 분포")
+    parser.add_argument("--catalogue-size", type=int, default=1000, help="--offline 사용 시 합성 카탈로그 크기")
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    base_url = start_offline_server(args) if args.offline else args.base_url
+
+    results = {}
+    for users in [int(u) for u in args.users.split(",")]:
+        report = run_stage(base_url, users, args)
+        print_stage(users, report)
+        results[str(users)] = report
+
+    # 처리량이 더 이상 늘지 않는 지점을 포화점으로 표시
+    stages = list(results.items())
+    for (prev_users, prev), (users, cur) in zip(stages, stages[1:]):
+        if cur["throughput_rps"] < prev["throughput_rps"] * 1.05:
+            print(f"\n포화 추정: 동시 사용자 {prev_users}명 → {users}명에서 처리량 증가가 멈췄습니다.")
+            break
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"base_url": base_url, "stages": results}, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장 완료: {args.output}")
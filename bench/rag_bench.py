@@ -0,0 +1,235 @@
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from bench.fixtures import write_guidance_docs
+
+# RAG 파이프라인(rag/preprocess.py → keyword_summary.py → cluster.py → corpus.py) 단계별 성능 기준선
+# - 크기(원본 문단 수)마다 합성 복약 안내 .docx를 만들고, 임시 작업 폴더를 cwd로 각 단계를 자식 프로세스로 실행
+#   (스크립트들이 rag/data/... 상대 경로를 쓰므로 저장소 데이터는 건드리지 않음)
+# - 단계별 벽시계 시간, CPU 시간, 최대 RSS(os.wait4: 병렬 워커 프로세스 포함), 처리한 문단 수와 초당 문단 수
+# - encode: 전처리 결과 문단을 검색/병합 모델로 인코딩만 했을 때의 처리량 (모델 로드 시간 제외)
+# - 크기를 키울 때 시간 증가율이 문단 수 증가율보다 가파르면(로그-로그 기울기 > --superlinear) 표시
+#   (예: cluster.py의 k별 학습 + 실루엣 점수 탐색)
+# - 결과 JSON에 커밋 해시를 남기고 --baseline으로 이전 결과와 단계별 비교
+
+STAGES = ["preprocess", "keyword_summary", "cluster", "corpus"]
+ENCODE_MODEL = "paraphrase-MiniLM-L6-v2"  # rag/preprocess.py, rag/cluster.py와 같은 모델
+NOISE_FLOOR_SECONDS = 0.5  # 이보다 짧은 단계는 기울기 판단에서 제외 (프로세스 시작 시간이 대부분)
+
+
+def stage_command(stage, args):
+    script = os.path.join(REPO_ROOT, "rag", f"{stage}.py")
+    if stage == "preprocess":
+        return [sys.executable, script, "--jobs", str(args.jobs)]
+    if stage == "cluster":
+        return [sys.executable, script, "--jobs", str(args.jobs or -1), "--mode", args.cluster_mode, "--force"]
+    if stage == "corpus":
+        return [sys.executable, script, "--clusters", "rag/data/clusters", "--output", "rag/data/corpus"]
+    return [sys.executable, script]
+
+
+def run_stage(name, command, workdir, log_path):
+    """
+    command를 workdir에서 실행하고 (결과 dict, 로그 마지막 부분)을 돌려줍니다.
+    """
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, cwd=workdir, stdout=log, stderr=subprocess.STDOUT,
+                                   env=dict(os.environ, PYTHONUNBUFFERED="1"))
+        # wait4의 rusage는 이 자식과 자식이 기다린 하위 프로세스(병렬 워커)까지의 최대 RSS
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - started
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        tail = f.read()[-2000:]
+    return {
+        "stage": name,
+        "returncode": process.returncode,
+        "wall_s": round(wall, 3),
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+    }, tail
+
+
+def count_records(folder):
+    total = 0
+    for path in glob.glob(os.path.join(folder, "*.json")):
+        with open(path, encoding="utf-8") as f:
+            total += len(json.load(f))
+    return total
+
+
+def child_encode(args):
+    # 전처리 결과 문단을 인코딩만 해서 처리량 측정 (모델 로드는 따로 기록)
+    from sentence_transformers import SentenceTransformer
+
+    texts = []
+    for path in sorted(glob.glob(os.path.join("rag/data/paragraphs", "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            texts.extend(p["text"] for p in json.load(f))
+    started = time.perf_counter()
+    model = SentenceTransformer(ENCODE_MODEL)
+    load_s = time.perf_counter() - started
+    started = time.perf_counter()
+    model.encode(texts, batch_size=args.batch_size, convert_to_numpy=True)
+    encode_s = time.perf_counter() - started
+    print(json.dumps({"texts": len(texts), "model_load_s": round(load_s, 3), "encode_s": round(encode_s, 3)}))
+
+
+def bench_size(size, args):
+    workdir = tempfile.mkdtemp(prefix=f"kmedi-rag-bench-{size}-", dir=args.workdir)
+    started = time.perf_counter()
+    documents = write_guidance_docs(os.path.join(workdir, "rag", "docs"), size, args.per_doc, args.seed)
+    result = {
+        "paragraphs": size,
+        "documents": documents,
+        "generate_s": round(time.perf_counter() - started, 3),
+        "workdir": workdir if args.keep else None,
+        "stages": {},
+    }
+    print(f"\n[{size} 문단] 문서 {documents}개 생성 ({result['generate_s']:.1f}s), 작업 폴더 {workdir}")
+
+    counts = {"preprocess": size}
+    for stage in STAGES:
+        stage_result, tail = run_stage(stage, stage_command(stage, args), workdir, os.path.join(workdir, f"{stage}.log"))
+        if stage == "preprocess":
+            counts["keyword_summary"] = count_records(os.path.join(workdir, "rag", "data", "paragraphs"))
+        elif stage == "keyword_summary":
+            counts["cluster"] = counts["corpus"] = count_records(os.path.join(workdir, "rag", "data", "summaries"))
+        stage_result["items"] = counts.get(stage)
+        if stage_result["items"] and stage_result["wall_s"] > 0:
+            stage_result["items_per_s"] = round(stage_result["items"] / stage_result["wall_s"], 1)
+        result["stages"][stage] = stage_result
+        print(f"  {stage:<16}{stage_result['wall_s']:>9.2f}s  CPU {stage_result['cpu_s']:>8.2f}s  "
+              f"RSS {stage_result['peak_rss_bytes'] / 1024 ** 2:>8.1f}MB  문단 {stage_result['items'] or 0:>7}")
+        if stage_result["returncode"] != 0:
+            print(f"  {stage} 실패 (종료 코드 {stage_result['returncode']}):\n{tail}", file=sys.stderr)
+            result["failed"] = stage
+            break
+
+    if not args.no_encode and "failed" not in result:
+        command = [sys.executable, os.path.abspath(__file__), "--child", "encode", "--batch-size", str(args.batch_size)]
+        stage_result, tail = run_stage("encode", command, workdir, os.path.join(workdir, "encode.log"))
+        try:
+            measured = json.loads(tail.strip().splitlines()[-1])
+            stage_result.update(measured, items=measured["texts"],
+                                items_per_s=round(measured["texts"] / measured["encode_s"], 1) if measured["encode_s"] else None)
+            print(f"  {'encode':<16}{measured['encode_s']:>9.2f}s  모델 로드 {measured['model_load_s']:.2f}s  "
+                  f"RSS {stage_result['peak_rss_bytes'] / 1024 ** 2:>8.1f}MB  {stage_result['items_per_s']} 문단/s")
+        except (ValueError, IndexError, KeyError):
+            print(f"  encode 실패:\n{tail}", file=sys.stderr)
+        result["stages"]["encode"] = stage_result
+
+    result["total_wall_s"] = round(sum(s["wall_s"] for name, s in result["stages"].items() if name in STAGES), 3)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def scaling_report(runs, threshold):
+    """
+    연속한 두 크기 사이에서 단계별 시간 증가의 로그-로그 기울기 (1이면 선형, 2면 제곱)
+    """
+    report = []
+    runs = sorted(runs, key=lambda r: r["paragraphs"])
+    for small, large in zip(runs, runs[1:]):
+        for stage in STAGES + ["encode"]:
+            a = small["stages"].get(stage, {}).get("wall_s" if stage != "encode" else "encode_s")
+            b = large["stages"].get(stage, {}).get("wall_s" if stage != "encode" else "encode_s")
+            if not a or not b:
+                continue
+            exponent = math.log(b / a) / math.log(large["paragraphs"] / small["paragraphs"])
+            report.append({
+                "stage": stage,
+                "from": small["paragraphs"],
+                "to": large["paragraphs"],
+                "exponent": round(exponent, 2),
+                "superlinear": exponent > threshold and b >= NOISE_FLOOR_SECONDS,
+            })
+    return report
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "rag"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "") if commit else None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {run["paragraphs"]: run for run in baseline.get("runs", [])}
+    print(f"\n기준 결과와 비교 ({baseline.get('commit') or baseline_path}): 현재/기준 시간 비율")
+    for run in results["runs"]:
+        before = previous.get(run["paragraphs"])
+        if not before:
+            continue
+        ratios = []
+        for stage in STAGES:
+            a = before["stages"].get(stage, {}).get("wall_s")
+            b = run["stages"].get(stage, {}).get("wall_s")
+            if a and b:
+                ratios.append(f"{stage} {b / a:.2f}x")
+        print(f"  {run['paragraphs']:>6} 문단: {', '.join(ratios)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 .docx 코퍼스로 RAG 파이프라인 단계별 시간/메모리/처리량을 측정합니다.")
+    parser.add_argument("--sizes", default="100,1000,10000", help="원본 문단 수 목록")
+    parser.add_argument("--per-doc", type=int, default=50, help="문서 하나당 문단 수")
+    parser.add_argument("--jobs", type=int, default=1, help="preprocess/cluster 병렬 프로세스 수 (RAG_JOBS와 같은 의미)")
+    parser.add_argument("--cluster-mode", choices=["full", "minibatch"], default="full", help="cluster.py --mode")
+    parser.add_argument("--batch-size", type=int, default=32, help="encode 단계 배치 크기")
+    parser.add_argument("--no-encode", action="store_true", help="encode 처리량 측정 생략")
+    parser.add_argument("--superlinear", type=float, default=1.3, help="이 기울기를 넘으면 초선형으로 표시")
+    parser.add_argument("--workdir", help="임시 작업 폴더를 만들 위치 (기본: 시스템 임시 폴더)")
+    parser.add_argument("--keep", action="store_true", help="작업 폴더(생성한 docx, 단계별 결과와 로그)를 남김")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    parser.add_argument("--child", choices=["encode"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "encode":
+        child_encode(args)
+        sys.exit(0)
+
+    sizes = [int(n) for n in args.sizes.split(",")]
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "args": {"per_doc": args.per_doc, "jobs": args.jobs, "cluster_mode": args.cluster_mode,
+                 "batch_size": args.batch_size, "seed": args.seed},
+        "runs": [bench_size(size, args) for size in sizes],
+    }
+    results["scaling"] = scaling_report(results["runs"], args.superlinear)
+
+    if results["scaling"]:
+        print(f"\n크기 증가 대비 시간 증가 (로그-로그 기울기, 1 = 선형, > {args.superlinear} 초선형)")
+        for entry in results["scaling"]:
+            mark = "  ← 초선형" if entry["superlinear"] else ""
+            print(f"  {entry['stage']:<16}{entry['from']:>6} → {entry['to']:<6}{entry['exponent']:>6.2f}{mark}")
+    if args.baseline:
+        compare(results, args.baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 완료: {args.output}")
+    if any(run.get("failed") for run in results["runs"]):
+        sys.exit(1)
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench.fixtures import FALLBACK_INPUTS, START_KEYWORDS, SYMPTOM_INPUTS, name_input, seed_collection
+from bench.harness import get_collection, load_offline_app, start_stub
+from bench.stub_openai import parse_model_latency
+
+API = "/api/medicine"
+ROUTES = ["makeSession", "start", "symptom", "select", "detail", "name", "start_fallback"]
+
+
+def run_iteration(app, rng, lang):
+    client = app.test_client()
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+
+    def call(route, path, payload=None):
+        started = time.perf_counter()
+        resp = client.post(f"{API}{path}", json=payload or {}, buffered=True)
+        timings[route].append(time.perf_counter() - started)
+        if resp.status_code >= 500:
+            errors[route] += 1
+        return resp
+
+    keywords = START_KEYWORDS[lang]
+    call("makeSession", "/makeSession")
+    call("start", "/start", {"input": keywords["symptom"], "lang": lang})
+    resp = call("symptom", "/symptom", {"input": rng.choice(SYMPTOM_INPUTS[lang])})
+    candidates = (resp.get_json() or {}).get("medicine_candidates") or []
+    if candidates:
+        call("select", "/select", {"input": rng.choice(candidates)["name_ko"]})
+        call("detail", "/detail", {"input": "YES"})
+
+    call("start", "/start", {"input": keywords["name"], "lang": lang})
+    call("name", "/name", {"input": name_input(rng)})
+    call("start_fallback", "/start", {"input": rng.choice(FALLBACK_INPUTS), "lang": lang})
+    return timings, errors
+
+
+def summarize(timings, errors):
+    report = {}
+    for route in ROUTES:
+        values = timings.get(route, [])
+        if not values:
+            continue
+        ms = np.array(values) * 1000
+        report[route] = {
+            "count": len(values),
+            "errors": errors.get(route, 0),
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        }
+    return report
+
+
+def bench_size(app, size, iterations, concurrency, langs, seed):
+    seed_collection(get_collection(), size, seed=seed)
+    rng = random.Random(seed)
+
+    # 워밍업 (모델 로딩, 코퍼스 캐시 등은 측정에서 제외)
+    run_iteration(app, rng, "ko")
+
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(run_iteration, app, random.Random(seed + i), langs[i % len(langs)])
+            for i in range(iterations)
+        ]
+        for f in futures:
+            iteration_timings, iteration_errors = f.result()
+            for route, values in iteration_timings.items():
+                timings[route].extend(values)
+            for route, count in iteration_errors.items():
+                errors[route] += count
+    elapsed = time.perf_counter() - started
+
+    report = summarize(timings, errors)
+    total_requests = sum(len(v) for v in timings.values())
+    return {"routes": report, "elapsed_s": round(elapsed, 2), "throughput_rps": round(total_requests / elapsed, 2)}
+
+
+def print_report(size, result):
+    print(f"\n[카탈로그 {size}개] 처리량 {result['throughput_rps']} req/s, 소요 {result['elapsed_s']}s")
+    print(f"  {'route':<16}{'n':>6}{'err':>6}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}")
+    for route, r in result["routes"].items():
+        print(f"  {route:<16}{r['count']:>6}{r['errors']:>6}{r['p50_ms']:>12}{r['p95_ms']:>12}{r['p99_ms']:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/api/medicine 라우트 오프라인 벤치마크")
+    parser.add_argument("--sizes", default="100,1000,10000", help="카탈로그 크기 목록 (콤마 구분)")
+    parser.add_argument("--iterations", type=int, default=30, help="카탈로그 크기별 대화 흐름 반복 횟수")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--langs", default="ko,en,ja,zh")
+    parser.add_argument("--latency", default="lognormal:0.3,0.4", help="스텁 OpenAI 기본 지연 분포")
+    parser.add_argument("--model-latency", action="append", help="모델별 지연 분포 (예: gpt-4o-mini=fixed:0.2)")
+    parser.add_argument("--cassette", help="스텁 서버가 재생할 녹화 파일 (JSONL)")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--mongo-uri", help="로컬 MongoDB URI (K_Medi_Guide.Api 컬렉션을 덮어씁니다!)")
+    parser.add_argument("--redis-host", help="로컬 Redis 호스트 (없으면 fakeredis)")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    stub = start_stub(args.latency, parse_model_latency(args.model_latency), seed=args.seed,
+                      cassette_path=args.cassette, rate_limit_prob=args.rate_limit_prob)
+    app = load_offline_app(stub.url, args.mongo_uri, args.redis_host, args.redis_port)
+    langs = args.langs.split(",")
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",")]:
+        result = bench_size(app, size, args.iterations, args.concurrency, langs, args.seed)
+        print_report(size, result)
+        results[str(size)] = result
+
+    print(f"\n스텁 OpenAI 호출 수: {stub.request_count} {stub.stats}")
+    stub.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "latency": args.latency,
+                "iterations": args.iterations,
+                "concurrency": args.concurrency,
+                "sizes": results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장 완료: {args.output}")
@@ -0,0 +1,332 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fixtures import SYMPTOM_GROUPS
+
+SYMPTOM_VOCAB = sorted({s for _, symptoms in SYMPTOM_GROUPS for s in symptoms}, key=len, reverse=True)
+
+
+def parse_latency(spec):
+    """
+    지연 분포 문자열을 샘플링 함수로 변환합니다. (단위: 초)
+    - fixed:0.2
+    - uniform:0.1,0.5
+    - normal:평균,표준편차
+    - lognormal:중앙값,sigma
+    """
+    if not spec:
+        return lambda rng: 0.0
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: values[0] * math.exp(rng.gauss(0.0, values[1]))
+    raise ValueError(f"지원하지 않는 지연 분포입니다: {spec}")
+
+
+def _last_user_message(messages):
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            return m.get("content", "")
+    return ""
+
+
+def _system_message(messages):
+    return " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+
+
+def synthesize(model, messages):
+    """
+    프롬프트 종류를 보고 그럴듯한 응답을 만들어냅니다.
+    """
+    system = _system_message(messages)
+    text = _last_user_message(messages)
+
+    if "증상을 추출" in system:
+        found = [s for s in SYMPTOM_VOCAB if s in text]
+        return ", ".join(found[:3]) if found else "두통, 발열"
+
+    if "약 이름을 추출" in system:
+        match = re.search(r'문장: "(.*)"', text, re.S)
+        sentence = match.group(1) if match else text
+        words = sentence.split()
+        return words[0] if words else "타이레놀"
+
+    if "번역" in system:
+        match = re.search(r"문장: '(.*)'", text, re.S)
+        return match.group(1) if match else text
+
+    if "가독성" in system:
+        match = re.search(r'"""(.*)"""', text, re.S)
+        body = match.group(1) if match else text
+        return f"💊 {body.strip()}"
+
+    if "약국 상담" in system:
+        return "💊 하루 최대 4회까지 복용할 수 있어요.\n\n⚠️ 복용 간격은 4시간 이상 지켜주세요."
+
+    # 파인튜닝 모델 (증상 문장 / 효능 / 복용법 / 주의사항)
+    if "," in text and len(text) < 80:
+        return f"{text} 증상이 있으시군요."
+    return f"{text[:60].strip()}에 도움이 돼요."
+
+
+def request_key(model, messages):
+    """
+    녹화/재생 키: (모델, 메시지 해시)
+    """
+    canonical = json.dumps(messages, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return f"{model}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+class Cassette:
+    """
+    녹화된 응답을 JSONL 파일로 보관합니다. 한 줄에 {"key", "model", "response"} 하나.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.responses = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry["key"]] = entry["response"]
+
+    def get(self, key):
+        return self.responses.get(key)
+
+    def record(self, key, model, response):
+        with self.lock:
+            self.responses[key] = response
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"key": key, "model": model, "response": response}, ensure_ascii=False) + "\n")
+
+
+def _count_tokens(text):
+    # 한국어 기준 대략적인 토큰 수
+    return max(1, len(text) // 2)
+
+
+class StubOpenAIServer:
+    """
+    OpenAI 호환 chat-completions 스텁 서버
+    - replay: cassette에 녹화된 응답이 있으면 그대로 돌려주고, 없으면 synthesize()로 합성
+    - record: upstream(실제 OpenAI)으로 프록시하면서 응답을 cassette에 녹화
+    - 장애 주입: 지연 분포, 429(rate limit), 5xx, 타임아웃(응답 지연)
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=None, model_latency=None, seed=0,
+                 cassette_path=None, record=False, upstream=None, upstream_key=None,
+                 rate_limit_prob=0.0, error_prob=0.0, timeout_prob=0.0, timeout_seconds=120.0):
+        self.default_latency = parse_latency(latency)
+        self.model_latency = {m: parse_latency(s) for m, s in (model_latency or {}).items()}
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.request_count = 0
+        self.cassette = Cassette(cassette_path)
+        self.record = record
+        self.upstream = (upstream or "https://api.openai.com/v1").rstrip("/")
+        self.upstream_key = upstream_key or os.getenv("OPENAI_API_KEY")
+        self.rate_limit_prob = rate_limit_prob
+        self.error_prob = error_prob
+        self.timeout_prob = timeout_prob
+        self.timeout_seconds = timeout_seconds
+        self.stats = {"replayed": 0, "synthesized": 0, "recorded": 0, "rate_limited": 0, "errors": 0, "timeouts": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def sample_latency(self, model):
+        sampler = self.model_latency.get(model, self.default_latency)
+        with self.rng_lock:
+            return sampler(self.rng)
+
+    def _count(self, name):
+        with self.rng_lock:
+            self.stats[name] += 1
+
+    def pick_fault(self):
+        with self.rng_lock:
+            roll = self.rng.random()
+        if roll < self.rate_limit_prob:
+            return "rate_limit"
+        roll -= self.rate_limit_prob
+        if roll < self.error_prob:
+            return "error"
+        roll -= self.error_prob
+        if roll < self.timeout_prob:
+            return "timeout"
+        return None
+
+    def proxy(self, body):
+        req = urllib.request.Request(
+            f"{self.upstream}/chat/completions",
+            data=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.upstream_key}"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout_seconds) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"{}")
+
+    def complete(self, body):
+        model = body.get("model", "")
+        messages = body.get("messages", [])
+        key = request_key(model, messages)
+
+        recorded = self.cassette.get(key)
+        if recorded is not None:
+            self._count("replayed")
+            return 200, recorded
+
+        if self.record:
+            status, payload = self.proxy(body)
+            if status == 200:
+                self.cassette.record(key, model, payload)
+                self._count("recorded")
+            return status, payload
+
+        self._count("synthesized")
+        content = synthesize(model, messages)
+        prompt_tokens = sum(_count_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = _count_tokens(content)
+        return 200, {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server.rng_lock:
+                    server.request_count += 1
+
+                fault = server.pick_fault()
+                if fault == "rate_limit":
+                    server._count("rate_limited")
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Type", "application/json")
+                    data = json.dumps({"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}}).encode("utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                if fault == "error":
+                    server._count("errors")
+                    self._send_json(500, {"error": {"message": "Internal server error (stub)", "type": "server_error"}})
+                    return
+                if fault == "timeout":
+                    # 클라이언트 타임아웃을 유도하기 위해 응답을 오래 붙잡아 둠
+                    server._count("timeouts")
+                    time.sleep(server.timeout_seconds)
+
+                time.sleep(server.sample_latency(body.get("model", "")))
+                status, payload = server.complete(body)
+                self._send_json(status, payload)
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_model_latency(items):
+    result = {}
+    for item in items or []:
+        model, _, spec = item.partition("=")
+        result[model] = spec
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 OpenAI 호환 chat-completions 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="fixed:0", help="기본 지연 분포 (예: lognormal:0.5,0.4)")
+    parser.add_argument("--model-latency", action="append", help="모델별 지연 분포 (예: gpt-4o-mini=fixed:0.3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cassette", help="녹화/재생용 JSONL 파일 경로")
+    parser.add_argument("--record", action="store_true", help="upstream으로 프록시하면서 응답을 cassette에 녹화")
+    parser.add_argument("--upstream", default="https://api.openai.com/v1", help="녹화 시 사용할 실제 API 주소")
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0, help="429 응답 확률")
+    parser.add_argument("--error-prob", type=float, default=0.0, help="500 응답 확률")
+    parser.add_argument("--timeout-prob", type=float, default=0.0, help="응답 지연(타임아웃 유도) 확률")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0)
+    args = parser.parse_args()
+
+    stub = StubOpenAIServer(
+        args.host, args.port, args.latency, parse_model_latency(args.model_latency), args.seed,
+        cassette_path=args.cassette, record=args.record, upstream=args.upstream,
+        rate_limit_prob=args.rate_limit_prob, error_prob=args.error_prob,
+        timeout_prob=args.timeout_prob, timeout_seconds=args.timeout_seconds
+    )
+    print(f"스텁 서버 실행 중: {stub.url} (OPENAI_BASE_URL로 설정하세요)")
+    try:
+        stub.httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+        print(f"통계: {stub.stats}")
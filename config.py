@@ -1,9 +1,12 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 로컬 스텁 서버 등 OpenAI 호환 엔드포인트를 쓸 때 설정 (없으면 기본 OpenAI API)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 MONGODB_URI = os.getenv("MONGODB_URI")
 FINE_TUNE_SYMPTOM_MODEL = os.getenv("FINE_TUNE_SYMPTOM_MODEL")
 FINE_TUNE_EFCY_MODEL = os.getenv("FINE_TUNE_EFCY_MODEL")
@@ -13,4 +16,100 @@ PURE_FINE_TUNE_EFCY_MODEL = os.getenv("PURE_FINE_TUNE_EFCY_MODEL")
 FLASK_SECRET_KEY = os.getenv("FLASK_SECRET_KEY")
 REDIS_HOST =  os.getenv("REDIS_HOST")
 REDIS_PORT =  os.getenv("REDIS_PORT")
-REDIS_PASSWORD = os.getenv ("REDIS_PASSWORD")
\ No newline at end of file
+REDIS_PASSWORD = os.getenv ("REDIS_PASSWORD")
+
+# 동일한 LLM 요청 합치기: off / local(프로세스 내) / redis(워커 간 공유)
+LLM_SINGLE_FLIGHT = os.getenv("LLM_SINGLE_FLIGHT", "local").lower()
+
+# LLM 호출 스케줄러
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))   # 워커당 동시 호출 수
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))            # 429/5xx/타임아웃 재시도 횟수
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))                 # 호출 1회 타임아웃(초)
+LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "40"))  # 요청 하나에서 LLM 호출에 쓸 수 있는 총 시간(초)
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"  # p95 초과 시 중복 요청
+# 모델별 분당 요청/토큰 한도 (예: {"gpt-4o-mini": {"rpm": 5000, "tpm": 4000000}, "default": {"rpm": 3000}})
+LLM_RATE_LIMITS = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+
+# 모델별 회로 차단기 (OpenAI 지연/오류가 SLO를 넘으면 호출을 잠시 끊고 로컬 대체 응답, 상태는 Redis로 워커 간 공유)
+CB_ENABLED = os.getenv("CB_ENABLED", "true").lower() == "true"
+CB_SLOW_SECONDS = float(os.getenv("CB_SLOW_SECONDS", "8"))     # 이보다 오래 걸린 호출은 실패로 셈 (지연 SLO)
+CB_FAILURE_RATE = float(os.getenv("CB_FAILURE_RATE", "0.5"))   # 창 안의 실패 비율이 이 이상이면 열림
+CB_MIN_CALLS = int(os.getenv("CB_MIN_CALLS", "10"))            # 판단에 필요한 창 안의 최소 호출 수
+CB_WINDOW = float(os.getenv("CB_WINDOW", "60"))                # 이동 창 길이(초)
+CB_OPEN_SECONDS = float(os.getenv("CB_OPEN_SECONDS", "30"))    # 열린 뒤 시험 호출까지 기다리는 시간(초)
+
+# 라우트별 수용 제어 (동시 처리 수 + 대기열, 넘치면 503). llm: LLM 호출 라우트, cheap: 세션 생성/키워드 분기 등 가벼운 라우트
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_LLM_CONCURRENCY = int(os.getenv("ADMISSION_LLM_CONCURRENCY", "16"))      # LLM 라우트별 동시 처리 수
+ADMISSION_LLM_QUEUE = int(os.getenv("ADMISSION_LLM_QUEUE", "32"))                  # LLM 라우트별 대기열 길이
+ADMISSION_LLM_WAIT = float(os.getenv("ADMISSION_LLM_WAIT", "5"))                   # 대기열에서 기다리는 최대 시간(초)
+ADMISSION_CHEAP_CONCURRENCY = int(os.getenv("ADMISSION_CHEAP_CONCURRENCY", "64"))  # 가벼운 라우트별 동시 처리 수
+ADMISSION_CHEAP_QUEUE = int(os.getenv("ADMISSION_CHEAP_QUEUE", "16"))
+ADMISSION_CHEAP_WAIT = float(os.getenv("ADMISSION_CHEAP_WAIT", "0.5"))
+# 라우트별 덮어쓰기 (예: {"symptom": {"concurrency": 8, "queue": 16, "wait": 3}, "start_fallback": {"concurrency": 4}})
+ADMISSION_LIMITS = json.loads(os.getenv("ADMISSION_LIMITS", "{}"))
+
+# 다음 단계 미리 생성 (select 후 detail, symptom 후 select 효능 문장)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+PREFETCH_MAX_PER_SESSION = int(os.getenv("PREFETCH_MAX_PER_SESSION", "12"))  # 세션당 미리 생성 작업 수 상한 (비용 상한)
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+PREFETCH_SYMPTOM_CANDIDATES = int(os.getenv("PREFETCH_SYMPTOM_CANDIDATES", "2"))  # symptom 후보 중 미리 생성할 개수
+PREFETCH_TTL = int(os.getenv("PREFETCH_TTL", "600"))  # 미리 생성 결과 보관 시간(초)
+
+# symptom/name 후보 결과 캐시 (/symptom/more, /name/more 로 재검색 없이 다음 후보를 넘겨 봄)
+CANDIDATE_CACHE_TTL = int(os.getenv("CANDIDATE_CACHE_TTL", "600"))  # 보관 시간(초)
+CANDIDATE_CACHE_MAX = int(os.getenv("CANDIDATE_CACHE_MAX", "200"))  # 세션당 저장할 후보 수 상한
+
+# RAG 전처리/클러스터링 병렬 프로세스 수 (0이면 CPU 코어 수)
+RAG_JOBS = int(os.getenv("RAG_JOBS", "1"))
+
+# RAG 검색: hybrid(BM25 + 임베딩, RRF 결합) / dense(임베딩만)
+RAG_RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "hybrid").lower()
+RAG_LEXICAL_SHORTLIST = int(os.getenv("RAG_LEXICAL_SHORTLIST", "500"))  # 코퍼스가 이보다 크면 BM25 상위 후보만 임베딩 점수 계산 (0이면 끔)
+RAG_EMBEDDING_DTYPE = os.getenv("RAG_EMBEDDING_DTYPE", "int8").lower()  # 문단 임베딩 저장/검색 형식: float32 / float16 / int8
+RAG_RESCORE_CANDIDATES = int(os.getenv("RAG_RESCORE_CANDIDATES", "50"))  # 상위 후보를 float32 원본으로 다시 점수 계산할 개수 (0이면 끔)
+
+# true면 검색 모델/코퍼스를 백그라운드에서 로드하고 바로 요청을 받음 (모델이 필요 없는 라우트는 즉시 응답)
+FAST_START = os.getenv("FAST_START", "false").lower() == "true"
+
+# RAG 코퍼스 버전 관리/무중단 교체
+RAG_CORPUS_VERSIONS_DIR = os.getenv("RAG_CORPUS_VERSIONS_DIR", "rag/data/corpus_versions")
+RAG_CORPUS_KEEP_VERSIONS = int(os.getenv("RAG_CORPUS_KEEP_VERSIONS", "3"))  # 되돌리기용으로 남겨둘 버전 수
+RAG_WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "0"))  # rag/docs 변경 감시 주기(초), 0이면 감시하지 않음
+
+# /start 자유 질문 답변 의미 캐시
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # 이 코사인 유사도 이상이면 같은 질문으로 봄
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))  # 답변 보관 시간(초)
+SEMANTIC_CACHE_MAX_PER_SCOPE = int(os.getenv("SEMANTIC_CACHE_MAX_PER_SCOPE", "500"))  # (언어, 약 이름)별 최대 항목 수
+SEMANTIC_CACHE_SAMPLE_RATE = float(os.getenv("SEMANTIC_CACHE_SAMPLE_RATE", "0.05"))  # 적중/근접 미스 표본 저장 비율
+
+# Redis 세션 보관 시간(초). 요청마다 바뀐 경우에만 다시 저장하고, 남은 시간이 절반 아래면 연장
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+
+# 관리자 API(/api/admin) 토큰. 비어 있으면 관리자 API 비활성화
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# /symptom 약 검색 방식: literal(효능 텍스트 부분 일치) / semantic(효능 임베딩 색인) / hybrid(둘을 RRF로 결합)
+SYMPTOM_MATCH_MODE = os.getenv("SYMPTOM_MATCH_MODE", "literal").lower()
+EFCY_INDEX_PATH = os.getenv("EFCY_INDEX_PATH", "rag/data/efcy_index")  # python -m services.efcy_index 로 생성
+SYMPTOM_SEMANTIC_TOP_K = int(os.getenv("SYMPTOM_SEMANTIC_TOP_K", "50"))
+SYMPTOM_SEMANTIC_MIN_SCORE = float(os.getenv("SYMPTOM_SEMANTIC_MIN_SCORE", "0.35"))  # 이보다 유사도가 낮은 약은 제외
+
+# /start 자유 질문: 약 정보 조회와 문서 검색(RAG)을 동시에 실행할 때 기다리는 최대 시간(초)
+FALLBACK_RETRIEVAL_TIMEOUT = float(os.getenv("FALLBACK_RETRIEVAL_TIMEOUT", "10"))
+
+# select/detail 응답 마크다운: template(services/formatter.py 언어별 템플릿) / llm(gpt-4o-mini 가독성 개선)
+READABILITY_MODE = os.getenv("READABILITY_MODE", "template").lower()
+
+# 계측 (/metrics 엔드포인트, Server-Timing 헤더). 기본값은 비활성화
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# 요청 단위 프로파일링 (X-Profile 헤더 + 관리자 토큰, 또는 표본 비율). 기본값은 비활성화
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # 무작위로 프로파일링할 요청 비율
+PROFILING_MIN_MS = float(os.getenv("PROFILING_MIN_MS", "0"))  # 표본 요청은 이보다 오래 걸렸을 때만 저장 (급증 구간 포착용)
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))  # 보관할 프로파일 파일 수
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))  # pyinstrument 샘플링 간격(초)
\ No newline at end of file
@@ -1,19 +1,94 @@
 from sentence_transformers import SentenceTransformer
-from sklearn.cluster import KMeans, AgglomerativeClustering
+from sklearn.cluster import KMeans, MiniBatchKMeans, AgglomerativeClustering
 from sklearn.metrics import silhouette_score
-import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+import argparse
+import hashlib
 import json
 import os
+import sys
 import numpy as np
 
-def cluster_all_documents_summary(summaries_folder, output_path, method='kmeans'):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rag.corpus_store import CorpusReader, CorpusWriter, is_corpus
+
+SILHOUETTE_SAMPLE_SIZE = 2000  # 실루엣 점수 계산에 사용할 최대 표본 수 (전체 계산은 O(n²))
+MINIBATCH_SIZE = 1024
+
+def centroids_path_for(output_path):
+    # 코퍼스 디렉터리는 쓸 때마다 통째로 교체되므로 중심점은 옆에 따로 저장
+    return output_path.rstrip("/") + ".centroids.npz"
+
+def compute_data_hash(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_cluster_state(output_path):
+    """
+    이전 실행의 중심점/데이터 해시와 텍스트별 (cluster, embedding)을 읽습니다. 없으면 (None, {}).
+    """
+    state_path = centroids_path_for(output_path)
+    if not os.path.exists(state_path) or not is_corpus(output_path):
+        return None, {}
+    state = np.load(state_path)
+    previous = {}
+    for record, embedding in CorpusReader(output_path).iter_with_embeddings():
+        record["embedding"] = embedding
+        previous[record["text"]] = record
+    return state, previous
+
+def encode_with_cache(texts, previous):
+    # 이전 출력에 같은 텍스트의 임베딩이 있으면 재사용하고 새 텍스트만 인코딩 (모델도 필요할 때만 로드)
+    missing = [t for t in texts if t not in previous]
+    encoded = {}
+    if missing:
+        model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        encoded = dict(zip(missing, model.encode(missing)))
+    if previous:
+        print(f"  임베딩 재사용 {len(texts) - len(missing)}개, 새로 인코딩 {len(missing)}개")
+    return np.array([encoded[t] if t in encoded else previous[t]["embedding"] for t in texts], dtype=np.float32)
+
+def sampled_silhouette(embeddings, labels, sample_size=SILHOUETTE_SAMPLE_SIZE):
+    if len(embeddings) > sample_size:
+        return silhouette_score(embeddings, labels, sample_size=sample_size, random_state=42)
+    return silhouette_score(embeddings, labels)
+
+def make_model(method, mode, k):
+    if method == 'agglomerative':
+        return AgglomerativeClustering(n_clusters=k)
+    if mode == 'minibatch':
+        return MiniBatchKMeans(n_clusters=k, batch_size=MINIBATCH_SIZE, random_state=42, n_init=3)
+    return KMeans(n_clusters=k, random_state=42)
+
+def score_k(embeddings, method, mode, k, sample_size):
+    labels = make_model(method, mode, k).fit_predict(embeddings)
+    return k, sampled_silhouette(embeddings, labels, sample_size)
+
+def centroids_from_labels(embeddings, labels, k):
+    return np.stack([embeddings[labels == c].mean(axis=0) for c in range(k)])
+
+def assign_to_centroids(embeddings, centroids):
+    distances = ((embeddings[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+def cluster_all_documents_summary(summaries_folder, output_path, method='kmeans', mode='full',
+                                  jobs=1, silhouette_sample=SILHOUETTE_SAMPLE_SIZE, force=False):
+    """
+    mode
+    - full: k=2..10마다 KMeans(또는 agglomerative)를 학습하고 실루엣 점수로 최적 k 선택
+    - minibatch: full과 같지만 MiniBatchKMeans 사용 (대용량용)
+    - incremental: 저장된 중심점에 새 문단만 가장 가까운 클러스터로 배정 (재학습 없음)
+    데이터가 이전 실행과 같으면 클러스터링을 생략합니다. (force=True면 항상 실행)
+    """
     print("\n[전체 문서 클러스터링 시작]")
 
-    model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
     all_summaries = []
     all_texts = []
 
-    for filename in os.listdir(summaries_folder):
+    for filename in sorted(os.listdir(summaries_folder)):
         if filename.endswith(".json"):
             with open(os.path.join(summaries_folder, filename), encoding="utf-8") as f:
                 summaries = json.load(f)
@@ -24,52 +99,59 @@ def cluster_all_documents_summary(summaries_folder, output_path, method='kmeans'
         print("  문단이 2개 미만이므로 클러스터링 생략")
         return
 
-    embeddings = model.encode(all_texts)
-
-    best_k = None
-    best_score = -1
-    cluster_range = range(2, min(11, len(all_texts)))
-    sse = []
-
-    if method == 'kmeans':
-        for k in cluster_range:
-            kmeans = KMeans(n_clusters=k, random_state=42)
-            labels = kmeans.fit_predict(embeddings)
-            score = silhouette_score(embeddings, labels)
-            sse.append(kmeans.inertia_)
-            print(f"  k={k}, Silhouette Score={score:.4f}")
-            if score > best_score:
-                best_score = score
-                best_k = k
-
-        kmeans = KMeans(n_clusters=best_k, random_state=42)
-        labels = kmeans.fit_predict(embeddings)
+    data_hash = compute_data_hash(all_texts)
+    state, previous = load_cluster_state(output_path)
+    if state is not None and not force and str(state["data_hash"]) == data_hash:
+        print("  이전 실행과 데이터가 같으므로 클러스터링 생략")
+        return
 
-    elif method == 'agglomerative':
-        for k in cluster_range:
-            agg = AgglomerativeClustering(n_clusters=k)
-            labels = agg.fit_predict(embeddings)
-            score = silhouette_score(embeddings, labels)
+    embeddings = encode_with_cache(all_texts, previous)
+
+    if mode == 'incremental' and state is not None:
+        centroids = state["centroids"]
+        best_k = len(centroids)
+        # 이미 배정된 문단은 기존 클러스터를 유지하고 새 문단만 가장 가까운 중심점에 배정
+        labels = assign_to_centroids(embeddings, centroids)
+        kept = 0
+        for i, text in enumerate(all_texts):
+            if text in previous and "cluster" in previous[text]:
+                labels[i] = previous[text]["cluster"]
+                kept += 1
+        print(f"  기존 중심점 {best_k}개에 새 문단 {len(all_texts) - kept}개 배정")
+    else:
+        if mode == 'incremental':
+            print("  저장된 중심점이 없어 전체 클러스터링을 수행합니다.")
+            mode = 'full'
+        if method not in ('kmeans', 'agglomerative'):
+            raise ValueError("지원하지 않는 클러스터링 방식입니다. (kmeans/agglomerative)")
+
+        # k별 학습/평가는 서로 독립이므로 병렬로 실행
+        cluster_range = range(2, min(11, len(all_texts)))
+        scores = Parallel(n_jobs=jobs)(
+            delayed(score_k)(embeddings, method, mode, k, silhouette_sample) for k in cluster_range
+        )
+        best_k = None
+        best_score = -1
+        for k, score in scores:
             print(f"  k={k}, Silhouette Score={score:.4f}")
             if score > best_score:
                 best_score = score
                 best_k = k
+        print(f"  최적 k = {best_k}, Silhouette Score = {best_score:.4f}")
 
-        agg = AgglomerativeClustering(n_clusters=best_k)
-        labels = agg.fit_predict(embeddings)
-
-    else:
-        raise ValueError("지원하지 않는 클러스터링 방식입니다. (kmeans/agglomerative)")
-
-    print(f"  최적 k = {best_k}, Silhouette Score = {best_score:.4f}")
-
-    for i, s in enumerate(all_summaries):
-        s['cluster'] = int(labels[i])
-        s['embedding'] = embeddings[i].tolist()
+        final = make_model(method, mode, best_k)
+        labels = final.fit_predict(embeddings)
+        centroids = getattr(final, "cluster_centers_", None)
+        if centroids is None:
+            centroids = centroids_from_labels(embeddings, labels, best_k)
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_summaries, f, ensure_ascii=False, indent=2)
+    with CorpusWriter(output_path) as writer:
+        for i, s in enumerate(all_summaries):
+            s['cluster'] = int(labels[i])
+            writer.add(s, embeddings[i])
+    np.savez(centroids_path_for(output_path), centroids=np.asarray(centroids, dtype=np.float32),
+             data_hash=np.array(data_hash), method=np.array(method), mode=np.array(mode))
 
     print(f"  저장 완료: {output_path}")
 
@@ -82,6 +164,15 @@ def cluster_all_documents_summary(summaries_folder, output_path, method='kmeans'
     # plt.show()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="요약 문단을 클러스터링합니다.")
+    parser.add_argument("--method", choices=["kmeans", "agglomerative"], default="kmeans")
+    parser.add_argument("--mode", choices=["full", "minibatch", "incremental"], default="full")
+    parser.add_argument("--jobs", type=int, default=1, help="k 탐색 병렬 프로세스 수 (-1이면 전체 코어)")
+    parser.add_argument("--silhouette-sample", type=int, default=SILHOUETTE_SAMPLE_SIZE)
+    parser.add_argument("--force", action="store_true", help="데이터가 같아도 다시 클러스터링")
+    args = parser.parse_args()
+
     summaries_folder = "rag/data/summaries"
-    output_path = "rag/data/clusters/all_documents_clustered.json"
-    cluster_all_documents_summary(summaries_folder, output_path, method='kmeans')  # 또는 'agglomerative'
+    output_path = "rag/data/clusters/all_documents_clustered"
+    cluster_all_documents_summary(summaries_folder, output_path, method=args.method, mode=args.mode,
+                                  jobs=args.jobs, silhouette_sample=args.silhouette_sample, force=args.force)
@@ -1,5 +1,10 @@
-import json
+import argparse
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rag.corpus_store import CorpusReader, CorpusWriter, list_corpora
+from rag.lexical_index import BM25Index, INDEX_FILE, document_text
 
 
 def build_corpus_for_all_documents(
@@ -11,36 +16,35 @@ def build_corpus_for_all_documents(
     """
     os.makedirs(corpus_folder, exist_ok=True)
 
-    all_corpus = []
     corpus_id = 1
-
-    for filename in os.listdir(clusters_folder):
-        if not filename.endswith(".json"):
-            continue
-
-        cluster_path = os.path.join(clusters_folder, filename)
-        with open(cluster_path, encoding="utf-8") as f:
-            clustered_data = json.load(f)
-
-        for item in clustered_data:
-            entry = {
-                "id": corpus_id,
-                "filename": filename,
-                "cluster": item.get("cluster", -1),
-                "summary": ', '.join(item.get("keywords", [])),
-                "context": item.get("text", ""),
-                "embedding": item.get("embedding", [])
-            }
-            all_corpus.append(entry)
-            corpus_id += 1
-
-    # 전체 코퍼스 통합 저장
-    output_path = os.path.join(corpus_folder, "corpus.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(all_corpus, f, ensure_ascii=False, indent=2)
+    output_path = os.path.join(corpus_folder, "corpus")
+    lexical_texts = []
+
+    # 클러스터 결과를 레코드 단위로 읽어 바로 기록 (전체를 메모리에 올리지 않음)
+    with CorpusWriter(output_path) as writer:
+        for cluster_path in list_corpora(clusters_folder):
+            filename = os.path.basename(cluster_path)
+            for item, embedding in CorpusReader(cluster_path).iter_with_embeddings():
+                entry = {
+                    "id": corpus_id,
+                    "filename": filename,
+                    "cluster": item.get("cluster", -1),
+                    "summary": ', '.join(item.get("keywords", [])),
+                    "context": item.get("text", "")
+                }
+                writer.add(entry, embedding)
+                lexical_texts.append(document_text(entry))
+                corpus_id += 1
+
+    # 본문 + 요약 키워드 BM25 색인을 코퍼스와 같은 디렉터리에 저장
+    BM25Index.build(lexical_texts).save(os.path.join(output_path, INDEX_FILE))
 
     print(f"[통합 코퍼스 생성 완료] 저장 위치: {output_path}")
 
 
 if __name__ == "__main__":
-    build_corpus_for_all_documents()
+    parser = argparse.ArgumentParser(description="클러스터링 결과로 통합 코퍼스와 BM25 색인을 만듭니다.")
+    parser.add_argument("--clusters", default="rag/data/clusters", help="클러스터 결과 폴더")
+    parser.add_argument("--output", default="rag/data/corpus", help="코퍼스 출력 폴더 (버전 디렉터리의 corpus 폴더 등)")
+    args = parser.parse_args()
+    build_corpus_for_all_documents(args.clusters, args.output)
@@ -0,0 +1,173 @@
+import json
+import os
+import shutil
+import sys
+import numpy as np
+
+# 코퍼스 저장 형식 (디렉터리 하나가 코퍼스 하나)
+# - manifest.json   : 형식 이름/버전, 레코드 수, 임베딩 차원과 dtype (마지막에 기록되므로 완성 표시 역할)
+# - records.jsonl   : 임베딩을 뺀 메타데이터, 한 줄에 레코드 하나
+# - embeddings.npy  : (레코드 수, 차원) 행렬. np.load(mmap_mode='r')로 파싱 없이 매핑
+# 쓰기는 임시 디렉터리에 스트리밍한 뒤 교체하므로 읽는 쪽은 완성된 코퍼스만 보게 됩니다.
+
+FORMAT_NAME = "kmedi-corpus"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+RECORDS_FILE = "records.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+_RAW_EMBEDDINGS_FILE = "embeddings.raw"
+_COPY_ROWS = 65536
+
+
+class CorpusWriter:
+    """
+    레코드를 하나씩 추가하는 스트리밍 writer. with 블록이 정상 종료될 때만 결과가 반영됩니다.
+
+        with CorpusWriter("rag/data/corpus/corpus") as writer:
+            writer.add({"context": ...}, embedding)
+    """
+    def __init__(self, path, dtype="float32"):
+        self.path = path.rstrip("/")
+        self.dtype = np.dtype(dtype)
+        self.tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        self.count = 0
+        self.dim = None
+
+    def __enter__(self):
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self._records = open(os.path.join(self.tmp_path, RECORDS_FILE), "w", encoding="utf-8")
+        self._raw = open(os.path.join(self.tmp_path, _RAW_EMBEDDINGS_FILE), "wb")
+        return self
+
+    def add(self, record, embedding=None):
+        record = {k: v for k, v in record.items() if k != "embedding"}
+        if embedding is not None:
+            row = np.asarray(embedding, dtype=self.dtype).reshape(-1)
+            if self.dim is None:
+                if self.count:
+                    raise ValueError("임베딩이 없는 레코드와 있는 레코드를 섞을 수 없습니다.")
+                self.dim = row.shape[0]
+            elif row.shape[0] != self.dim:
+                raise ValueError(f"임베딩 차원이 다릅니다: {row.shape[0]} != {self.dim}")
+            self._raw.write(row.tobytes())
+        elif self.dim is not None:
+            raise ValueError("임베딩이 없는 레코드와 있는 레코드를 섞을 수 없습니다.")
+        self._records.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._records.close()
+        self._raw.close()
+        if exc_type is not None:
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+            return False
+
+        raw_path = os.path.join(self.tmp_path, _RAW_EMBEDDINGS_FILE)
+        if self.dim is not None:
+            # 행 수를 끝에서야 알 수 있으므로 원시 바이트를 .npy로 옮겨 씀 (메모리에 전부 올리지 않음)
+            raw = np.memmap(raw_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim))
+            out = np.lib.format.open_memmap(os.path.join(self.tmp_path, EMBEDDINGS_FILE), mode="w+",
+                                            dtype=self.dtype, shape=(self.count, self.dim))
+            for start in range(0, self.count, _COPY_ROWS):
+                out[start:start + _COPY_ROWS] = raw[start:start + _COPY_ROWS]
+            out.flush()
+            del raw, out
+        os.remove(raw_path)
+
+        manifest = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim or 0,
+            "dtype": self.dtype.name,
+        }
+        with open(os.path.join(self.tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+        # 기존 코퍼스를 치운 뒤 새 디렉터리로 교체
+        old_path = f"{self.path}.old-{os.getpid()}"
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(self.tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return False
+
+
+class CorpusReader:
+    """
+    저장된 코퍼스를 읽습니다. 레코드는 스트리밍으로, 임베딩은 memory-map으로 제공합니다.
+    """
+    def __init__(self, path, mmap=True):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_NAME:
+            raise ValueError(f"코퍼스 형식이 아닙니다: {path}")
+        if self.manifest.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 코퍼스 버전입니다: {self.manifest.get('version')} ({path})")
+        self._mmap = mmap
+        self._embeddings = None
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    @property
+    def dim(self):
+        return self.manifest["dim"]
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            if not self.dim:
+                self._embeddings = np.zeros((len(self), 0), dtype=self.manifest["dtype"])
+            else:
+                self._embeddings = np.load(os.path.join(self.path, EMBEDDINGS_FILE),
+                                           mmap_mode="r" if self._mmap else None)
+        return self._embeddings
+
+    def __iter__(self):
+        with open(os.path.join(self.path, RECORDS_FILE), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_with_embeddings(self):
+        embeddings = self.embeddings
+        for i, record in enumerate(self):
+            yield record, embeddings[i]
+
+
+def is_corpus(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def list_corpora(folder):
+    """
+    폴더 안의 (완성된) 코퍼스 디렉터리 목록
+    """
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if ".tmp-" not in name and ".old-" not in name and is_corpus(os.path.join(folder, name)))
+
+
+def convert_legacy_json(json_path, path):
+    """
+    이전 형식(임베딩이 float 리스트로 들어 있는 JSON 배열)을 새 형식으로 변환합니다.
+    """
+    with open(json_path, encoding="utf-8") as f:
+        items = json.load(f)
+    with CorpusWriter(path) as writer:
+        for item in items:
+            writer.add(item, item.get("embedding") or None)
+    return len(items)
+
+
+if __name__ == "__main__":
+    # 사용법: python rag/corpus_store.py <이전 JSON 경로> <코퍼스 디렉터리>
+    if len(sys.argv) != 3:
+        print("사용법: python rag/corpus_store.py <이전 JSON 경로> <코퍼스 디렉터리>")
+        sys.exit(1)
+    count = convert_legacy_json(sys.argv[1], sys.argv[2])
+    print(f"변환 완료: {sys.argv[2]} ({count}개 레코드)")
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import time
+
+# 코퍼스 버전 디렉터리 관리 (서버 재시작 없는 코퍼스 교체/되돌리기용)
+# <root>/
+#   CURRENT              : 현재 서비스 중인 버전 이름 (os.replace로 원자적으로 교체)
+#   <버전>/version.json   : 빌드 정보 (생성 시각, 빌드 소요 시간, 입력 문서 서명 등)
+#   <버전>/corpus/        : rag/corpus.py 결과 코퍼스 (corpus_store 형식 + bm25.json)
+# 버전 이름은 생성 시각 기반이라 이름순 정렬이 곧 생성순입니다.
+
+CURRENT_FILE = "CURRENT"
+INFO_FILE = "version.json"
+
+
+def version_path(root, version):
+    return os.path.join(root, version)
+
+
+def list_versions(root):
+    """
+    빌드가 끝난(version.json이 있는) 버전 이름 목록, 오래된 순
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if os.path.isfile(os.path.join(root, name, INFO_FILE)))
+
+
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if version and os.path.isfile(os.path.join(root, version, INFO_FILE)) else None
+
+
+def set_current(root, version):
+    if not os.path.isfile(os.path.join(root, version, INFO_FILE)):
+        raise ValueError(f"존재하지 않는 코퍼스 버전입니다: {version}")
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def new_version(root):
+    """
+    새 버전 디렉터리를 만들고 이름을 돌려줍니다. (version.json은 빌드가 끝난 뒤 write_info로 기록)
+    """
+    os.makedirs(root, exist_ok=True)
+    base = time.strftime("%Y%m%d-%H%M%S")
+    version, n = base, 1
+    while os.path.exists(os.path.join(root, version)):
+        n += 1
+        version = f"{base}-{n}"
+    os.makedirs(os.path.join(root, version))
+    return version
+
+
+def write_info(root, version, info):
+    path = os.path.join(root, version, INFO_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, **info}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_info(root, version):
+    try:
+        with open(os.path.join(root, version, INFO_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def previous_version(root, version):
+    versions = list_versions(root)
+    if version not in versions:
+        return versions[-1] if versions else None
+    i = versions.index(version)
+    return versions[i - 1] if i > 0 else None
+
+
+def remove_version(root, version):
+    shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def prune(root, keep):
+    """
+    현재 버전을 빼고 가장 최근 keep개만 남깁니다. 지운 버전 이름 목록을 돌려줍니다.
+    """
+    current = current_version(root)
+    removed = []
+    for version in list_versions(root)[:-keep] if keep > 0 else []:
+        if version != current:
+            remove_version(root, version)
+            removed.append(version)
+    return removed
@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import numpy as np
+
+# 검색용 임베딩 저장소 (디스크와 메모리에서 같은 형식을 사용)
+# - float32 : 원본 그대로
+# - float16 : 절반 크기
+# - int8    : 벡터별 scale로 스칼라 양자화 (x ≈ scale * q, q는 -127~127), 약 1/4 크기
+# 디렉터리 구성
+# - store.json   : 형식/버전, 개수, 차원, dtype 등 (마지막에 기록되므로 완성 표시 역할)
+# - vectors.npy  : (개수, 차원) 저장 dtype 행렬. memory-map으로 열어 여러 워커가 페이지 캐시를 공유
+# - scales.npy   : int8일 때 벡터별 scale (float32)
+# - full.npy     : 재점수용 float32 원본. memory-map이라 후보 행을 읽을 때만 메모리에 올라감
+# 벡터는 정규화해서 저장하므로 내적이 곧 코사인 유사도입니다.
+# manifest 파일 이름을 코퍼스(manifest.json)와 다르게 둬서 list_corpora()가 코퍼스로 착각하지 않게 함
+
+FORMAT_NAME = "kmedi-embeddings"
+FORMAT_VERSION = 1
+DTYPES = ("float32", "float16", "int8")
+MANIFEST_FILE = "store.json"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+FULL_FILE = "full.npy"
+SCORE_CHUNK_ROWS = 8192  # 양자화 행렬을 float32로 바꿔 계산할 때 한 번에 처리할 행 수
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix, dtype):
+    """
+    float32 행렬을 dtype으로 바꿉니다. (vectors, scales)를 돌려주며 scales는 int8일 때만 있습니다.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float32":
+        return matrix, None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = (np.abs(matrix).max(axis=-1, initial=0.0) / 127.0).astype(np.float32)
+        safe = np.where(scales == 0, 1.0, scales)
+        vectors = np.clip(np.rint(matrix / safe[:, None]), -127, 127).astype(np.int8)
+        return vectors, scales
+    raise ValueError(f"지원하지 않는 임베딩 dtype입니다: {dtype} ({'/'.join(DTYPES)})")
+
+
+class EmbeddingStore:
+    """
+    (양자화된) 임베딩 행렬. scores()는 저장 dtype 행렬에서 바로 점수를 계산하고,
+    search(rescore=n)는 상위 n개 후보만 float32 원본으로 다시 계산합니다.
+    """
+    def __init__(self, vectors, scales=None, full=None, info=None):
+        self.vectors = vectors
+        self.scales = scales
+        self.full = full
+        self.info = info or {}
+
+    @classmethod
+    def from_matrix(cls, matrix, dtype="float32", keep_full=False, info=None):
+        full = normalize(matrix)
+        vectors, scales = quantize(full, dtype)
+        return cls(vectors, scales, full if keep_full and dtype != "float32" else None, info)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def dtype(self):
+        return self.vectors.dtype.name
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @property
+    def nbytes(self):
+        """
+        검색에 항상 쓰이는 부분(행렬 + scale)의 크기. 재점수용 원본은 후보 행만 읽으므로 제외
+        """
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query, ids=None):
+        """
+        정규화된 query와의 코사인 유사도. ids가 있으면 그 행만 계산합니다.
+        """
+        query = normalize(query).reshape(-1)
+        rows = len(self) if ids is None else len(ids)
+        out = np.empty(rows, dtype=np.float32)
+        # float16/int8 행렬은 조각마다 같은 float32 버퍼에 풀어서 BLAS 행렬 곱으로 계산 (전체를 float32로 올리지 않음)
+        buffer = None if self.vectors.dtype == np.float32 else np.empty((min(SCORE_CHUNK_ROWS, rows), self.dim), dtype=np.float32)
+        for start in range(0, rows, SCORE_CHUNK_ROWS):
+            stop = min(start + SCORE_CHUNK_ROWS, rows)
+            index = slice(start, stop) if ids is None else ids[start:stop]
+            if buffer is None:
+                chunk = self.vectors[index]
+            else:
+                chunk = buffer[:stop - start]
+                np.copyto(chunk, self.vectors[index])
+            out[start:stop] = chunk @ query
+            if self.scales is not None:
+                out[start:stop] *= self.scales[index]
+        return out
+
+    def rescore(self, query, ids):
+        """
+        ids 행의 float32 원본 점수. 원본이 없으면 scores()와 같습니다.
+        """
+        if self.full is None:
+            return self.scores(query, ids)
+        ids = np.asarray(ids)
+        order = np.argsort(ids)  # memory-map은 정렬된 순서로 읽는 편이 빠름
+        out = np.empty(len(ids), dtype=np.float32)
+        out[order] = np.asarray(self.full[ids[order]], dtype=np.float32) @ normalize(query).reshape(-1)
+        return out
+
+    def search(self, query, ids=None, rescore=0):
+        """
+        (행 번호 배열, 점수 배열)을 점수 내림차순으로 돌려줍니다.
+        rescore > 0이면 상위 rescore개는 float32 원본 점수로 다시 정렬하고 나머지는 저장 dtype 점수 순서를 유지합니다.
+        """
+        ids = None if ids is None else np.asarray(ids)
+        scores = self.scores(query, ids)
+        order = np.argsort(-scores, kind="stable")
+        ranked_ids = order if ids is None else ids[order]
+        ranked_scores = scores[order]
+        if rescore and self.full is not None and len(ranked_ids):
+            head = ranked_ids[:rescore]
+            exact = self.rescore(query, head)
+            head_order = np.argsort(-exact, kind="stable")
+            ranked_ids = np.concatenate([head[head_order], ranked_ids[len(head):]])
+            ranked_scores = np.concatenate([exact[head_order], ranked_scores[len(head):]])
+        return ranked_ids, ranked_scores
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get("format") != FORMAT_NAME or manifest.get("version", 0) > FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def save(path, matrix, dtype, keep_full=True, **info):
+    """
+    matrix(float32)를 정규화/양자화해 path에 저장합니다. 임시 디렉터리에 쓴 뒤 교체하므로 읽는 쪽은 완성된 저장소만 봅니다.
+    info는 store.json에 함께 기록됩니다. (모델 이름, 원본 서명 등)
+    """
+    path = path.rstrip("/")
+    full = normalize(matrix)
+    vectors, scales = quantize(full, dtype)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        np.save(os.path.join(tmp_path, VECTORS_FILE), vectors)
+        if scales is not None:
+            np.save(os.path.join(tmp_path, SCALES_FILE), scales)
+        if keep_full and dtype != "float32":
+            np.save(os.path.join(tmp_path, FULL_FILE), full)
+        manifest = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "count": int(full.shape[0]),
+            "dim": int(full.shape[1]) if full.ndim == 2 else 0,
+            "dtype": dtype,
+            "full": bool(keep_full and dtype != "float32"),
+            **info,
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+def load(path, mmap=True):
+    """
+    저장소를 엽니다. 완성된 저장소가 없으면 None.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+    mmap_mode = "r" if mmap and manifest["count"] else None
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode=mmap_mode)
+    scales_path = os.path.join(path, SCALES_FILE)
+    scales = np.load(scales_path) if os.path.isfile(scales_path) else None
+    full_path = os.path.join(path, FULL_FILE)
+    full = np.load(full_path, mmap_mode=mmap_mode) if manifest.get("full") and os.path.isfile(full_path) else None
+    return EmbeddingStore(vectors, scales, full, manifest)
+
+
+def load_full(path):
+    """
+    저장된 float32 원본 행렬 (float32 저장소면 vectors). 없으면 None.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+    name = VECTORS_FILE if manifest["dtype"] == "float32" else FULL_FILE if manifest.get("full") else None
+    return np.load(os.path.join(path, name)) if name else None
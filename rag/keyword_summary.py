@@ -1,4 +1,3 @@
-from keybert import KeyBERT
 import json
 import os
 import glob
@@ -13,11 +12,18 @@ KOREAN_STOPWORDS = set([
     "대해", "대한", "하지만", "그러나", "즉", "또는", "때문에", "더", "좀", "더욱", "또한"
 ])
 
-kw_model = KeyBERT(model='distilbert-base-nli-mean-tokens')
-
 input_folder = "rag/data/paragraphs"
 output_folder = "rag/data/summaries"
-os.makedirs(output_folder, exist_ok=True)
+
+# KeyBERT는 모델 로드까지 수 초가 걸리므로 import 시점이 아니라 처음 키워드를 뽑을 때 생성
+_kw_model = None
+
+def get_kw_model():
+    global _kw_model
+    if _kw_model is None:
+        from keybert import KeyBERT
+        _kw_model = KeyBERT(model='distilbert-base-nli-mean-tokens')
+    return _kw_model
 
 def clean_text(text):
     # 한글, 영어, 숫자, 공백만 남기고 특수문자 제거
@@ -40,7 +46,7 @@ def clean_keywords(keywords):
 
 def extract_keywords(text, top_n=5):
     try:
-        keywords = kw_model.extract_keywords(
+        keywords = get_kw_model().extract_keywords(
             text,
             keyphrase_ngram_range=(1, 4),  # n-gram 범위 확대
             top_n=top_n * 3,               # 후보 키워드 좀 더 많이 추출 후 필터링
@@ -72,25 +78,28 @@ def extract_keywords_from_qa(text, top_n=5):
     all_keywords = list(dict.fromkeys(question_keywords + answer_keywords))  # 순서 유지 중복 제거
     return all_keywords[:top_n]
 
-for json_path in glob.glob(os.path.join(input_folder, "*.json")):
-    with open(json_path, "r", encoding="utf-8") as f:
-        paragraphs = json.load(f)
+if __name__ == "__main__":
+    os.makedirs(output_folder, exist_ok=True)
+
+    for json_path in glob.glob(os.path.join(input_folder, "*.json")):
+        with open(json_path, "r", encoding="utf-8") as f:
+            paragraphs = json.load(f)
 
-    summaries = []
-    for p in paragraphs:
-        text = p.get("text", "")
-        if not text.strip():
-            continue  # 빈 텍스트 스킵
-        keywords = extract_keywords_from_qa(text, top_n=5)
-        summaries.append({
-            'text': text,
-            'keywords': keywords
-        })
+        summaries = []
+        for p in paragraphs:
+            text = p.get("text", "")
+            if not text.strip():
+                continue  # 빈 텍스트 스킵
+            keywords = extract_keywords_from_qa(text, top_n=5)
+            summaries.append({
+                'text': text,
+                'keywords': keywords
+            })
 
-    filename = os.path.basename(json_path)
-    output_path = os.path.join(output_folder, filename)
+        filename = os.path.basename(json_path)
+        output_path = os.path.join(output_folder, filename)
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(summaries, f, ensure_ascii=False, indent=2)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
 
-    print(f"Saved keyword summary: {output_path}")
+        print(f"Saved keyword summary: {output_path}")
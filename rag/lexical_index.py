@@ -0,0 +1,125 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+# BM25 어휘 색인 (코퍼스 단계에서 만들어 코퍼스 디렉터리에 bm25.json으로 저장)
+# 한국어는 띄어쓰기만으로는 조사/합성어 때문에 잘 맞지 않으므로
+# - 어절 끝의 조사를 떼어낸 어간
+# - 한글 글자 bigram
+# 을 함께 토큰으로 사용합니다.
+
+INDEX_FILE = "bm25.json"
+INDEX_VERSION = 1
+
+# 길이가 긴 것부터 검사해야 "에서"가 "서"보다 먼저 떨어짐
+KOREAN_PARTICLES = sorted([
+    "은", "는", "이", "가", "을", "를", "에", "에서", "에게", "께", "와", "과", "의", "도", "만",
+    "로", "으로", "이나", "나", "하고", "랑", "이랑", "까지", "부터", "보다", "처럼", "마다",
+], key=len, reverse=True)
+
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+
+def strip_particle(word):
+    for particle in KOREAN_PARTICLES:
+        if word.endswith(particle) and len(word) - len(particle) >= 2:
+            return word[:-len(particle)]
+    return word
+
+
+def tokenize(text):
+    tokens = []
+    for word in _TOKEN_PATTERN.findall(text.lower()):
+        if not ("가" <= word[0] <= "힣"):
+            tokens.append(word)
+            continue
+        stem = strip_particle(word)
+        tokens.append(stem)
+        tokens.extend(stem[i:i + 2] for i in range(len(stem) - 1))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, postings, doc_lengths, k1=1.5, b=0.75):
+        self.postings = postings          # 토큰 -> [[문서 번호, 빈도], ...]
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+    @classmethod
+    def build(cls, texts, k1=1.5, b=0.75):
+        postings = defaultdict(list)
+        doc_lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings[token].append([doc_id, tf])
+        return cls(dict(postings), doc_lengths, k1, b)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def search(self, query, top_n=None):
+        """
+        query 토큰이 하나라도 들어 있는 문서만 점수를 매겨 (문서 번호, 점수)를 점수 내림차순으로 돌려줍니다.
+        """
+        n = len(self.doc_lengths)
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        return ranked[:top_n] if top_n else ranked
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "k1": self.k1, "b": self.b,
+                       "doc_lengths": self.doc_lengths, "postings": self.postings},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"지원하지 않는 BM25 색인 버전입니다: {data.get('version')} ({path})")
+        return cls(data["postings"], data["doc_lengths"], data["k1"], data["b"])
+
+
+def document_text(record):
+    # 본문과 KeyBERT 요약 키워드를 함께 색인
+    return f"{record.get('context', '')} {record.get('summary', '')}"
+
+
+def load_for_corpus(corpus_path, records=None):
+    """
+    코퍼스 디렉터리의 bm25.json을 읽습니다. 없으면 records로 메모리에서 만듭니다.
+    """
+    path = os.path.join(corpus_path, INDEX_FILE)
+    if os.path.exists(path):
+        return BM25Index.load(path)
+    if records is None:
+        return None
+    return BM25Index.build(document_text(record) for record in records)
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    여러 순위 목록(항목 id 리스트, 앞쪽이 상위)을 RRF 점수로 합칩니다. {id: 점수}
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] += 1.0 / (k + rank + 1)
+    return fused
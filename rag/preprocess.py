@@ -1,11 +1,14 @@
 import os
+import sys
 import json
 import re
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from docx import Document
 from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-import matplotlib.pyplot as plt
 
 # 문서별 전처리
 def load_paragraphs_from_docx(filepath):
@@ -55,9 +58,11 @@ def clean_paragraph(text):
 def is_question(text):
     return text.strip().endswith("?") or re.match(r"^\d+\.\s.*\?$", text)
 
-def merge_similar_paragraphs(paragraphs, model, threshold=0.8):
+def merge_similar_paragraphs(paragraphs, model, threshold=0.8, embeddings=None):
+    # 임계값만 바꿔 여러 번 병합할 때는 미리 계산한 embeddings를 넘겨 인코딩을 한 번만 수행
     texts = [p["text"] for p in paragraphs]
-    embeddings = model.encode(texts, convert_to_numpy=True)
+    if embeddings is None:
+        embeddings = model.encode(texts, convert_to_numpy=True)
 
     merged_paragraphs = []
     i = 0
@@ -105,65 +110,132 @@ def calculate_optimal_threshold(merged_counts, thresholds):
             return thresholds[max_drop_idx]
     return 0.8
 
-if __name__ == "__main__":
-    folder = 'rag/docs'
-    model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+OUTPUT_DIR = "rag/data/paragraphs"
+
+# 병렬 처리 시 워커 프로세스마다 한 번만 모델을 로드
+_worker_model = None
+
+def _init_worker(model_name, torch_threads):
+    global _worker_model
+    import torch
+    # 워커끼리 코어를 나눠 쓰도록 프로세스당 스레드 수 제한
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name)
+
+def _process_in_worker(full_path, output_dir):
+    return process_document(full_path, _worker_model, output_dir)
+
+def write_json_atomic(output_path, data):
+    # 임시 파일에 쓴 뒤 교체하여 중단되어도 반쯤 쓰인 파일이 남지 않도록 함
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, output_path)
+
+def process_document(full_path, model, output_dir=OUTPUT_DIR):
+    """
+    문서 하나를 전처리하여 병합된 문단 JSON을 저장합니다.
+    (결과 요약 dict 또는 None, 출력할 로그 줄 목록)을 돌려줍니다.
+    """
+    filename = os.path.basename(full_path)
+    logs = []
+    paragraphs = load_paragraphs_from_docx(full_path)
+    paragraphs_dicts = [{"source": filename, "text": p} for p in paragraphs]
+    if not paragraphs_dicts:
+        logs.append(f"{filename}: 내용 없음")
+        return None, logs
+
+    logs.append(f"{filename}: {len(paragraphs)} 문단")
+
+    # 문단 임베딩은 한 번만 계산하고 임계값 탐색(11회)에서 재사용
+    embeddings = model.encode(paragraphs, convert_to_numpy=True)
+    thresholds = np.arange(0.5, 0.96, 0.05)
+    merged_counts = []
+
+    for t in thresholds:
+        merged = merge_similar_paragraphs(paragraphs_dicts, model, threshold=t, embeddings=embeddings)
+        merged_counts.append(len(merged))
+        logs.append(f"  Threshold: {t:.2f} -> 병합 문단 수: {len(merged)}")
+
+    best_threshold = calculate_optimal_threshold(merged_counts, thresholds)
+    logs.append(f"선택된 최적 임계값: {best_threshold:.2f}")
+
+    final_merged = merge_similar_paragraphs(paragraphs_dicts, model, threshold=best_threshold, embeddings=embeddings)
+    logs.append(f"최종 병합 후 문단 수: {len(final_merged)}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".json")
+    write_json_atomic(output_path, final_merged)
+
+    logs.append(f"병합된 문단 저장 완료: {output_path}")
+    return {
+        "filename": filename,
+        "original_paragraphs": len(paragraphs),
+        "final_paragraphs": len(final_merged),
+        "best_threshold": float(best_threshold)
+    }, logs
+
+def report_progress(done, total, started, filename):
+    elapsed = time.time() - started
+    eta = elapsed / done * (total - done)
+    print(f"[{done}/{total}] {filename} 완료 - 경과 {elapsed:.1f}s, 남은 예상 {eta:.1f}s", flush=True)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="docx 문서를 문단 단위로 정리하고 유사 문단을 병합합니다.")
+    parser.add_argument("--jobs", type=int, default=1, help="병렬 처리 프로세스 수 (0이면 CPU 코어 수)")
+    parser.add_argument("--docs", default="rag/docs", help="입력 docx 폴더")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="문단 JSON 출력 폴더")
+    args = parser.parse_args()
+
+    folder = args.docs
+    output_dir = args.output
+    jobs = args.jobs or os.cpu_count() or 1
+
+    paths = [os.path.join(folder, filename) for filename in sorted(os.listdir(folder))
+             if filename.endswith('.docx') and not filename.startswith("~$")]
+    total = len(paths)
     all_results = []
-
-    for filename in os.listdir(folder):
-        if not filename.endswith('.docx') or filename.startswith("~$"):
-            continue
-        full_path = os.path.join(folder, filename)
-        paragraphs = load_paragraphs_from_docx(full_path)
-        paragraphs_dicts = [{"source": filename, "text": p} for p in paragraphs]
-        if not paragraphs_dicts:
-            print(f"{filename}: 내용 없음")
-            continue
-
-        print(f"{filename}: {len(paragraphs)} 문단")
-
-        thresholds = np.arange(0.5, 0.96, 0.05)
-        merged_counts = []
-
-        for t in thresholds:
-            merged = merge_similar_paragraphs(paragraphs_dicts, model, threshold=t)
-            merged_counts.append(len(merged))
-            print(f"  Threshold: {t:.2f} -> 병합 문단 수: {len(merged)}")
-
-        # plt.figure(figsize=(8, 5))
-        # plt.plot(thresholds, merged_counts, marker='o')
-        # plt.xlabel("Cosine Similarity Threshold")
-        # plt.ylabel("Number of Merged Paragraphs")
-        # plt.title(f"Change in Number of Merged Paragraphs by Threshold\n({filename})")
-        # plt.grid(True)
-        # plt.show()
-
-        best_threshold = calculate_optimal_threshold(merged_counts, thresholds)
-        print(f"선택된 최적 임계값: {best_threshold:.2f}")
-
-        final_merged = merge_similar_paragraphs(paragraphs_dicts, model, threshold=best_threshold)
-        print(f"최종 병합 후 문단 수: {len(final_merged)}")
-
-        output_dir = "rag/data/paragraphs"
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".json")
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(final_merged, f, ensure_ascii=False, indent=2)
-
-        print(f"병합된 문단 저장 완료: {output_path}")
-        all_results.append({
-            "filename": filename,
-            "original_paragraphs": len(paragraphs),
-            "final_paragraphs": len(final_merged),
-            "best_threshold": best_threshold
-        })
+    failed = []
+    started = time.time()
+
+    if jobs <= 1:
+        model = SentenceTransformer(MODEL_NAME)
+        for done, full_path in enumerate(paths, 1):
+            result, logs = process_document(full_path, model, output_dir)
+            print("\n".join(logs))
+            if result:
+                all_results.append(result)
+            report_progress(done, total, started, os.path.basename(full_path))
+    else:
+        torch_threads = max(1, (os.cpu_count() or 1) // jobs)
+        print(f"{total}개 문서를 {jobs}개 프로세스로 처리합니다. (프로세스당 스레드 {torch_threads})")
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(MODEL_NAME, torch_threads)) as executor:
+            futures = {executor.submit(_process_in_worker, full_path, output_dir): full_path for full_path in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                filename = os.path.basename(futures[future])
+                try:
+                    result, logs = future.result()
+                except Exception as e:
+                    print(f"{filename}: 처리 실패 - {e}", file=sys.stderr)
+                    failed.append(filename)
+                else:
+                    print("\n".join(logs))
+                    if result:
+                        all_results.append(result)
+                report_progress(done, total, started, filename)
 
     print("\n전체 문서 처리 완료")
-    for res in all_results:
+    for res in sorted(all_results, key=lambda r: r["filename"]):
         print(f"{res['filename']}: 원문 {res['original_paragraphs']} -> 병합 {res['final_paragraphs']} (임계값: {res['best_threshold']:.2f})")
 
-    for f in os.listdir(output_dir):
-        if f.endswith(".docx"):
-            os.remove(os.path.join(output_dir, f))
+    if os.path.isdir(output_dir):
+        for f in os.listdir(output_dir):
+            if f.endswith(".docx"):
+                os.remove(os.path.join(output_dir, f))
+
+    # 직렬 처리처럼 실패한 문서가 있으면 실패로 종료 (재빌드가 문서를 빠뜨린 채 성공으로 끝나지 않도록)
+    if failed:
+        print(f"\n{len(failed)}개 문서 처리 실패: {', '.join(sorted(failed))}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,154 @@
+import hmac
+from functools import wraps
+from flask import Blueprint, request, jsonify, abort, send_file, Response
+from services import semantic_cache, corpus_reload, profiling, rag_service, efcy_index, circuit_breaker, admission
+from config import ADMIN_TOKEN
+
+# 운영/튜닝용 관리자 API. ADMIN_TOKEN이 없으면 모든 경로가 404
+bp = Blueprint('admin', __name__)
+
+
+def admin_required(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            abort(404)
+        token = request.headers.get("X-Admin-Token", "")
+        if not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({"error": "관리자 인증에 실패했습니다."}), 401
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@bp.route('/semantic-cache', methods=['GET'])
+@admin_required
+def semantic_cache_stats():
+    limit = request.args.get("limit", 100, type=int)
+    return jsonify({
+        "stats": semantic_cache.stats(),
+        "samples": semantic_cache.samples(limit)
+    })
+
+
+@bp.route('/semantic-cache/samples/<sample_id>', methods=['POST'])
+@admin_required
+def review_semantic_cache_sample(sample_id):
+    #적중 표본이 잘못된 답변(false hit)이었는지 기록
+    data = request.get_json(silent=True) or {}
+    if not semantic_cache.review_sample(sample_id, bool(data.get("false_hit"))):
+        return jsonify({"error": "표본을 찾을 수 없습니다."}), 404
+    return jsonify({"stats": semantic_cache.stats()})
+
+
+@bp.route('/semantic-cache', methods=['DELETE'])
+@admin_required
+def clear_semantic_cache():
+    return jsonify({"deleted": semantic_cache.clear()})
+
+
+@bp.route('/corpus', methods=['GET'])
+@admin_required
+def corpus_status():
+    #서비스 중인 코퍼스 버전, 로드/빌드 소요 시간, 보관 중인 버전 목록
+    return jsonify(corpus_reload.status())
+
+
+@bp.route('/corpus/reload', methods=['POST'])
+@admin_required
+def reload_corpus():
+    #파이프라인을 백그라운드에서 실행하고 끝나면 새 버전으로 교체
+    if not corpus_reload.rebuild("admin"):
+        return jsonify({"error": "이미 코퍼스를 다시 만드는 중입니다.", "status": corpus_reload.status()}), 409
+    return jsonify({"status": corpus_reload.status()}), 202
+
+
+@bp.route('/corpus/rollback', methods=['POST'])
+@admin_required
+def rollback_corpus():
+    #version을 주지 않으면 바로 이전 버전으로 되돌림
+    data = request.get_json(silent=True) or {}
+    try:
+        version = corpus_reload.rollback(data.get("version"))
+    except corpus_reload.RebuildInProgress:
+        return jsonify({"error": "코퍼스를 다시 만드는 중이라 되돌릴 수 없습니다."}), 409
+    if version is None:
+        return jsonify({"error": "되돌릴 코퍼스 버전이 없습니다."}), 404
+    return jsonify({"version": version, "status": corpus_reload.status()})
+
+
+@bp.route('/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    #PROFILING_ENABLED일 때 저장된 요청 프로파일 목록 (최신 순)
+    return jsonify({"profiles": profiling.list_profiles()})
+
+
+@bp.route('/profiles/<name>', methods=['GET'])
+@admin_required
+def get_profile(name):
+    path = profiling.profile_path(name)
+    if path is None:
+        return jsonify({"error": "프로파일을 찾을 수 없습니다."}), 404
+    if name.endswith(".prof") and request.args.get("format") == "text":
+        limit = request.args.get("limit", 40, type=int)
+        return Response(profiling.profile_text(path, limit), mimetype="text/plain; charset=utf-8")
+    return send_file(path, as_attachment=not name.endswith(".html"), download_name=name)
+
+
+@bp.route('/memory', methods=['GET'])
+@admin_required
+def memory_status():
+    #프로세스 RSS, 검색 모델/코퍼스/효능 색인 크기, tracemalloc 상위 할당 (추적 중일 때)
+    key_type = request.args.get("key_type", "lineno")
+    if key_type not in ("filename", "lineno", "traceback"):
+        return jsonify({"error": "key_type은 filename, lineno, traceback 중 하나여야 합니다."}), 400
+    return jsonify({
+        "process": profiling.process_memory(),
+        "components": {**rag_service.memory_usage(), **efcy_index.memory_usage()},
+        "tracemalloc": profiling.tracemalloc_report(
+            limit=request.args.get("limit", 25, type=int),
+            key_type=key_type,
+            include=request.args.get("include"),
+            compare=request.args.get("compare") in ("1", "true"),
+        ),
+    })
+
+
+@bp.route('/memory/tracemalloc', methods=['POST'])
+@admin_required
+def control_tracemalloc():
+    #start: 추적 시작 (frames만큼 호출 경로 기록), baseline: 비교 기준 스냅샷 저장, stop: 추적 종료
+    data = request.get_json(silent=True) or {}
+    action = data.get("action")
+    if action == "start":
+        profiling.start_tracing(int(data.get("frames", 1)))
+    elif action == "baseline":
+        if not profiling.take_baseline():
+            return jsonify({"error": "tracemalloc 추적 중이 아닙니다."}), 409
+    elif action == "stop":
+        profiling.stop_tracing()
+    else:
+        return jsonify({"error": "action은 start, baseline, stop 중 하나여야 합니다."}), 400
+    return jsonify({"tracing": profiling.is_tracing()})
+
+
+@bp.route('/circuits', methods=['GET'])
+@admin_required
+def circuit_status():
+    #모델별 회로 상태와 최근 창의 호출/실패 수 (이 워커가 호출한 모델 + ?model=로 지정한 모델)
+    return jsonify(circuit_breaker.status(request.args.getlist("model")))
+
+
+@bp.route('/circuits/<path:model>/reset', methods=['POST'])
+@admin_required
+def reset_circuit(model):
+    #시험 호출을 기다리지 않고 회로를 닫음 (OpenAI 복구를 확인한 뒤 사용)
+    circuit_breaker.reset(model)
+    return jsonify(circuit_breaker.status([model]))
+
+
+@bp.route('/admission', methods=['GET'])
+@admin_required
+def admission_status():
+    #라우트별 동시 처리 수/대기열 한도와 현재 처리 중/대기 중 요청 수 (이 워커 기준)
+    return jsonify(admission.status())
@@ -1,19 +1,73 @@
 from flask import Blueprint, request, jsonify, session
 from pymongo import MongoClient
-from openai import OpenAI
 from services.gpt_service import translate_to_user_lang, improved_readability, replace_translated_name
-from services.utils import clean_text, trim_to_token_limit
+from services.utils import clean_text, trim_to_token_limit, submit_with_context
+from services.llm import chat_completion
+from services.metrics import span
+from services import prefetch, formatter
+from services.circuit_breaker import call_or_degrade
 from concurrent.futures import ThreadPoolExecutor
-from config import OPENAI_API_KEY, MONGODB_URI, FINE_TUNE_USEMETHOD_MODEL, FINE_TUNE_ATPN_MODEL
+from config import MONGODB_URI, FINE_TUNE_USEMETHOD_MODEL, FINE_TUNE_ATPN_MODEL, READABILITY_MODE
 import re
 
 #환경 및 라우트 설정
-client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client['K_Medi_Guide']
 collection = db['Api']
 bp = Blueprint('detail', __name__)
 
+#복용법/주의사항 메시지 생성 (select 라우트의 미리 생성에서도 사용)
+#lang을 주지 않으면 세션 언어를 사용하고, check_cancelled는 단계 사이마다 호출됨
+def build_detail_message(original, combined_name, lang=None, check_cancelled=lambda: None):
+    use_text = clean_text(original.get("useMethodQesitm", ""))
+    atpn_text = clean_text(original.get("atpnQesitm", ""))
+    for prefix in ["이 약은", "이 약을", "이 약에"]:
+        if atpn_text.startswith(prefix):
+            atpn_text = atpn_text[len(prefix):].strip()
+            break
+
+    use_text = trim_to_token_limit(use_text, max_tokens=200)
+    atpn_text = trim_to_token_limit(atpn_text, max_tokens=300)
+
+    with ThreadPoolExecutor() as executor:
+        future_use = submit_with_context(executor, lambda: chat_completion(
+            model=FINE_TUNE_USEMETHOD_MODEL,
+            messages=[{"role": "user", "content": use_text}],
+            stage="usemethod_generation",
+            max_tokens=200,
+            temperature=0.7
+        ))
+
+        future_atpn = submit_with_context(executor, lambda: chat_completion(
+            model=FINE_TUNE_ATPN_MODEL,
+            messages=[{"role": "user", "content": atpn_text}],
+            stage="atpn_generation",
+            max_tokens=300,
+            temperature=0.7
+        ))
+
+    #회로가 열려 있으면 DB 원문(정리된 텍스트)을 그대로 사용
+    use_response = call_or_degrade(future_use.result, use_text, "usemethod_generation")
+    atpn_response = call_or_degrade(future_atpn.result, atpn_text, "atpn_generation")
+    check_cancelled()
+
+    if READABILITY_MODE != "llm":
+        #복용법/주의사항을 각각 (병렬) 번역한 뒤 로컬 템플릿으로 마크다운 조립
+        target_lang = lang if lang is not None else (session.get('language') or "ko")
+        if target_lang != "ko":
+            with ThreadPoolExecutor() as executor:
+                future_use = submit_with_context(executor, translate_to_user_lang, use_response, target_lang)
+                future_atpn = submit_with_context(executor, translate_to_user_lang, atpn_response, target_lang)
+            use_response, atpn_response = future_use.result(), future_atpn.result()
+        return formatter.render_detail(combined_name, use_response, atpn_response, target_lang)
+
+    insert_text = f"<<약이름>>"
+    final_message = f"💊{combined_name}{use_response}{atpn_response}"
+    final_message = translate_to_user_lang(final_message, lang)
+    final_message = replace_translated_name(final_message, insert_text, lang)
+    check_cancelled()
+    return improved_readability(final_message, lang, combined_name)
+
 @bp.route('/detail', methods=['POST'])
 def provide_medicine_details():
     #사용자 입력
@@ -37,7 +91,10 @@ def provide_medicine_details():
         #     ]
         # ).choices[0].message.content.strip().upper()
 
+        session_id = session.get('session_id')
         if user_reply == "NO":
+            #미리 생성 중인 detail 메시지는 더 이상 필요 없음
+            prefetch.cancel(session_id)
             return jsonify({"message": translate_to_user_lang("알겠습니다. 복용법과 주의사항은 생략할게요."),
                             "next": "/start",
                             "addMessage": translate_to_user_lang("더 궁금한 게 있으신가요?"),
@@ -51,46 +108,23 @@ def provide_medicine_details():
         name_en = result.get("engName", "")
         combined_name = f"{item_name}({name_en})" if name_en else item_name
 
-        original = collection.find_one({"itemName": {"$regex": re.escape(item_name), "$options": "i"}})
+        #select 응답 직후 미리 생성해 둔 메시지가 있으면 바로 반환
+        prefetched = prefetch.take(session_id, "detail", item_name, session.get('language'))
+        if prefetched:
+            return jsonify({
+                "message": prefetched,
+                "addMessage": translate_to_user_lang("더 궁금한 게 있으신가요?"),
+                "next": "/start",
+                "response_type": "detail_success"
+            })
+
+        with span("mongo_query"):
+            original = collection.find_one({"itemName": {"$regex": re.escape(item_name), "$options": "i"}})
         if not original:
             return jsonify({"error": translate_to_user_lang(f"'{item_name}'에 대한 정보를 찾을 수 없습니다."), "next": "/start", "response_type": "detail_fail"}), 404
 
-        use_text = clean_text(original.get("useMethodQesitm", ""))
-        atpn_text = clean_text(original.get("atpnQesitm", ""))
-        for prefix in ["이 약은", "이 약을", "이 약에"]:
-            if atpn_text.startswith(prefix):
-                atpn_text = atpn_text[len(prefix):].strip()
-                break
-
-        use_text = trim_to_token_limit(use_text, max_tokens=200)
-        atpn_text = trim_to_token_limit(atpn_text, max_tokens=300)
-
-        with ThreadPoolExecutor() as executor:
-            future_use = executor.submit(lambda: client.chat.completions.create(
-                model=FINE_TUNE_USEMETHOD_MODEL,
-                messages=[{"role": "user", "content": use_text}],
-                max_tokens=200,
-                temperature=0.7
-            ).choices[0].message.content.strip())
-
-            future_atpn = executor.submit(lambda: client.chat.completions.create(
-                model=FINE_TUNE_ATPN_MODEL,
-                messages=[{"role": "user", "content": atpn_text}],
-                max_tokens=300,
-                temperature=0.7
-            ).choices[0].message.content.strip())
-
-        use_response = future_use.result()
-        atpn_response = future_atpn.result()
-
-
-        insert_text = f"<<약이름>>"
-        final_message = f"💊{combined_name}{use_response}{atpn_response}"
-        final_message = translate_to_user_lang(final_message)
-        final_message = replace_translated_name(final_message, insert_text)
-        
         return jsonify({
-            "message": improved_readability(final_message),
+            "message": build_detail_message(original, combined_name),
             "addMessage": translate_to_user_lang("더 궁금한 게 있으신가요?"),
             "next": "/start",
             "response_type": "detail_success"
@@ -1,14 +1,12 @@
 from flask import Blueprint, request, jsonify, session
 from pymongo import MongoClient
-from openai import OpenAI
 from services.gpt_service import translate_to_user_lang, extract_medcine_name
-from services.utils import softmax_with_temperature
-from config import OPENAI_API_KEY, MONGODB_URI
-import numpy as np
+from services.metrics import span
+from services import prefetch, candidates as candidate_cache
+from config import MONGODB_URI
 import re
 
 #환경 및 라우트 설정
-client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client['K_Medi_Guide']
 collection = db['Api']
@@ -26,13 +24,20 @@ def extract_and_match_medicine_name():
     #name라우트에서 select라우트로 갈 경우 select출력 문장에서 증상 부분을 제외하기 위한 설정
     session['name_to_select'] = True
 
+    #새로 검색하므로 이전 후보에 대한 미리 생성은 취소
+    session_id = session.get('session_id')
+    prefetch.cancel(session_id)
+
     if not user_input:
         return jsonify({"error": translate_to_user_lang("입력이 필요합니다."), "next": "/name", "response_type": "name_fail"}), 400
     
     #사용자 입력에서 약 이름 추출 및 DB에서 검색
     extracted_name = extract_medcine_name(user_input)
-    query = {"itemName": {"$regex": extracted_name, "$options": "i"}} if re.search(r'[가-힣]', extracted_name) else {"engName": {"$regex": extracted_name, "$options": "i"}}
-    matching_docs = list(collection.find(query))
+    #회로가 열려 있으면 입력 문장이 그대로 오므로 정규식 특수문자는 이스케이프
+    pattern = re.escape(extracted_name)
+    query = {"itemName": {"$regex": pattern, "$options": "i"}} if re.search(r'[가-힣]', extracted_name) else {"engName": {"$regex": pattern, "$options": "i"}}
+    with span("mongo_query"):
+        matching_docs = list(collection.find(query))
 
     #약 검색에 실패할 경우 3회 재시도 가능. 초과할 경우 처음으로 돌아감.
     if not matching_docs:
@@ -42,27 +47,43 @@ def extract_and_match_medicine_name():
             return jsonify({"error": translate_to_user_lang("3회 시도에도 약을 찾지 못했습니다. 처음으로 돌아갑니다."), "next": "/start", "response_type": "name_all_fail"}), 404
         return jsonify({"error": translate_to_user_lang(f"관련된 약 이름을 찾지 못했습니다. 다시 입력해주세요. ({get_retry_count()}/3)"), "next": "/name", "response_type": "name_fail"}), 404
 
-    #가중치를 고려하여 softmax알고리즘에 따라 약을 선택
+    #매칭된 전체 후보를 가중치(softmax) 순서로 섞어 세션에 저장하고 첫 5개를 사용
     weights = [float(doc.get("weight", 1.0)) for doc in matching_docs]
-    probabilities = softmax_with_temperature(weights, temperature=1.0)
-    sampled = np.random.choice(matching_docs, size=min(5, len(matching_docs)), replace=False, p=probabilities)
+    page = candidate_cache.store(session_id, "name", matching_docs, weights,
+                                 lambda doc: {"name_ko": doc.get("itemName", ""), "name_en": doc.get("engName", "")})
+
+    #시도 횟수 초기화 및 정보 반환
+    session['retry_count'] = 0
+    return name_candidates_response(page, "name_success")
+
 
+@bp.route('/name/more', methods=['POST'])
+def more_name_candidates():
+    #직전 /name 검색 결과에서 아직 보여주지 않은 후보를 반환 (LLM/DB 재검색 없음)
+    session['name_to_select'] = True
+    page = candidate_cache.next_page(session.get('session_id'), "name")
+    if page is None:
+        return jsonify({"error": translate_to_user_lang("이전 검색 결과가 없습니다. 약 이름을 다시 입력해주세요."), "next": "/name", "response_type": "name_more_fail"}), 404
+    if not page:
+        return jsonify({"error": translate_to_user_lang("더 이상 보여드릴 약이 없습니다. 다른 약 이름을 입력해주세요."), "next": "/name", "response_type": "name_more_fail"}), 404
+    return name_candidates_response(page, "name_more_success")
+
+
+def name_candidates_response(page, response_type):
     #약 후보 목록을 정리
     candidates = []
-    for doc in sampled:
-        name_ko = doc.get("itemName", "")
-        name_en = doc.get("engName", "")
+    for item in page:
+        name_ko = item["name_ko"]
+        name_en = item["name_en"]
         combined_name = f"{name_ko}({name_en})" if name_en else name_ko
         candidates.append({
             "itemName": combined_name,
             "name_ko": name_ko
         })
 
-    #시도 횟수 초기화 및 정보 반환
-    session['retry_count'] = 0
     return jsonify({
         "medicine_candidates": candidates,
         "message": translate_to_user_lang("다음 중 어떤 약이 궁금하신가요?"),
         "next": "/select",
-        "response_type": "name_success"
+        "response_type": response_type
     })
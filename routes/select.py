@@ -1,19 +1,64 @@
 from flask import Blueprint, request, jsonify, session
 from pymongo import MongoClient
-from openai import OpenAI
 from services.gpt_service import translate_to_user_lang, replace_translated_name, improved_readability
-from services.utils import clean_text
+from services.utils import clean_text, submit_with_context
+from services.llm import chat_completion
+from services.metrics import span
+from services import prefetch, formatter
+from services.circuit_breaker import call_or_degrade
+from routes.detail import build_detail_message
 from concurrent.futures import ThreadPoolExecutor
-from config import OPENAI_API_KEY, MONGODB_URI, FINE_TUNE_SYMPTOM_MODEL, PURE_FINE_TUNE_EFCY_MODEL
+from config import MONGODB_URI, FINE_TUNE_SYMPTOM_MODEL, PURE_FINE_TUNE_EFCY_MODEL, READABILITY_MODE
 import re
 
 #환경 및 라우트 설정
-client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client['K_Medi_Guide']
 collection = db['Api']
 bp = Blueprint('select', __name__)
 
+#효능 데이터 가공
+def prepare_efcy_text(doc):
+    return strip_efcy_prefix(clean_text(doc.get("efcyQesitm", "")))
+
+def strip_efcy_prefix(efcy_raw):
+    if efcy_raw.startswith("이 약은"):
+        efcy_raw = efcy_raw[4:]
+    return efcy_raw
+
+#효능 문장 생성 모델 (symptom 라우트의 미리 생성과 같은 요청이어야 single-flight로 합쳐짐)
+def generate_efcy_response(efcy_raw):
+    return chat_completion(
+        model=PURE_FINE_TUNE_EFCY_MODEL,
+        messages=[{"role": "user", "content": efcy_raw}],
+        stage="efcy_generation",
+        max_tokens=250,
+        temperature=0.8
+    )
+
+#증상 문장 생성 모델
+def generate_symptom_response(symptoms_ko):
+    return chat_completion(
+        model=FINE_TUNE_SYMPTOM_MODEL,
+        messages=[{"role": "user", "content": ", ".join(symptoms_ko)}],
+        stage="symptom_generation",
+        max_tokens=60,
+        temperature=0.8
+    )
+
+#증상/효능 문장을 (번역 후) 로컬 템플릿으로 마크다운 조립. 두 문장의 번역은 병렬로 처리
+def build_select_message(combined_name, efcy_response, symptom_response, symptoms_ko, lang):
+    efcy_sentence = f"{combined_name}은(는) {efcy_response}"
+    if lang == "ko":
+        return formatter.render_select(combined_name, efcy_sentence, symptom_response, lang, symptoms_ko)
+
+    with ThreadPoolExecutor() as executor:
+        future_efcy = submit_with_context(executor, translate_to_user_lang, efcy_sentence, lang)
+        future_symptom = submit_with_context(executor, translate_to_user_lang, symptom_response, lang) if symptom_response else None
+    efcy_sentence = replace_translated_name(future_efcy.result(), formatter.NAME_PLACEHOLDER, lang)
+    symptom_sentence = future_symptom.result() if future_symptom else None
+    return formatter.render_select(combined_name, efcy_sentence, symptom_sentence, lang)
+
 @bp.route("/select", methods=["POST"])
 def select_medicine():
     #사용자 입력
@@ -26,7 +71,8 @@ def select_medicine():
                         "response_type": "select_fail"}), 400
 
     #선택한 약의 정보를 DB에서 검색
-    result = collection.find_one({"itemName": {"$regex": re.escape(selected_name), "$options": "i"}})
+    with span("mongo_query"):
+        result = collection.find_one({"itemName": {"$regex": re.escape(selected_name), "$options": "i"}})
     if not result:
         return jsonify({"error": translate_to_user_lang(f"'{selected_name}' 이름의 약을 찾을 수 없습니다."),
                         "next": "/start",
@@ -41,35 +87,33 @@ def select_medicine():
 
     #선택한 약의 가중치를 업데이트
     current_weight = float(result.get("weight", 1.0))
-    collection.update_one({"_id": result["_id"]}, {"$set": {"weight": round(current_weight + 0.5, 2)}})
+    with span("mongo_update"):
+        collection.update_one({"_id": result["_id"]}, {"$set": {"weight": round(current_weight + 0.5, 2)}})
 
     #효능 데이터 가공
-    efcy_raw = clean_text(result.get("efcyQesitm", ""))
-    if efcy_raw.startswith("이 약은"):
-        efcy_raw = efcy_raw[4:]
+    efcy_raw = prepare_efcy_text(result)
+
+    #symptom 라우트에서 미리 생성해 둔 문장이 있으면 사용
+    session_id = session.get('session_id')
+    has_symptoms = bool(symptoms_ko and isinstance(symptoms_ko, list))
+    lang = session.get('language') or "ko"
+    efcy_response = prefetch.take(session_id, "efcy", name_ko, lang, consume=False)
+    symptom_response = prefetch.take(session_id, "symptom", ", ".join(symptoms_ko), lang, consume=False) if has_symptoms else ""
 
     #증상, 효능 문장 생성 모델 병렬처리
     try:
         with ThreadPoolExecutor() as executor:
-            if symptoms_ko and isinstance(symptoms_ko, list):
-                future_symptom = executor.submit(lambda: client.chat.completions.create(
-                model=FINE_TUNE_SYMPTOM_MODEL,
-                messages=[{"role": "user", "content": ", ".join(symptoms_ko)}],
-                max_tokens=60,
-                temperature=0.8
-            ).choices[0].message.content.strip())
-            
+            if has_symptoms and symptom_response is None:
+                future_symptom = submit_with_context(executor, generate_symptom_response, symptoms_ko)
             else:
                 future_symptom = None
 
-            future_efcy = executor.submit(lambda: client.chat.completions.create(
-                model=PURE_FINE_TUNE_EFCY_MODEL,
-                messages=[{"role": "user", "content": efcy_raw}],
-                max_tokens=250,
-                temperature=0.8
-            ).choices[0].message.content.strip())
-        symptom_response = future_symptom.result() if future_symptom else ""
-        efcy_response = future_efcy.result()
+            future_efcy = submit_with_context(executor, generate_efcy_response, efcy_raw) if efcy_response is None else None
+        #회로가 열려 있으면 효능은 DB 원문(정리된 텍스트), 증상 문장은 생략
+        if future_symptom:
+            symptom_response = call_or_degrade(future_symptom.result, "", "symptom_generation")
+        if future_efcy:
+            efcy_response = call_or_degrade(future_efcy.result, efcy_raw.strip(), "efcy_generation")
     except Exception as e:
         return jsonify({"error": translate_to_user_lang("챗봇 호출 중 오류 발생"), "details": str(e),"next": "/start", "response_type": "select_fail"}), 500
 
@@ -77,21 +121,35 @@ def select_medicine():
     session['results'] = {"itemName": name_ko, "engName": name_en}
     
     #이전 라우트가 name이었는지 확인, 최종 출력 메시지 가공
-    if session.get('name_to_select') is True:
-        final_message = f"{combined_name}은(는) {efcy_response}"
-        insert_text = f"<<약이름>>"
-    else:
-        final_message = f"{symptom_response} {combined_name}은(는) {efcy_response}"
-        insert_text = f"{translate_to_user_lang(symptom_response)} <<약이름>>"
+    from_name = session.get('name_to_select') is True
+    if READABILITY_MODE == "llm":
+        if from_name or not symptom_response:
+            final_message = f"{combined_name}은(는) {efcy_response}"
+            insert_text = f"<<약이름>>"
+        else:
+            final_message = f"{symptom_response} {combined_name}은(는) {efcy_response}"
+            insert_text = f"{translate_to_user_lang(symptom_response)} <<약이름>>"
 
-    final_message = translate_to_user_lang(final_message)
-    final_message = replace_translated_name(final_message, insert_text)
-    final_message = improved_readability(final_message)
+        final_message = translate_to_user_lang(final_message)
+        final_message = replace_translated_name(final_message, insert_text)
+        final_message = improved_readability(final_message)
+    else:
+        final_message = build_select_message(combined_name, efcy_response, None if from_name else symptom_response,
+                                             symptoms_ko if has_symptoms else (), lang)
 
     #정보 반환
-    return jsonify({
+    response = jsonify({
         "message": final_message,
         "addMessage": translate_to_user_lang("복용법과 주의사항도 알려드릴까요?"),
         "next": "/detail",
         "response_type": "select_success"
     })
+
+    #대부분 복용법/주의사항을 이어서 묻기 때문에 응답 전송 직후 detail 메시지를 미리 생성
+    detail_doc = {"useMethodQesitm": result.get("useMethodQesitm", ""), "atpnQesitm": result.get("atpnQesitm", "")}
+    response.call_on_close(lambda: prefetch.schedule(
+        session_id, "detail", name_ko,
+        lambda check_cancelled: build_detail_message(detail_doc, combined_name, lang, check_cancelled),
+        lang
+    ))
+    return response
@@ -2,6 +2,7 @@ import uuid
 from flask import Blueprint, request, jsonify, session
 from services.gpt_fallback import fallback_response
 from services.gpt_service import translate_to_user_lang
+from services import prefetch, admission
 
 bp = Blueprint('start', __name__)
 
@@ -25,6 +26,9 @@ def start_route():
         session_id = session['session_id']
 
     session['retry_count'] = 0
+
+    #처음으로 돌아왔으므로 진행 중인 미리 생성은 취소
+    prefetch.cancel(session_id)
     
     if user_input == "증상" or user_input == "symptom" or user_input == "症状" or user_input == "症状" :
         return jsonify({
@@ -42,9 +46,12 @@ def start_route():
 
     # 기타 입력 → fallback GPT 응답
     else :
-        gpt_reply = fallback_response(user_input)
+        #키워드 분기는 가벼운 라우트로 처리하고, LLM 답변 생성 구간만 따로 수용 제어
+        with admission.admit("start_fallback"):
+            gpt_reply = fallback_response(user_input, session.get('language'))
+    #fallback 답변은 이미 사용자 언어로 생성됨
     return jsonify({
-        "message": translate_to_user_lang(gpt_reply),
+        "message": gpt_reply,
         "next": "/start",
         "response_type": "start_gpt_success"
     })
@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify, session
 from pymongo import MongoClient
-from openai import OpenAI
+from bson import ObjectId
 from services.gpt_service import translate_to_user_lang
-from services.utils import clean_text, softmax_with_temperature
-from bs4 import BeautifulSoup
-import numpy as np
-from config import OPENAI_API_KEY, MONGODB_URI
+from services.utils import clean_text
+from services.html_text import html_to_text
+from services.llm import chat_completion
+from services.metrics import span
+from services import prefetch, efcy_index, candidates as candidate_cache
+from services.circuit_breaker import CircuitOpen, mark_degraded
+from routes.select import strip_efcy_prefix, generate_efcy_response, generate_symptom_response
+from rag.lexical_index import reciprocal_rank_fusion
+from config import MONGODB_URI, PREFETCH_SYMPTOM_CANDIDATES, SYMPTOM_MATCH_MODE
+import re
 
 #환경 및 라우트 설정
-client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client['K_Medi_Guide']
 collection = db['Api']
@@ -28,6 +33,10 @@ def recommend_medicine_by_symptom():
     #이전 라우트 확인
     session['name_to_select'] = False
 
+    #새로 검색하므로 이전 후보에 대한 미리 생성은 취소
+    session_id = session.get('session_id')
+    prefetch.cancel(session_id)
+
     if not symptom_input:
         return jsonify({
             "error": translate_to_user_lang("입력이 필요합니다."),
@@ -47,8 +56,9 @@ def recommend_medicine_by_symptom():
     문장: "{symptom_input}"
 """
     try:
-        extract_response = client.chat.completions.create(
+        symptoms_text = chat_completion(
             model="gpt-3.5-turbo",
+            stage="symptom_extract",
             messages=[
                 {"role": "system", "content": "너는 사용자의 문장에서 의학적 증상을 추출하는 도우미야. 출력은 반드시 한국어 명사형 키워드로 콤마(,)로 나열해."},
                 {"role": "user", "content": "몸이 으슬으슬해"},
@@ -90,8 +100,11 @@ def recommend_medicine_by_symptom():
             ],
             temperature= 0.8
         )
-        symptoms_text = extract_response.choices[0].message.content.strip()
         symptoms_ko = [s.strip() for s in symptoms_text.split(",") if s.strip()]
+    except CircuitOpen:
+        #회로가 열려 있으면 입력 문장에서 바로 뽑은 키워드로 검색
+        mark_degraded("symptom_extract")
+        symptoms_ko = local_symptom_keywords(symptom_input)
     except Exception as e:
         return jsonify({
             "error": translate_to_user_lang("증상 추출 중 오류 발생"),
@@ -107,19 +120,8 @@ def recommend_medicine_by_symptom():
             "response_type": "symptom_fail"
         }), 400
 
-    #DB에서 해당 증상에 효능이 있는 약 검색
-    results = []
-    seen_ids = set()
-    for doc in collection.find({}):
-        efcy_html = doc.get("efcyQesitm", "")
-        plain_efcy = BeautifulSoup(efcy_html, "html.parser").get_text()
-        for symptom in symptoms_ko:
-            if symptom in plain_efcy:
-                _id = str(doc.get("_id"))
-                if _id not in seen_ids:
-                    results.append(doc)
-                    seen_ids.add(_id)
-                break
+    #DB(또는 효능 임베딩 색인)에서 해당 증상에 효능이 있는 약 검색
+    results = find_medicines(symptoms_ko)
 
     #약 검색에 실패할 경우 3회 재시도 가능. 초과할 경우 처음으로 돌아감.
     if not results:
@@ -140,19 +142,133 @@ def recommend_medicine_by_symptom():
     #추출에 성공하면 증상을 사용자 세션에 저장
     session['symptoms_ko'] = symptoms_ko
 
-    #가중치를 고려하여 softmax알고리즘에 따라 약을 선택
+    #매칭된 전체 후보를 가중치(softmax) 순서로 섞어 세션에 저장하고 첫 5개를 사용
     weights = [float(r.get("weight", 1.0)) for r in results]
-    probabilities = softmax_with_temperature(weights, temperature=1.0)
-    sampled = np.random.choice(results, size=min(5, len(results)), replace=False, p=probabilities)
+    page = candidate_cache.store(session_id, "symptom", results, weights, serialize_candidate)
+
+    #시도 횟수 초기화 및 정보 반환
+    session['retry_count'] = 0
+    return symptom_candidates_response(session_id, symptoms_ko, page, "symptom_success")
+
+
+@bp.route('/symptom/more', methods=['POST'])
+def more_symptom_candidates():
+    #직전 /symptom 검색 결과에서 아직 보여주지 않은 후보를 반환 (LLM/DB 재검색 없음)
+    session['name_to_select'] = False
+    session_id = session.get('session_id')
+    symptoms_ko = session.get('symptoms_ko')
+
+    page = candidate_cache.next_page(session_id, "symptom") if symptoms_ko else None
+    if page is None:
+        return jsonify({
+            "error": translate_to_user_lang("이전 검색 결과가 없습니다. 증상을 다시 입력해주세요."),
+            "next": "/symptom",
+            "response_type": "symptom_more_fail"
+        }), 404
+    if not page:
+        return jsonify({
+            "error": translate_to_user_lang("더 이상 보여드릴 약이 없습니다. 다른 증상을 입력해주세요."),
+            "next": "/symptom",
+            "response_type": "symptom_more_fail"
+        }), 404
+
+    prefetch.cancel(session_id)
+    return symptom_candidates_response(session_id, symptoms_ko, page, "symptom_more_success")
+
+
+#증상 추출 모델을 쓸 수 없을 때: 입력을 단어로 나누고 끝에 붙은 조사/어미를 떼어낸 키워드
+_TRAILING_PARTICLES = ("이에요", "예요", "어요", "아요", "해요", "에서", "으로", "이", "가", "은", "는", "을", "를", "도", "에", "요", "고")
+
+def local_symptom_keywords(text):
+    keywords = []
+    for word in re.findall(r"\w+", text):
+        for particle in _TRAILING_PARTICLES:
+            if word.endswith(particle) and len(word) - len(particle) >= 2:
+                word = word[:-len(particle)]
+                break
+        if len(word) >= 2 and word not in keywords:
+            keywords.append(word)
+    return keywords
+
+
+def literal_matches(symptoms_ko):
+    #효능 텍스트에 증상 키워드가 그대로 들어 있는 약과 일치한 키워드 수
+    matches = []
+    seen_ids = set()
+    with span("symptom_scan"):
+        for doc in collection.find({}):
+            efcy_html = doc.get("efcyQesitm", "")
+            plain_efcy = html_to_text(efcy_html)
+            matched = sum(1 for symptom in symptoms_ko if symptom in plain_efcy)
+            if matched:
+                _id = str(doc.get("_id"))
+                if _id not in seen_ids:
+                    matches.append((doc, matched))
+                    seen_ids.add(_id)
+    return matches
+
+
+def with_current_weights(semantic):
+    #색인의 weight는 빌드 시점 값이므로 (/select에서 선택될 때마다 올라감) 검색할 때 DB의 현재 weight로 바꿈
+    ids = [record["id"] for record, score in semantic]
+    if not ids:
+        return semantic
+    query_ids = [ObjectId(_id) if ObjectId.is_valid(_id) else _id for _id in ids]
+    with span("mongo_query"):
+        current = {str(doc["_id"]): doc.get("weight", 1.0)
+                   for doc in collection.find({"_id": {"$in": query_ids}}, {"weight": 1})}
+    return [({**record, "weight": float(current.get(record["id"], record.get("weight", 1.0)))}, score)
+            for record, score in semantic]
+
+
+def find_medicines(symptoms_ko):
+    """
+    SYMPTOM_MATCH_MODE
+    - literal: 효능 텍스트 부분 문자열 일치 (전체 스캔)
+    - semantic: 효능 임베딩 색인에서 증상과 유사한 상위 약 (DB 스캔 없음)
+    - hybrid: 두 결과를 RRF로 합친 순서
+    색인이 없으면 literal로 동작합니다.
+    """
+    semantic = efcy_index.search(symptoms_ko) if SYMPTOM_MATCH_MODE in ("semantic", "hybrid") else None
+    if semantic is not None:
+        semantic = with_current_weights(semantic)
+    if semantic is not None and SYMPTOM_MATCH_MODE == "semantic":
+        return [record for record, score in semantic]
 
+    literal = literal_matches(symptoms_ko)
+    if semantic is None:
+        return [doc for doc, matched in literal]
+
+    literal.sort(key=lambda x: x[1], reverse=True)
+    docs = {}
+    for doc, matched in literal:
+        docs[str(doc.get("_id"))] = doc
+    for record, score in semantic:
+        docs.setdefault(record["id"], record)
+    fused = reciprocal_rank_fusion([
+        [str(doc.get("_id")) for doc, matched in literal],
+        [record["id"] for record, score in semantic],
+    ])
+    return [docs[_id] for _id in sorted(fused, key=fused.get, reverse=True)]
+
+
+def serialize_candidate(doc):
+    return {
+        "name_ko": doc.get("itemName", ""),
+        "name_en": doc.get("engName", ""),
+        "efcy_raw": clean_text(doc.get("efcyQesitm", "")),
+        "weight": float(doc.get("weight", 1.0))
+    }
+
+
+def symptom_candidates_response(session_id, symptoms_ko, page, response_type):
     #약 후보 목록을 정리
     candidates = []
-    for r in sampled:
-        name_ko = r.get("itemName", "")
-        name_en = r.get("engName", "")
+    for item in page:
+        name_ko = item["name_ko"]
+        name_en = item["name_en"]
         combined_name = f"{name_ko} ({name_en})" if name_en else name_ko
-        efcy_raw = clean_text(r.get("efcyQesitm", ""))
-        translated_efcy = translate_to_user_lang(efcy_raw)
+        translated_efcy = translate_to_user_lang(item["efcy_raw"])
 
         candidates.append({
             "itemName": combined_name,
@@ -160,11 +276,24 @@ def recommend_medicine_by_symptom():
             "efcyQesitm": translated_efcy
         })
 
-    #시도 횟수 초기화 및 정보 반환
-    session['retry_count'] = 0
-    return jsonify({
+    response = jsonify({
         "medicine_candidates": candidates,
         "message": translate_to_user_lang("다음 중 어떤 약이 궁금하신가요?"),
         "next": "/select",
-        "response_type": "symptom_success"
+        "response_type": response_type
     })
+
+    #선택될 가능성이 높은(가중치 높은) 후보의 select 문장을 응답 전송 직후 미리 생성
+    likely = sorted(page, key=lambda item: item["weight"], reverse=True)[:PREFETCH_SYMPTOM_CANDIDATES]
+    likely = [(item["name_ko"], strip_efcy_prefix(item["efcy_raw"])) for item in likely]
+    lang = session.get('language')
+
+    def schedule_prefetch():
+        prefetch.schedule(session_id, "symptom", ", ".join(symptoms_ko),
+                          lambda check_cancelled: generate_symptom_response(symptoms_ko), lang)
+        for name_ko, efcy_raw in likely:
+            prefetch.schedule(session_id, "efcy", name_ko,
+                              lambda check_cancelled, efcy_raw=efcy_raw: generate_efcy_response(efcy_raw), lang)
+
+    response.call_on_close(schedule_prefetch)
+    return response
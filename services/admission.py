@@ -0,0 +1,222 @@
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from flask import has_request_context, jsonify, request, session
+from config import (ADMISSION_ENABLED, ADMISSION_LLM_CONCURRENCY, ADMISSION_LLM_QUEUE, ADMISSION_LLM_WAIT,
+                    ADMISSION_CHEAP_CONCURRENCY, ADMISSION_CHEAP_QUEUE, ADMISSION_CHEAP_WAIT, ADMISSION_LIMITS)
+from services.metrics import inc, register_gauge, span
+
+# 라우트별 수용 제어(admission control)와 부하 차단(load shedding)
+# - 라우트마다 동시 처리 수와 대기열 길이/대기 시간 상한을 둠
+#   llm  : 수 초씩 걸리는 LLM 호출 라우트. 동시 처리 수를 제한하고 대기열에서 잠시 기다릴 수 있음
+#   cheap: 세션 생성, 키워드 분기, 캐시된 후보 넘기기처럼 가벼운 라우트. 따로 넉넉한 자리를 두고 오래 기다리지 않음
+#   (LLM 라우트가 몰려도 가벼운 라우트는 자기 자리로 바로 처리되어 꼬리 지연이 늘지 않음)
+# - 대기열이 가득 찼거나 대기 시간을 넘기면 바로 503 + Retry-After + 다시 시도할 "next" 경로
+#   (거절 응답은 번역 LLM을 부르지 않도록 언어별 고정 문구 사용)
+# - 라우트별 처리 중/대기 중 수는 게이지로, 거절 수는 카운터로, 대기 시간은 admission_wait 단계로 기록
+# LLM 호출 마감 시간(LLM_REQUEST_DEADLINE)은 대기열에서 기다린 시간도 포함합니다.
+
+LLM = "llm"
+CHEAP = "cheap"
+
+# endpoint -> (풀 이름, 종류, 다시 시도할 경로)
+ROUTES = {
+    "start.makeSession": ("makeSession", CHEAP, "/makeSession"),
+    "start.start_route": ("start", CHEAP, "/start"),
+    "symptom.recommend_medicine_by_symptom": ("symptom", LLM, "/symptom"),
+    "symptom.more_symptom_candidates": ("symptom_more", CHEAP, "/symptom/more"),
+    "name.extract_and_match_medicine_name": ("name", LLM, "/name"),
+    "name.more_name_candidates": ("name_more", CHEAP, "/name/more"),
+    "select.select_medicine": ("select", LLM, "/select"),
+    "detail.provide_medicine_details": ("detail", LLM, "/detail"),
+}
+# 라우트 안에서 admit()으로 따로 받는 구간 (/start 자유 질문 답변)
+SECTIONS = {
+    "start_fallback": (LLM, "/start"),
+}
+
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 30
+
+MESSAGES = {
+    "ko": "지금 요청이 많아 처리하지 못했어요. 잠시 후 다시 시도해주세요.",
+    "en": "We're handling too many requests right now. Please try again in a moment.",
+    "ja": "ただいまリクエストが集中しています。しばらくしてからもう一度お試しください。",
+    "zh": "当前请求过多，请稍后再试。",
+}
+LANG_ALIASES = {"jp": "ja", "cn": "zh", "zh-cn": "zh", "zh-tw": "zh"}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, pool, reason):
+        super().__init__(f"{pool.name} 수용 거절 ({reason})")
+        self.pool = pool
+        self.reason = reason
+
+
+class RoutePool:
+    """
+    동시 처리 수 제한 + 길이 제한이 있는 대기열.
+    """
+    def __init__(self, name, kind, next_path, concurrency, queue, wait):
+        self.name = name
+        self.kind = kind
+        self.next_path = next_path
+        self.concurrency = max(1, int(concurrency))
+        self.queue = max(0, int(queue))
+        self.wait = float(wait)
+        self.in_flight = 0
+        self.queued = 0
+        self.service_time = None  # 처리 시간 이동 평균(초), Retry-After 추정용
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        admitted(바로 들어감) / queued(기다린 뒤 들어감) / queue_full / queue_timeout(거절) 중 하나를 돌려줍니다.
+        """
+        with self._cond:
+            # 먼저 기다리던 요청이 있으면 새치기하지 않음
+            if self.in_flight < self.concurrency and self.queued == 0:
+                self.in_flight += 1
+                return "admitted"
+            if self.queued >= self.queue:
+                return "queue_full"
+            self.queued += 1
+            end = time.monotonic() + self.wait
+            try:
+                while self.in_flight >= self.concurrency:
+                    remaining = end - time.monotonic()
+                    if remaining <= 0:
+                        return "queue_timeout"
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                return "queued"
+            finally:
+                self.queued -= 1
+
+    def release(self, elapsed):
+        with self._cond:
+            self.in_flight -= 1
+            self.service_time = elapsed if self.service_time is None else 0.8 * self.service_time + 0.2 * elapsed
+            self._cond.notify()
+
+    def retry_after(self):
+        # 대기열이 한 바퀴 도는 데 걸릴 시간
+        estimate = (self.service_time or 1.0) * (self.queued + 1) / self.concurrency
+        return int(min(RETRY_AFTER_MAX, max(RETRY_AFTER_MIN, math.ceil(estimate))))
+
+    def status(self):
+        return {"kind": self.kind, "in_flight": self.in_flight, "queued": self.queued,
+                "concurrency": self.concurrency, "queue": self.queue, "wait": self.wait,
+                "service_time": round(self.service_time, 3) if self.service_time is not None else None}
+
+
+def _build_pool(name, kind, next_path):
+    if kind == LLM:
+        limits = {"concurrency": ADMISSION_LLM_CONCURRENCY, "queue": ADMISSION_LLM_QUEUE, "wait": ADMISSION_LLM_WAIT}
+    else:
+        limits = {"concurrency": ADMISSION_CHEAP_CONCURRENCY, "queue": ADMISSION_CHEAP_QUEUE, "wait": ADMISSION_CHEAP_WAIT}
+    limits.update(ADMISSION_LIMITS.get(name, {}))
+    pool = RoutePool(name, kind, next_path, **limits)
+    register_gauge("kmedi_admission_in_flight", lambda: pool.in_flight, route=name, kind=kind)
+    register_gauge("kmedi_admission_queued", lambda: pool.queued, route=name, kind=kind)
+    return pool
+
+
+_pools = {name: _build_pool(name, kind, next_path) for name, kind, next_path in ROUTES.values()}
+_pools.update({name: _build_pool(name, kind, next_path) for name, (kind, next_path) in SECTIONS.items()})
+
+
+def _enter(pool):
+    with span("admission_wait", route=pool.name):
+        result = pool.acquire()
+    inc("kmedi_admission_total", route=pool.name, result=result)
+    if result not in ("admitted", "queued"):
+        raise AdmissionRejected(pool, result)
+    return time.perf_counter()
+
+
+@contextmanager
+def admit(section):
+    """
+    라우트 안의 무거운 구간을 따로 수용 제어합니다. 거절되면 AdmissionRejected (init_app의 핸들러가 503으로 바꿈)
+    요청이 라우트 자리를 잡고 있으면 먼저 돌려줍니다. (LLM 자리를 기다리는 동안 가벼운 라우트 자리를 붙잡지 않도록)
+
+        with admission.admit("start_fallback"):
+            ...
+    """
+    pool = _pools[section]
+    if not ADMISSION_ENABLED:
+        yield
+        return
+    _release_route()
+    entered = _enter(pool)
+    try:
+        yield
+    finally:
+        pool.release(time.perf_counter() - entered)
+
+
+def _release_route():
+    admitted = request.environ.pop("kmedi.admission", None) if has_request_context() else None
+    if admitted is not None:
+        route_pool, entered = admitted
+        route_pool.release(time.perf_counter() - entered)
+
+
+def _message():
+    try:
+        lang = (session.get('language') or "ko").lower()
+    except Exception:
+        lang = "ko"
+    return MESSAGES.get(LANG_ALIASES.get(lang, lang), MESSAGES["en"])
+
+
+def rejected_response(pool, reason):
+    retry_after = pool.retry_after()
+    response = jsonify({
+        "error": _message(),
+        "next": pool.next_path,
+        "retry_after": retry_after,
+        "reason": reason,
+        "response_type": "overloaded",
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def status():
+    return {"enabled": ADMISSION_ENABLED, "routes": {name: pool.status() for name, pool in _pools.items()}}
+
+
+def init_app(app):
+    """
+    라우트별 수용 제어 훅과 거절(503) 핸들러를 등록합니다. ADMISSION_ENABLED가 아니면 아무것도 등록하지 않습니다.
+    """
+    if not ADMISSION_ENABLED:
+        return
+
+    @app.before_request
+    def _admit_request():
+        route = ROUTES.get(request.endpoint)
+        if route is None:
+            return None
+        pool = _pools[route[0]]
+        try:
+            request.environ["kmedi.admission"] = (pool, _enter(pool))
+        except AdmissionRejected as e:
+            logging.info(f"수용 거절 ({pool.name}, {e.reason}): 처리 중 {pool.in_flight}, 대기 {pool.queued}")
+            return rejected_response(pool, e.reason)
+        return None
+
+    @app.teardown_request
+    def _release_request(exc):
+        _release_route()
+
+    @app.errorhandler(AdmissionRejected)
+    def _rejected(e):
+        logging.info(f"수용 거절 ({e.pool.name}, {e.reason}): 처리 중 {e.pool.in_flight}, 대기 {e.pool.queued}")
+        return rejected_response(e.pool, e.reason)
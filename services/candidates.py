@@ -0,0 +1,73 @@
+import json
+import logging
+import numpy as np
+from config import CANDIDATE_CACHE_TTL, CANDIDATE_CACHE_MAX
+from services.redis_client import redis_client
+from services.session_store import write_batch
+from services.utils import softmax_with_temperature
+
+# symptom/name 라우트의 후보 결과 캐시
+# - 매칭된 전체 후보를 가중치 기반 비복원 추출 순서로 한 번만 섞어서 세션 단위로 Redis 리스트에 저장
+#   (Gumbel-top-k: log(p) + Gumbel 잡음으로 정렬하면 np.random.choice(replace=False, p=p)와 같은 분포)
+# - "다른 후보 보기"(/symptom/more, /name/more)에서는 LLM/Mongo 없이 커서만 옮겨 다음 k개를 O(k)로 꺼냄
+#   (같은 입력을 다시 보내면 라우트가 새로 검색함)
+# - 섞은 순서의 앞쪽 CANDIDATE_CACHE_MAX개만 저장하므로 "다른 후보 보기"도 그 개수까지만 이어짐
+
+
+def _keys(session_id, kind):
+    base = f"candidates:{session_id}:{kind}"
+    return base, f"{base}:cursor"
+
+
+def weighted_order(weights, temperature=1.0, rng=None):
+    """
+    가중치 softmax 확률로 비복원 추출한 순서(인덱스 배열)를 돌려줍니다.
+    """
+    rng = rng or np.random.default_rng()
+    probabilities = softmax_with_temperature(weights, temperature=temperature)
+    with np.errstate(divide="ignore"):
+        keys = np.log(probabilities) + rng.gumbel(size=len(probabilities))
+    return np.argsort(-keys)
+
+
+def store(session_id, kind, docs, weights, serialize, page_size=5):
+    """
+    docs를 섞은 순서에서 앞쪽 CANDIDATE_CACHE_MAX개만 serialize(doc) -> dict로 줄여 저장하고
+    첫 page_size개를 돌려줍니다. 세션이 없거나 Redis 오류가 나도 첫 페이지는 항상 돌려줍니다.
+    """
+    order = weighted_order(weights)[:CANDIDATE_CACHE_MAX]
+    ordered = [serialize(docs[i]) for i in order]
+    first_page = ordered[:page_size]
+    if not session_id:
+        return first_page
+
+    list_key, cursor_key = _keys(session_id, kind)
+    try:
+        # 다음 요청("다른 후보 보기")부터 읽으므로 세션 저장과 함께 한 번에 기록
+        with write_batch() as pipe:
+            pipe.delete(list_key)
+            if ordered:
+                pipe.rpush(list_key, *[json.dumps(item, ensure_ascii=False) for item in ordered])
+            pipe.set(cursor_key, len(first_page), ex=CANDIDATE_CACHE_TTL)
+            pipe.expire(list_key, CANDIDATE_CACHE_TTL)
+    except Exception as e:
+        logging.warning(f"후보 캐시 저장 실패: {e}")
+    return first_page
+
+
+def next_page(session_id, kind, page_size=5):
+    """
+    캐시된 후보에서 다음 page_size개를 꺼냅니다. 캐시가 없으면 None, 다 썼으면 빈 리스트.
+    """
+    if not session_id:
+        return None
+    list_key, cursor_key = _keys(session_id, kind)
+    try:
+        if not redis_client.exists(list_key):
+            return None
+        end = redis_client.incrby(cursor_key, page_size)
+        raw = redis_client.lrange(list_key, end - page_size, end - 1)
+    except Exception as e:
+        logging.warning(f"후보 캐시 조회 실패: {e}")
+        return None
+    return [json.loads(item) for item in raw]
@@ -0,0 +1,243 @@
+import contextvars
+import logging
+import threading
+import time
+from flask import current_app, request
+from config import (CB_ENABLED, CB_SLOW_SECONDS, CB_FAILURE_RATE, CB_MIN_CALLS,
+                    CB_WINDOW, CB_OPEN_SECONDS, LLM_TIMEOUT)
+from services.redis_client import redis_client
+from services.metrics import inc, register_gauge
+
+# 모델별 회로 차단기 (OpenAI 지연/오류가 SLO를 넘으면 잠시 호출을 끊고 라우트는 로컬 응답으로 대체)
+# - 호출마다 CB_WINDOW초 이동 창(WINDOW_BUCKETS개 버킷)에 호출 수와 실패 수를 기록
+#   실패: CB_SLOW_SECONDS보다 오래 걸렸거나 타임아웃/429/5xx/연결 오류로 끝난 호출
+# - 창 안의 호출이 CB_MIN_CALLS 이상이고 실패 비율이 CB_FAILURE_RATE 이상이면 열림(open)
+# - 열린 뒤 CB_OPEN_SECONDS가 지나면 반열림(half-open): 워커 전체에서 한 호출만 시험으로 보내고
+#   성공하면 닫힘, 실패하면 다시 열림. 나머지 호출은 그동안 CircuitOpen으로 바로 실패
+# - 상태와 창은 Redis에 두어 워커끼리 공유하고, 각 워커는 상태를 STATE_CACHE_SECONDS 동안 캐시
+#   (Redis 장애 시에는 닫힘으로 보고 그대로 호출)
+# - 라우트가 대체 응답을 쓰면 mark_degraded()로 기록하고, 응답 JSON에 "degraded": true와 X-Degraded 헤더를 붙임
+
+WINDOW_BUCKETS = 6
+STATE_CACHE_SECONDS = 1.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 0.5, OPEN: 1}
+
+_states = {}  # model -> (state, 캐시 만료 시각)
+_states_lock = threading.Lock()
+
+# 요청(또는 미리 생성 작업) 단위 대체 응답 사유. 스레드풀 작업에서도 같은 set에 기록되도록 set 자체를 담음
+_degraded = contextvars.ContextVar("degraded", default=None)
+
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, model):
+        super().__init__(f"{model} 회로가 열려 있어 호출하지 않습니다. (OpenAI 지연/오류 증가)")
+        self.model = model
+
+
+def _key(model, name):
+    return f"cb:{model}:{name}"
+
+
+def _bucket_seconds():
+    return max(CB_WINDOW / WINDOW_BUCKETS, 0.001)
+
+
+def _bucket_keys(model, now=None):
+    current = int((now or time.time()) // _bucket_seconds())
+    return [_key(model, f"w:{current - i}") for i in range(WINDOW_BUCKETS)]
+
+
+def _read_state(model):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.exists(_key(model, "open"))
+    pipe.exists(_key(model, "tripped"))
+    is_open, tripped = pipe.execute()
+    return OPEN if is_open else HALF_OPEN if tripped else CLOSED
+
+
+def _set_cached(model, state):
+    with _states_lock:
+        if model not in _states:
+            register_gauge("kmedi_circuit_open", lambda model=model: _STATE_VALUES[state_of(model)], model=model)
+        _states[model] = (state, time.monotonic() + STATE_CACHE_SECONDS)
+
+
+def state_of(model):
+    """
+    모델의 회로 상태 (closed / open / half_open). 워커별로 STATE_CACHE_SECONDS 동안 캐시합니다.
+    """
+    if not CB_ENABLED:
+        return CLOSED
+    with _states_lock:
+        cached = _states.get(model)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    try:
+        state = _read_state(model)
+    except Exception as e:
+        logging.warning(f"회로 상태 조회 실패, 닫힘으로 봅니다 ({model}): {type(e).__name__}: {e}")
+        state = CLOSED
+    _set_cached(model, state)
+    return state
+
+
+def before_call(model):
+    """
+    호출 전에 확인합니다. 열려 있으면 CircuitOpen, 반열림이면 시험 호출 하나만 통과시킵니다.
+    시험 호출이면 True를 돌려주며, 결과는 record(..., probe=True)로 알려야 합니다.
+    """
+    state = state_of(model)
+    if state == CLOSED:
+        return False
+    if state == HALF_OPEN:
+        try:
+            if redis_client.set(_key(model, "probe"), b"1", nx=True, px=int(LLM_TIMEOUT * 1000)):
+                inc("kmedi_circuit_calls_total", model=model, result="probe")
+                return True
+        except Exception as e:
+            logging.warning(f"회로 시험 호출 예약 실패 ({model}): {type(e).__name__}: {e}")
+            return False
+    inc("kmedi_circuit_calls_total", model=model, result="rejected")
+    raise CircuitOpen(model)
+
+
+def record(model, elapsed, ok, probe=False):
+    """
+    호출 결과를 기록합니다. ok=None이면 지연/가용성과 무관한 실패(잘못된 요청 등)라서 창에 넣지 않습니다.
+    """
+    if not CB_ENABLED:
+        return
+    failed = ok is not None and (not ok or elapsed > CB_SLOW_SECONDS)
+    try:
+        if probe:
+            if ok is None:
+                redis_client.delete(_key(model, "probe"))
+            elif failed:
+                _trip(model, "시험 호출 실패")
+            else:
+                reset(model)
+            return
+        if ok is None:
+            return
+
+        keys = _bucket_keys(model)
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hincrby(keys[0], "calls", 1)
+        if failed:
+            pipe.hincrby(keys[0], "failures", 1)
+        pipe.expire(keys[0], int(CB_WINDOW + _bucket_seconds()) + 1)
+        if failed:
+            # 실패했을 때만 창 전체를 읽어서 판단 (성공 호출은 쓰기만)
+            for key in keys:
+                pipe.hmget(key, "calls", "failures")
+        results = pipe.execute()
+    except Exception as e:
+        logging.warning(f"회로 호출 기록 실패 ({model}): {type(e).__name__}: {e}")
+        return
+
+    if failed:
+        counts = results[3:]
+        calls = sum(int(c or 0) for c, f in counts)
+        failures = sum(int(f or 0) for c, f in counts)
+        if calls >= CB_MIN_CALLS and failures / calls >= CB_FAILURE_RATE:
+            _trip(model, f"최근 {CB_WINDOW:.0f}초 {calls}건 중 {failures}건 지연/실패")
+
+
+def _trip(model, reason):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(_key(model, "open"), b"1", px=int(CB_OPEN_SECONDS * 1000))
+    # 시험 호출이 성공할 때까지 남는 표시 (트래픽이 계속 없으면 저절로 닫힘)
+    pipe.set(_key(model, "tripped"), b"1", px=int((CB_OPEN_SECONDS + CB_WINDOW) * 1000))
+    pipe.delete(_key(model, "probe"), *_bucket_keys(model))
+    pipe.execute()
+    _set_cached(model, OPEN)
+    inc("kmedi_circuit_trips_total", model=model)
+    logging.warning(f"{model} 회로 열림 ({CB_OPEN_SECONDS:.0f}초): {reason}")
+
+
+def reset(model):
+    """
+    회로를 닫고 창을 비웁니다. (시험 호출 성공, 관리자 API)
+    """
+    redis_client.delete(_key(model, "open"), _key(model, "tripped"), _key(model, "probe"), *_bucket_keys(model))
+    _set_cached(model, CLOSED)
+    logging.info(f"{model} 회로 닫힘")
+
+
+def status(models=()):
+    """
+    이 워커가 호출한 적 있는 모델들(과 models)의 회로 상태와 현재 창의 호출/실패 수
+    """
+    with _states_lock:
+        models = sorted(set(_states) | set(models), key=str)
+    result = {"enabled": CB_ENABLED, "slow_seconds": CB_SLOW_SECONDS, "failure_rate": CB_FAILURE_RATE,
+              "min_calls": CB_MIN_CALLS, "window_seconds": CB_WINDOW, "open_seconds": CB_OPEN_SECONDS, "models": {}}
+    for model in models:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in _bucket_keys(model):
+            pipe.hmget(key, "calls", "failures")
+        pipe.pttl(_key(model, "open"))
+        *counts, open_ms = pipe.execute()
+        result["models"][str(model)] = {
+            "state": _read_state(model),
+            "calls": sum(int(c or 0) for c, f in counts),
+            "failures": sum(int(f or 0) for c, f in counts),
+            "reopens_in": round(open_ms / 1000, 1) if open_ms and open_ms > 0 else None,
+        }
+    return result
+
+
+def track_degraded():
+    """
+    현재 컨텍스트(요청, 미리 생성 작업)에서 대체 응답 사유를 모으기 시작합니다.
+    """
+    _degraded.set(set())
+
+
+def mark_degraded(reason):
+    reasons = _degraded.get()
+    if reasons is not None:
+        reasons.add(reason)
+    inc("kmedi_degraded_total", reason=reason)
+
+
+def degraded_reasons():
+    return sorted(_degraded.get() or ())
+
+
+def call_or_degrade(fn, fallback, reason):
+    """
+    fn()을 호출하고, 회로가 열려 있으면 fallback(값 또는 함수)을 대신 돌려주며 대체 응답으로 기록합니다.
+    """
+    try:
+        return fn()
+    except CircuitOpen:
+        mark_degraded(reason)
+        return fallback() if callable(fallback) else fallback
+
+
+def init_app(app):
+    """
+    요청마다 대체 응답 사유를 모으고, 있으면 JSON 응답에 "degraded": true와 X-Degraded 헤더를 붙입니다.
+    """
+    @app.before_request
+    def _track_degraded():
+        track_degraded()
+
+    @app.after_request
+    def _flag_degraded(response):
+        reasons = degraded_reasons()
+        if not reasons:
+            return response
+        response.headers["X-Degraded"] = ",".join(reasons)
+        body = response.get_json(silent=True) if response.is_json else None
+        if isinstance(body, dict):
+            body["degraded"] = True
+            response.set_data(current_app.json.dumps(body))
+        logging.info(f"대체 응답 ({request.path}): {', '.join(reasons)}")
+        return response
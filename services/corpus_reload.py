@@ -0,0 +1,267 @@
+import glob
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from config import RAG_JOBS, RAG_CORPUS_VERSIONS_DIR, RAG_CORPUS_KEEP_VERSIONS, RAG_WATCH_INTERVAL
+from services import rag_service
+from services.redis_client import redis_client
+from services.metrics import inc, register_gauge
+from rag import corpus_versions
+from rag.corpus_store import list_corpora
+
+# RAG 코퍼스 무중단 재빌드/교체
+# - rebuild(): 요청 경로 밖(백그라운드 스레드)에서 파이프라인을 돌려 새 코퍼스 버전 디렉터리를 만들고,
+#   검색용 임베딩까지 메모리에 올린 뒤 CURRENT 포인터와 서비스 중인 캐시를 한 번에 교체
+# - rollback(): 이전 버전으로 포인터와 캐시를 되돌림
+# - 감시 스레드(RAG_WATCH_INTERVAL): rag/docs 변경 시 재빌드, 다른 워커가 CURRENT를 바꾸면 그 버전으로 교체
+# 여러 워커가 동시에 재빌드하지 않도록 Redis 락을 사용 (Redis 장애 시에는 워커 내 락만 사용)
+
+DOCS_DIR = "rag/docs"
+INTERMEDIATE_DIRS = ("rag/data/paragraphs", "rag/data/summaries")
+REBUILD_LOCK_KEY = "rag:rebuild:lock"
+REBUILD_LOCK_TTL = 3600  # 파이프라인 최대 소요 시간(초)
+
+_lock = threading.Lock()  # 워커 내 재빌드/교체 직렬화
+_state = {"building": False, "reason": None, "started_at": None, "last_error": None, "last_build": None}
+_watcher = None
+
+
+class RebuildInProgress(Exception):
+    pass
+
+
+def docs_signature(docs_dir=DOCS_DIR):
+    """
+    docx 파일 이름/크기/수정 시각 목록. 내용이 바뀌면 달라집니다.
+    """
+    if not os.path.isdir(docs_dir):
+        return []
+    signature = []
+    for name in sorted(os.listdir(docs_dir)):
+        if name.endswith(".docx") and not name.startswith("~$"):
+            stat = os.stat(os.path.join(docs_dir, name))
+            signature.append([name, stat.st_size, int(stat.st_mtime)])
+    return signature
+
+
+def built_signature(root=None):
+    """
+    가장 최근에 빌드한 버전의 문서 서명 (빌드한 버전이 없으면 None)
+    되돌린(rollback) 버전이 아니라 최신 빌드와 비교해야 감시/시작 시 재빌드가 되돌리기를 덮어쓰지 않습니다.
+    """
+    root = root or RAG_CORPUS_VERSIONS_DIR
+    versions = corpus_versions.list_versions(root)
+    info = corpus_versions.read_info(root, versions[-1]) if versions else None
+    return info.get("docs") if info else None
+
+
+def prune_intermediate(docs_dir=DOCS_DIR):
+    # 삭제된 문서의 전처리/요약 결과가 새 코퍼스에 섞이지 않도록 정리
+    stems = {os.path.splitext(name)[0] for name, _, _ in docs_signature(docs_dir)}
+    for folder in INTERMEDIATE_DIRS:
+        for path in glob.glob(os.path.join(folder, "*.json")):
+            if os.path.splitext(os.path.basename(path))[0] not in stems:
+                os.remove(path)
+
+
+def run_pipeline(corpus_output="rag/data/corpus"):
+    # 1. 문서 전처리
+    subprocess.run([sys.executable, "rag/preprocess.py", "--jobs", str(RAG_JOBS)], check=True)
+    # 2. 키워드 요약
+    subprocess.run([sys.executable, "rag/keyword_summary.py"], check=True)
+    # 3. 클러스터링
+    subprocess.run([sys.executable, "rag/cluster.py", "--jobs", str(RAG_JOBS or -1)], check=True)
+    # 4. 코퍼스 빌드
+    subprocess.run([sys.executable, "rag/corpus.py", "--output", corpus_output], check=True)
+
+
+def _acquire_cluster_lock():
+    token = uuid.uuid4().hex
+    try:
+        if not redis_client.set(REBUILD_LOCK_KEY, token, nx=True, ex=REBUILD_LOCK_TTL):
+            return None
+    except Exception as e:
+        logging.warning(f"코퍼스 재빌드 락 획득 실패, 워커 내 락만 사용합니다: {e}")
+    return token
+
+
+def _release_cluster_lock(token):
+    try:
+        if redis_client.get(REBUILD_LOCK_KEY) == token.encode("utf-8"):
+            redis_client.delete(REBUILD_LOCK_KEY)
+    except Exception:
+        pass
+
+
+def activate(version):
+    """
+    version을 메모리에 올린 뒤 CURRENT 포인터와 서비스 중인 캐시를 교체합니다.
+    """
+    root = RAG_CORPUS_VERSIONS_DIR
+    corpus_dir = os.path.join(corpus_versions.version_path(root, version), "corpus")
+    corpus = rag_service.build_corpus_cache(corpus_dir, version)
+    corpus_versions.set_current(root, version)
+    previous = rag_service.swap_corpus(corpus)
+    logging.info(f"코퍼스 교체: {previous and previous.get('version')} → {version} ({len(corpus['contexts'])}개 문단)")
+    return corpus
+
+
+def build_version(reason):
+    """
+    파이프라인을 실행해 새 버전을 만들고 활성화합니다. 새 버전 이름을 돌려줍니다. (호출한 스레드에서 실행)
+    """
+    root = RAG_CORPUS_VERSIONS_DIR
+    started = time.perf_counter()
+    signature = docs_signature()
+    version = corpus_versions.new_version(root)
+    try:
+        prune_intermediate()
+        run_pipeline(os.path.join(corpus_versions.version_path(root, version), "corpus"))
+        corpus_versions.write_info(root, version, {
+            "created_at": time.time(),
+            "build_seconds": round(time.perf_counter() - started, 3),
+            "reason": reason,
+            "docs": signature,
+        })
+        activate(version)
+    except Exception:
+        corpus_versions.remove_version(root, version)
+        raise
+    corpus_versions.prune(root, RAG_CORPUS_KEEP_VERSIONS)
+    return version
+
+
+def _rebuild(reason, token):
+    try:
+        version = build_version(reason)
+        _state["last_build"] = corpus_versions.read_info(RAG_CORPUS_VERSIONS_DIR, version)
+        _state["last_error"] = None
+        inc("kmedi_corpus_rebuild_total", result="ok", reason=reason)
+    except Exception as e:
+        logging.exception(f"코퍼스 재빌드 실패 ({reason})")
+        _state["last_error"] = f"{type(e).__name__}: {e}"
+        inc("kmedi_corpus_rebuild_total", result="error", reason=reason)
+    finally:
+        _state["building"] = False
+        _release_cluster_lock(token)
+        _lock.release()
+
+
+def rebuild(reason="admin"):
+    """
+    백그라운드 재빌드를 시작합니다. 이미 진행 중이면(다른 워커 포함) False.
+    """
+    if not _lock.acquire(blocking=False):
+        return False
+    token = _acquire_cluster_lock()
+    if token is None:
+        _lock.release()
+        return False
+    _state.update(building=True, reason=reason, started_at=time.time())
+    threading.Thread(target=_rebuild, args=(reason, token), name="corpus-rebuild", daemon=True).start()
+    return True
+
+
+def rollback(version=None):
+    """
+    version(없으면 현재 바로 이전 버전)으로 되돌립니다. 되돌린 버전 이름, 되돌릴 버전이 없으면 None.
+    재빌드가 진행 중이면 RebuildInProgress.
+    """
+    root = RAG_CORPUS_VERSIONS_DIR
+    if not _lock.acquire(blocking=False):
+        raise RebuildInProgress()
+    try:
+        target = version or corpus_versions.previous_version(root, corpus_versions.current_version(root))
+        if not target or target not in corpus_versions.list_versions(root):
+            return None
+        activate(target)
+        inc("kmedi_corpus_rollback_total")
+        return target
+    finally:
+        _lock.release()
+
+
+def build_if_stale():
+    """
+    서버 시작 시 호출: 코퍼스가 없거나 마지막 버전 이후 문서가 바뀌었으면 새 버전을 만듭니다.
+    """
+    root = RAG_CORPUS_VERSIONS_DIR
+    current = corpus_versions.current_version(root)
+    if current is None and list_corpora(rag_service.DEFAULT_CORPUS_DIR) and not docs_signature():
+        return None
+    built = built_signature(root)
+    if built is not None and built == docs_signature():
+        return None
+    print("코퍼스가 없거나 문서가 바뀌었어요. 파이프라인을 실행해 새 코퍼스 버전을 만듭니다.")
+    with _lock:
+        return build_version("startup")
+
+
+def status():
+    root = RAG_CORPUS_VERSIONS_DIR
+    corpus = rag_service.cached_corpus
+    current = corpus_versions.current_version(root)
+    return {
+        "serving": None if corpus is None else {
+            "version": corpus.get("version"),
+            "path": corpus.get("path"),
+            "passages": len(corpus["contexts"]),
+            "loaded_at": corpus.get("loaded_at"),
+            "load_seconds": corpus.get("load_seconds"),
+            "embedding_dtype": corpus["embeddings"].dtype if corpus["embeddings"] is not None else None,
+            "embedding_bytes": corpus["embeddings"].nbytes if corpus["embeddings"] is not None else 0,
+        },
+        "current": corpus_versions.read_info(root, current) if current else None,
+        "versions": corpus_versions.list_versions(root),
+        "building": _state["building"],
+        "build_reason": _state["reason"] if _state["building"] else None,
+        "build_started_at": _state["started_at"] if _state["building"] else None,
+        "last_build": _state["last_build"],
+        "last_error": _state["last_error"],
+    }
+
+
+def _watch(interval):
+    root = RAG_CORPUS_VERSIONS_DIR
+    pending = None
+    baseline = docs_signature()  # 버전 정보가 없는(기본 코퍼스) 상태에서는 시작 시점 문서를 기준으로 비교
+    while True:
+        time.sleep(interval)
+        try:
+            # 다른 워커(또는 관리자 API)가 CURRENT를 바꿨으면 그 버전으로 교체
+            current = corpus_versions.current_version(root)
+            serving = rag_service.cached_corpus
+            if current and serving is not None and serving.get("version") != current and not _state["building"]:
+                with _lock:
+                    activate(current)
+
+            # 문서 변경은 두 번 연속 같은 서명일 때(복사 완료 후) 재빌드 (되돌린 버전이 아니라 최신 빌드와 비교)
+            built = built_signature(root)
+            if built is None:
+                built = baseline
+            signature = docs_signature()
+            if signature != built:
+                if signature == pending:
+                    if rebuild("watch"):
+                        pending = None
+                else:
+                    pending = signature
+            else:
+                pending = None
+        except Exception as e:
+            logging.warning(f"코퍼스 감시 중 오류: {type(e).__name__}: {e}")
+
+
+def init_app(app):
+    global _watcher
+    register_gauge("kmedi_corpus_passages", lambda: len(rag_service.cached_corpus["contexts"]) if rag_service.cached_corpus else 0)
+    register_gauge("kmedi_rag_ready", lambda: 1 if rag_service.is_ready() else 0)
+    register_gauge("kmedi_corpus_embedding_bytes", lambda: getattr((rag_service.cached_corpus or {}).get("embeddings"), "nbytes", 0))
+    register_gauge("kmedi_corpus_load_seconds", lambda: (rag_service.cached_corpus or {}).get("load_seconds") or 0)
+    if RAG_WATCH_INTERVAL > 0 and _watcher is None:
+        _watcher = threading.Thread(target=_watch, args=(RAG_WATCH_INTERVAL,), name="corpus-watch", daemon=True)
+        _watcher.start()
@@ -0,0 +1,126 @@
+import argparse
+import logging
+import threading
+import numpy as np
+from config import EFCY_INDEX_PATH, SYMPTOM_SEMANTIC_TOP_K, SYMPTOM_SEMANTIC_MIN_SCORE
+from services import rag_service
+from services.utils import clean_text
+from services.metrics import span
+from rag.corpus_store import CorpusReader, CorpusWriter, is_corpus
+
+# 의약품 효능(efcyQesitm) 임베딩 색인
+# - build(): Mongo 카탈로그를 스트리밍으로 읽어 효능 텍스트마다 정규화된 임베딩을 계산하고 코퍼스 형식으로 저장
+# - search(): 추출된 증상 키워드 각각과의 코사인 유사도 중 최댓값으로 약을 정렬해 상위 k개 반환
+#   (행렬 곱 한 번 + argpartition이라 카탈로그가 커져도 수 ms 수준)
+
+_index = None
+_lock = threading.Lock()
+_missing_logged = False
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build(collection, path=EFCY_INDEX_PATH, batch_size=256):
+    """
+    collection의 모든 약 효능 텍스트를 임베딩해 path에 저장합니다. 저장한 약 개수를 돌려줍니다.
+    """
+    projection = {"itemName": 1, "engName": 1, "efcyQesitm": 1, "weight": 1}
+    count = 0
+    with CorpusWriter(path) as writer:
+        batch = []
+
+        def flush():
+            texts = [f"passage: {record['efcyQesitm']}" for record in batch]
+            embeddings = _normalize(rag_service.get_model().encode(texts, convert_to_numpy=True).astype(np.float32))
+            for record, embedding in zip(batch, embeddings):
+                writer.add(record, embedding)
+            batch.clear()
+
+        for doc in collection.find({}, projection):
+            efcy = clean_text(doc.get("efcyQesitm", ""))
+            if not efcy:
+                continue
+            batch.append({
+                "id": str(doc.get("_id")),
+                "itemName": doc.get("itemName", ""),
+                "engName": doc.get("engName", ""),
+                "efcyQesitm": efcy,
+                "weight": float(doc.get("weight", 1.0)),
+            })
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    return count
+
+
+def load(path=EFCY_INDEX_PATH):
+    """
+    색인을 메모리에 올립니다. 색인이 없으면 None.
+    """
+    global _index, _missing_logged
+    with _lock:
+        if _index is not None and _index["path"] == path:
+            return _index
+        if not is_corpus(path):
+            if not _missing_logged:
+                logging.warning(f"효능 임베딩 색인이 없습니다({path}). python -m services.efcy_index 로 먼저 만들어주세요.")
+                _missing_logged = True
+            return None
+        reader = CorpusReader(path)
+        _index = {"path": path, "records": list(reader), "embeddings": np.asarray(reader.embeddings, dtype=np.float32)}
+        logging.info(f"효능 임베딩 색인 로드: {len(_index['records'])}개")
+        return _index
+
+
+def reload(path=EFCY_INDEX_PATH):
+    global _index
+    with _lock:
+        _index = None
+    return load(path)
+
+
+def memory_usage():
+    index = _index
+    return {
+        "efcy_index_records": len(index["records"]) if index is not None else 0,
+        "efcy_index_embedding_bytes": index["embeddings"].nbytes if index is not None else 0,
+    }
+
+
+def search(symptoms, top_k=SYMPTOM_SEMANTIC_TOP_K, min_score=SYMPTOM_SEMANTIC_MIN_SCORE):
+    """
+    [(약 레코드, 유사도), ...]를 유사도 내림차순으로 돌려줍니다. 색인이 없으면 None.
+    """
+    index = load()
+    if index is None:
+        return None
+    if not symptoms or not index["records"]:
+        return []
+
+    with span("symptom_semantic_search"):
+        queries = _normalize(rag_service.get_model().encode([f"query: {s}" for s in symptoms], convert_to_numpy=True).astype(np.float32))
+        scores = (index["embeddings"] @ queries.T).max(axis=1)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+    return [(index["records"][i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+if __name__ == "__main__":
+    from pymongo import MongoClient
+    from config import MONGODB_URI
+
+    parser = argparse.ArgumentParser(description="의약품 효능 텍스트 임베딩 색인을 만듭니다.")
+    parser.add_argument("--output", default=EFCY_INDEX_PATH)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    collection = MongoClient(MONGODB_URI)['K_Medi_Guide']['Api']
+    count = build(collection, args.output, args.batch_size)
+    print(f"효능 임베딩 색인 저장 완료: {args.output} ({count}개)")
@@ -0,0 +1,79 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from services.metrics import span, inc
+from services.llm_scheduler import remaining_time
+
+# 서로 독립적인 단계를 공유 마감 시각 안에서 동시에 실행 (fallback_response의 검색 단계 등)
+# - 각 가지는 요청 컨텍스트(계측, LLM 마감 시각/우선순위)를 복사한 채 전용 스레드풀에서 실행
+# - result()는 공유 마감 시각까지만 기다리고, 시간 초과/오류인 가지는 default로 대체 (부분 결과로 진행)
+# - 가지별 소요 시간은 span(Server-Timing, 히스토그램)과 timings()로 확인
+# 스레드풀을 with 블록으로 쓰지 않는 이유: 블록을 나갈 때 시간 초과된 가지까지 기다리게 됨
+
+MAX_WORKERS = 32
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fanout")
+
+
+class FanOut:
+    def __init__(self, stage, branches, timeout):
+        """
+        branches: {가지 이름: 인자 없는 함수}. timeout(초)과 요청의 LLM 마감 시각 중 더 이른 쪽이 공유 마감 시각.
+        """
+        remaining = remaining_time()
+        if remaining is not None:
+            timeout = min(timeout, max(remaining, 0.0))
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.deadline = time.monotonic() + timeout
+        self._timings = {}
+        self._results = {}
+        self.futures = {name: _executor.submit(contextvars.copy_context().run, self._run, name, fn)
+                        for name, fn in branches.items()}
+
+    def _run(self, name, fn):
+        started = time.perf_counter()
+        try:
+            with span(f"{self.stage}_{name}"):
+                return fn()
+        finally:
+            self._timings[name] = time.perf_counter() - started
+
+    def result(self, name, default=None):
+        if name in self._results:
+            return self._results[name][1]
+        try:
+            value = self.futures[name].result(timeout=max(self.deadline - time.monotonic(), 0.0))
+            outcome = "ok"
+        except TimeoutError:
+            if self.futures[name].done():
+                # 가지 안에서 발생한 TimeoutError (LLM 마감 초과 등)
+                outcome = "error"
+            else:
+                outcome = "timeout"
+                logging.warning(f"{self.stage}: '{name}' 단계가 마감 시각을 넘겨 부분 결과로 진행합니다.")
+            value = default
+        except Exception as e:
+            outcome = "error"
+            logging.warning(f"{self.stage}: '{name}' 단계 실패, 부분 결과로 진행합니다: {type(e).__name__}: {e}")
+            value = default
+        inc("kmedi_fanout_branch_total", stage=self.stage, branch=name, result=outcome)
+        self._results[name] = (outcome, value)
+        return value
+
+    def timings(self):
+        """
+        {가지 이름: 소요 시간(ms) 또는 "timeout"/"error"}. 아직 끝나지 않은 가지는 "pending".
+        """
+        report = {}
+        for name in self.futures:
+            outcome = self._results.get(name, (None,))[0]
+            if outcome in ("timeout", "error"):
+                report[name] = outcome
+            elif name in self._timings:
+                report[name] = round(self._timings[name] * 1000, 1)
+            else:
+                report[name] = "pending"
+        report["wall"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return report
@@ -0,0 +1,117 @@
+import re
+
+# select/detail 응답 마크다운 렌더러
+# 약 이름, 증상 문장, 효능/복용법/주의사항 문장처럼 구조를 이미 알고 있는 조각을
+# LLM 가독성 개선(improved_readability) 없이 언어별 템플릿으로 바로 조립합니다.
+# - 이모지로 문단을 나누고, 약 이름/증상/용량 표현은 굵게
+# - 문장부호로 끝나는 굵은 글씨 뒤에는 한 칸 띄움 (마크다운에서 "**...)**은" 처럼 붙으면 강조가 깨짐)
+
+NAME_PLACEHOLDER = "<<약이름>>"
+
+TEMPLATES = {
+    "ko": {
+        "symptom": "🤕 {text}",
+        "efficacy": "💊 {text}",
+        "detail": "💊 **{name}**\n\n🥛 **복용법**  \n{usage}\n\n‼️ **주의사항**  \n{cautions}",
+    },
+    "en": {
+        "symptom": "🤕 {text}",
+        "efficacy": "💊 {text}",
+        "detail": "💊 **{name}**\n\n🥛 **How to take**  \n{usage}\n\n‼️ **Precautions**  \n{cautions}",
+    },
+    "ja": {
+        "symptom": "🤕 {text}",
+        "efficacy": "💊 {text}",
+        "detail": "💊 **{name}**\n\n🥛 **用法・用量**  \n{usage}\n\n‼️ **注意事項**  \n{cautions}",
+    },
+    "zh": {
+        "symptom": "🤕 {text}",
+        "efficacy": "💊 {text}",
+        "detail": "💊 **{name}**\n\n🥛 **用法用量**  \n{usage}\n\n‼️ **注意事项**  \n{cautions}",
+    },
+}
+LANG_ALIASES = {"jp": "ja", "cn": "zh", "zh-cn": "zh", "zh-tw": "zh"}
+
+# 파인튜닝 모델 출력에 섞여 있는 문단 이모지 (🥛, ‼️ 등)
+_EMOJI = re.compile(r"(?:[‼⁉☀-➿\U0001f300-\U0001faff][️‍]*)+")
+# 문장 단위 분리 (소수점 "0.5 mL", 한 글자 뒤의 마침표 "e.g." "i.e.", 알려진 약어 "approx." 등은 자르지 않음)
+_ABBREVIATIONS = ("approx", "vs", "cf", "incl", "max", "min", "Dr", "Mr", "Mrs", "Ms", "No", "Fig")
+_SENTENCE = re.compile(
+    r"(?:\d\.\d|(?<![A-Za-z])(?:[A-Za-z]|" + "|".join(_ABBREVIATIONS) + r")\.(?=\s*[^\s])|[^.!?。！？])+[.!?。！？]*"
+)
+# 용량/횟수 표현: "1회 1~2정", "1일 3회", "300 mg", "2 tablets", "1回2錠", "每次1片" 등
+_DOSAGE = re.compile(
+    r"(?:(?:1\s*회|1\s*일|하루|1日|1回|每次|每日|每天)\s*)?"
+    r"\d+(?:\.\d+)?(?:\s*[~～\-–]\s*\d+(?:\.\d+)?)?\s*"
+    r"(?:mg|mL|ml|g|μg|밀리그램|그램|정|캡슐|포|병|회|번|알|방울|시간|錠|回|時間|カプセル|包|片|粒|次|小时|袋"
+    r"|tablets?|capsules?|times?|hours?|drops?|packets?)"
+    # "2 glasses", "5번째"처럼 단위 뒤에 영문자나 서수 "째"가 이어지면 용량이 아님 ("3정을", "2회씩" 같은 조사는 허용)
+    r"(?![A-Za-z]|째)"
+)
+_BOLD_SPAN = re.compile(r"\*\*([^*]+)\*\*(\w?)")
+
+
+def _template(lang):
+    lang = (lang or "ko").lower()
+    return TEMPLATES.get(LANG_ALIASES.get(lang, lang), TEMPLATES["en"])
+
+
+def split_sentences(text):
+    sentences = []
+    for chunk in _EMOJI.split(text or ""):
+        sentences.extend(s.strip() for s in _SENTENCE.findall(chunk) if s.strip())
+    return sentences
+
+
+def _strip_emoji(text):
+    return _EMOJI.sub(" ", text or "").strip()
+
+
+def _bold(text):
+    return f"**{text}**"
+
+
+def _space_after_bold(text):
+    # 문장부호로 끝나는 굵은 글씨 바로 뒤에 글자가 오면 강조가 적용되지 않으므로 한 칸 띄움
+    def fix(match):
+        inner, following = match.groups()
+        if following and not (inner[-1].isalnum() or inner[-1] == "_"):
+            following = " " + following
+        return f"**{inner}**{following}"
+    return _BOLD_SPAN.sub(fix, text)
+
+
+def _emphasize_name(text, name):
+    # 번역 후에도 남아 있는 자리표시자 또는 약 이름을 굵게, 둘 다 없으면 이름을 앞에 따로 붙임
+    for target in (NAME_PLACEHOLDER, name):
+        if target and target in text:
+            return text.replace(target, _bold(name), 1)
+    return f"{_bold(name)}  \n{text}"
+
+
+def _emphasize_terms(text, terms):
+    for term in sorted({t for t in terms if t}, key=len, reverse=True):
+        text = re.sub(rf"(?<!\*){re.escape(term)}(?!\*)", lambda m: _bold(m.group(0)), text)
+    return text
+
+
+def render_select(name, efcy_sentence, symptom_sentence=None, lang="ko", highlights=()):
+    """
+    select 응답: (증상 문장) + 약 이름과 효능 문장
+    efcy_sentence에는 약 이름 또는 NAME_PLACEHOLDER가 들어 있어야 그 자리에 굵은 이름이 들어갑니다.
+    """
+    template = _template(lang)
+    lines = []
+    if symptom_sentence:
+        lines.append(template["symptom"].format(text=_emphasize_terms(_strip_emoji(symptom_sentence), highlights)))
+    lines.append(template["efficacy"].format(text=_emphasize_name(_strip_emoji(efcy_sentence), name)))
+    return _space_after_bold("  \n".join(lines))
+
+
+def render_detail(name, usage_text, caution_text, lang="ko"):
+    """
+    detail 응답: 약 이름 / 복용법(문장마다 줄바꿈, 용량 굵게) / 주의사항(문장마다 항목)
+    """
+    usage = "  \n".join(_DOSAGE.sub(lambda m: _bold(m.group(0)), s) for s in split_sentences(usage_text))
+    cautions = "\n".join(f"- {s}" for s in split_sentences(caution_text))
+    return _space_after_bold(_template(lang)["detail"].format(name=name, usage=usage, cautions=cautions))
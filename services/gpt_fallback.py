@@ -1,38 +1,66 @@
+import logging
 from collections import deque
-from openai import OpenAI
-from config import OPENAI_API_KEY
-from config import MONGODB_URI
+from config import MONGODB_URI, FALLBACK_RETRIEVAL_TIMEOUT
 from pymongo import MongoClient
-from services.gpt_service import extract_medcine_name
+from services.gpt_service import extract_medcine_name, translate_to_user_lang
 from services.rag_service import get_similar_contexts
+from services.llm import chat_completion
+from services.metrics import span
+from services import semantic_cache
+from services.utils import clean_text
+from services.fanout import FanOut
+from services.circuit_breaker import CircuitOpen, mark_degraded
+from services import formatter
 import re
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client['K_Medi_Guide']
 collection = db['Api']
 
 MAX_HISTORY = 5
+ANSWER_LANGUAGES = {"en": "영어(English)", "ja": "일본어(日本語)", "jp": "일본어(日本語)", "zh": "중국어(中文)"}
 chat_history = deque(maxlen=MAX_HISTORY)
 
 # DB에서 약물의 모든 정보 조회 함수
 def get_medication_info(med_name):
     # 약물 이름을 바탕으로 모든 정보 찾기
-    result = collection.find_one({"itemName": {"$regex": re.escape(med_name), "$options": "i"}})
+    with span("mongo_query"):
+        result = collection.find_one({"itemName": {"$regex": re.escape(med_name), "$options": "i"}})
     if result:
         return result  # 모든 필드 반환
     else:
         return None  # 정보가 없으면 None 반환
 
-# 사용자의 질문에 맞게 정보를 동적으로 답변 생성하는 함수
-def fallback_response(user_input):
-    # 사용자가 묻는 약물명 추출 (예: "타이레놀")
+# 약 이름 추출 → 의미 캐시 조회 → DB 조회 (앞 단계 결과가 필요해서 한 가지 안에서 순서대로)
+def lookup_medicine(user_input, lang):
     med_name = extract_medcine_name(user_input)
+    if not isinstance(med_name, str):
+        # 추출 실패 시 오류 응답 튜플이 돌아옴
+        return None, None, None, None
+    cached_answer, query_embedding = semantic_cache.lookup(user_input, lang, med_name)
+    if cached_answer is not None:
+        return med_name, cached_answer, query_embedding, None
+    return med_name, None, query_embedding, get_medication_info(med_name)
 
-    # DB에서 해당 약물의 모든 정보 가져오기
-    medication_info = get_medication_info(med_name)
-
-    rag_contexts = get_similar_contexts(user_input)
+# 사용자의 질문에 맞게 정보를 동적으로 답변 생성하는 함수
+def fallback_response(user_input, lang=None):
+    # 약 정보 조회와 문서 검색(RAG)은 서로 독립적이므로 공유 마감 시각 안에서 동시에 실행
+    # 한쪽이 시간 안에 끝나지 않으면 나머지 결과만으로 답변
+    fanout = FanOut("fallback", {
+        "medicine": lambda: lookup_medicine(user_input, lang),
+        "rag": lambda: get_similar_contexts(user_input),
+    }, FALLBACK_RETRIEVAL_TIMEOUT)
+
+    # 같은 언어/약에 대해 비슷한 질문에 답한 적이 있으면 문서 검색을 기다리지 않고 그 답변을 재사용
+    med_name, cached_answer, query_embedding, medication_info = fanout.result("medicine", (None, None, None, None))
+    if cached_answer is not None:
+        logging.info(f"fallback 단계별 소요 시간(ms): {fanout.timings()}")
+        # 이어지는 질문이 문맥을 잃지 않도록 캐시 답변도 대화 기록에 남김
+        remember_turn(user_input, cached_answer)
+        return cached_answer
+
+    rag_contexts = fanout.result("rag", [])
+    logging.info(f"fallback 단계별 소요 시간(ms): {fanout.timings()}")
     print(rag_contexts)
     
     context = ""  # 로컬 context 초기화
@@ -41,9 +69,10 @@ def fallback_response(user_input):
         context = f"다음은 사용자의 질문과 관련된 참고 정보입니다:\n\n"
         # DB에서 가져온 정보를 자연스럽게 하나의 문장으로 변환하여 GPT에게 제공
         context += f"약물명: {medication_info.get('itemName', '정보 없음')}\n"
-        context += f"효능: {medication_info.get('efcyQesitm', '정보 없음')}\n"
-        context += f"복용법: {medication_info.get('useMethodQesitm', '정보 없음')}\n"
-        context += f"주의사항: {medication_info.get('atpnQesitm', '정보 없음')}\n"
+        # API 필드는 HTML이므로 태그를 걷어낸 텍스트만 프롬프트에 넣음
+        context += f"효능: {clean_text(medication_info.get('efcyQesitm')) or '정보 없음'}\n"
+        context += f"복용법: {clean_text(medication_info.get('useMethodQesitm')) or '정보 없음'}\n"
+        context += f"주의사항: {clean_text(medication_info.get('atpnQesitm')) or '정보 없음'}\n"
 
         # answer = send(user_input, context)
         # return answer
@@ -62,23 +91,52 @@ def fallback_response(user_input):
         print(context)
 
     if (rag_contexts or medication_info):  
-        answer = send(user_input, context)
+        try:
+            answer = send(user_input, context, lang)
+        except CircuitOpen:
+            # 회로가 열려 있으면 찾은 정보를 그대로 보여줌 (의미 캐시에는 저장하지 않음)
+            mark_degraded("fallback_answer")
+            return degraded_answer(medication_info, rag_contexts, lang)
+        semantic_cache.store(user_input, lang, med_name, query_embedding, answer)
         return answer
     else:
-        return "말씀하신 내용을 잘 이해하지 못했어요."
+        return translate_to_user_lang("말씀하신 내용을 잘 이해하지 못했어요.", lang or "ko")
     
+# 답변 생성 모델을 쓸 수 없을 때: DB 약 정보(또는 가장 관련 있는 문서 조각)를 로컬 템플릿으로 정리한 답변
+def degraded_answer(medication_info, rag_contexts, lang=None):
+    notice = translate_to_user_lang("지금은 답변을 만드는 데 시간이 오래 걸려서, 찾은 정보를 그대로 보여드릴게요.", lang or "ko")
+    if medication_info:
+        name = medication_info.get('itemName', '')
+        parts = [notice]
+        efcy = clean_text(medication_info.get('efcyQesitm'))
+        if efcy:
+            parts.append(formatter.render_select(name, f"{name}: {efcy}", lang=lang))
+        parts.append(formatter.render_detail(name, clean_text(medication_info.get('useMethodQesitm')),
+                                             clean_text(medication_info.get('atpnQesitm')), lang))
+        return "\n\n".join(parts)
+    score, text, filename = rag_contexts[0]
+    return f"{notice}\n\n📄 {text.strip()}"
+
 # 이전 대화 기록을 초기화하는 함수 (필요한 경우 호출)
 def clear_chat_history():
     chat_history.clear()
 
+# 질문과 답변 한 턴을 대화 기록에 추가
+def remember_turn(user_input, answer):
+    chat_history.append({"role": "user", "content": user_input})
+    chat_history.append({"role": "assistant", "content": answer})
+
 # 현재 대화 기록 확인 (디버깅용)
 def get_current_chat_history():
     return list(chat_history)
 
-def send(user_input, context):
+def send(user_input, context, lang=None):
     # 이 문맥을 GPT 모델에 제공하여 답변을 도출하게 함
     history_text = "\n".join([f"{msg['role']}: {msg['content']}" for msg in chat_history])
     context += f"""\n이전 대화:\n{history_text}\n\n이전 대화를 바탕으로 다음 질문에 대답하세요. 참고 정보를 기반으로 가능한 한 정확하게 답해주세요.  잘 모르겠으면 모르겠다고 대답하세요. 이모지, 줄바꿈, 말머리 기호를 사용해서 가독성이 좋게 대답하세요. 이모지를 기준으로 줄바꿈을 두 번 넣어서 문단을 나누세요. 질문: {user_input}"""
+    # 별도 번역 호출 없이 사용자 언어로 바로 답변 (약 이름은 원문 그대로)
+    if lang and lang != "ko":
+        context += f"\n\n답변은 반드시 {ANSWER_LANGUAGES.get(lang, lang)}로 작성하세요. 약 이름은 번역하지 말고 그대로 쓰세요."
 
     # OpenAI API로 메시지 전송
     messages = [
@@ -97,16 +155,14 @@ def send(user_input, context):
 ]
 
 
-    response = client.chat.completions.create(
+    answer = chat_completion(
         model="gpt-3.5-turbo",
         messages=messages,
+        stage="fallback_answer",
         temperature=0.7
     )
 
-    answer = response.choices[0].message.content.strip()
-
     # 현재 사용자 질문과 답변을 대화 기록에 추가
-    chat_history.append({"role": "user", "content": user_input})
-    chat_history.append({"role": "assistant", "content": answer})
+    remember_turn(user_input, answer)
 
     return answer
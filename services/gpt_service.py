@@ -1,46 +1,58 @@
 from flask import jsonify, session
-from openai import OpenAI
-from config import OPENAI_API_KEY
+from services.llm import chat_completion
+from services.metrics import inc
+from services.circuit_breaker import CircuitOpen, mark_degraded
+import logging
 import re
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 def extract_medcine_name(user_input):
     prompt = f"""다음 문장에서 의약품 이름만 한국어 또는 영어로 하나만 추출해줘. 설명 없이 결과만 출력해. 문장: "{user_input}" """
     try:
-        response = client.chat.completions.create(
+        return chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "약 이름을 추출하는 도우미야."},
                 {"role": "user", "content": prompt}
-            ]
+            ],
+            stage="medicine_name_extract"
         )
-        return response.choices[0].message.content.strip()
+    except CircuitOpen:
+        # 회로가 열려 있으면 입력 문장을 그대로 약 이름으로 사용 (앞뒤 문장부호만 제거)
+        mark_degraded("medicine_name_extract")
+        return user_input.strip().strip("\"'?!.,~ ")
     except Exception as e:
         return jsonify({"error": translate_to_user_lang("약 이름 추출 중 오류 발생"), "details": str(e),"next": "/start"}), 500
     #리턴 오류 부분 수정 필요
 
-def translate_to_user_lang(text_ko):
-    target_lang = session.get('language')
+# lang/combined_name을 직접 넘기면 세션 없이(백그라운드 작업 등) 사용할 수 있음
+def translate_to_user_lang(text_ko, lang=None):
+    target_lang = lang if lang is not None else session.get('language')
     if not target_lang or target_lang == "ko":
         return text_ko
     prompt = f"""다음 한국어 문장을 {target_lang}로 친절하게 번역하고 설명 없이 번역된 문장만 출력해. 문장: '{text_ko}'"""
     try:
-        translated = client.chat.completions.create(
+        translated = chat_completion(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "너는 친절한 다국어 번역 도우미야."},
                 {"role": "user", "content": prompt}
             ],
+            stage="translate",
             temperature=0.5
-        ).choices[0].message.content.strip()
+        )
         return translated
-    except:
+    except Exception as e:
+        # 번역 실패 시 한국어 원문으로 응답하되 원인은 남김 (회로가 열려 있을 때는 로그 생략)
+        if not isinstance(e, CircuitOpen):
+            logging.warning(f"번역 실패, 원문을 반환합니다 ({target_lang}): {type(e).__name__}: {e}")
+        inc("kmedi_translate_fallback_total", lang=target_lang)
+        mark_degraded("translate")
         return text_ko
     
-def improved_readability(user_input):
-    target_lang = session.get('language', 'ko')
-    combined_name = session.get('combined_name')
+def improved_readability(user_input, lang=None, combined_name=None):
+    target_lang = lang if lang is not None else session.get('language', 'ko')
+    if combined_name is None:
+        combined_name = session.get('combined_name')
     prompt_data = READABILITY_PROMPTS.get(target_lang)
 
     if not prompt_data:
@@ -55,26 +67,30 @@ def improved_readability(user_input):
     prompt = f"{prompt_data['prompt']}{name_preserve_notice}\n\n{input_format.format(user_input=user_input)}"
 
     try:
-        response = client.chat.completions.create(
+        response_text = chat_completion(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "당신은 문장의 가독성을 개선하는 도우미입니다."},
                 {"role": "user", "content": prompt}
             ],
+            stage="readability",
             temperature=0.4
         )
-        response_text = response.choices[0].message.content.strip()
 
         # 결과에서 <<약이름>>을 combined_name으로 되돌리기
         final_result = response_text.replace("<<약이름>>", combined_name)
 
         return final_result
+    except CircuitOpen:
+        # 회로가 열려 있으면 가독성 개선 없이 입력 문장 그대로 사용
+        mark_degraded("readability")
+        return user_input.replace("<<약이름>>", combined_name or "")
     except Exception as e:
         return jsonify({"error": translate_to_user_lang("문장 가독성 개선 중 오류 발생"), "details": str(e), "next": "/start"}), 500
 
     
-def replace_translated_name(translated_text, insert_text):
-    target_lang = session.get('language')
+def replace_translated_name(translated_text, insert_text, lang=None):
+    target_lang = lang if lang is not None else session.get('language')
 
     if target_lang == "en":
         # 영어: be 동사 기준
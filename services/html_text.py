@@ -0,0 +1,98 @@
+import html.entities
+import re
+
+# e약은요 API 필드(효능/용법/주의사항)의 HTML을 텍스트로 바꾸는 경량 추출기
+# BeautifulSoup(html, "html.parser").get_text()와 같은 결과를 트리 생성 없이 정규식 한 번으로 만듭니다.
+# - 태그/주석/선언/PI는 제거하고, 그 사이의 텍스트 조각 단위로 엔티티를 해석
+# - script/style 내용은 제외, CDATA 내용은 그대로 포함
+# - 엔티티 해석 규칙도 html.parser + bs4와 동일 (모르는 이름은 "&이름", 끝에 걸친 미완성 참조는 그대로)
+
+_ENTITIES = {name[:-1]: char for name, char in html.entities.html5.items() if name.endswith(";")}
+
+_MARKUP = re.compile(r"""
+      <!--.*?--!?>
+    | <!\[CDATA\[(?P<cdata>.*?)\]\]>
+    | <!(?!--)[^>]*>
+    | <\?[^>]*>
+    | <(?P<raw>script|style)\b(?:[^>"']|"[^"]*"|'[^']*')*>.*?</(?P=raw)\s*>
+    | </?[a-zA-Z](?:[^>"']|"[^"]*"|'[^']*')*>
+    | </(?![a-zA-Z])[^>]*>
+""", re.S | re.I | re.X)
+
+# html.parser와 같이 참조 뒤에 종료 문자가 있어야 해석하고, 종료 문자가 ';'일 때만 함께 소비
+_REFERENCE = re.compile(r"&(?:#(?:(?P<dec>[0-9]+)|[xX](?P<hex>[0-9a-fA-F]+))(?=[^0-9a-fA-F])"
+                        r"|(?P<name>[a-zA-Z][-.a-zA-Z0-9]*)(?=[^a-zA-Z0-9]));?")
+
+
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+def _charref(number):
+    # bs4와 동일: 256 미만은 windows-1252로 먼저 해석
+    if number < 256:
+        try:
+            return bytes([number]).decode("windows-1252")
+        except UnicodeDecodeError:
+            pass
+    try:
+        return chr(number)
+    except (ValueError, OverflowError):
+        return "\N{REPLACEMENT CHARACTER}"
+
+
+def _replace_reference(match):
+    if match.group("name") is not None:
+        name = match.group("name")
+        return _ENTITIES.get(name, "&" + name)
+    if match.group("dec") is not None:
+        return _charref(int(match.group("dec")))
+    return _charref(int(match.group("hex"), 16))
+
+
+def _decode(text, followed_by_markup):
+    if "&" in text:
+        # 뒤에 태그가 이어지면 '<'가 종료 문자 역할을 하므로 임시로 붙여서 해석
+        if followed_by_markup:
+            text = _REFERENCE.sub(_replace_reference, text + "<")[:-1]
+        else:
+            decoded = _REFERENCE.sub(_replace_reference, text)
+            # html.parser는 문서 끝의 "&x" 두 글자에서 '&'를 버림
+            if len(text) >= 2 and text[-2] == "&" and (text[-1].isascii() and text[-1].isalpha() or text[-1] == "#"):
+                decoded = decoded[:-2] + decoded[-1]
+            text = decoded
+    # bs4는 ASCII 공백으로만 된 문자열을 "\n" 또는 " " 하나로 줄임
+    if not text.strip(_ASCII_SPACES):
+        return "\n" if "\n" in text else " "
+    return text
+
+
+def text_nodes(markup):
+    """
+    BeautifulSoup의 텍스트 노드(NavigableString/CData)에 해당하는 문자열을 순서대로 돌려줍니다.
+    """
+    pos = 0
+    for match in _MARKUP.finditer(markup):
+        start = match.start()
+        if start > pos:
+            yield _decode(markup[pos:start], True)
+        cdata = match.group("cdata")
+        if cdata:
+            yield cdata
+        pos = match.end()
+    if pos < len(markup):
+        yield _decode(markup[pos:], False)
+
+
+def html_to_text(markup, strip=False):
+    """
+    BeautifulSoup(markup, "html.parser").get_text(strip=strip)와 같은 결과
+    """
+    if not markup:
+        return ""
+    if strip:
+        return "".join(node.strip() for node in text_nodes(markup) if node.strip())
+    return "".join(text_nodes(markup))
+
+
+def clean_text(markup):
+    return html_to_text(markup, strip=True).replace("\n", " ").replace("\r", " ")
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, wait
+from openai import OpenAI
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, LLM_SINGLE_FLIGHT, LLM_REQUEST_DEADLINE
+from services.metrics import span
+from services.redis_client import redis_client
+from services.llm_scheduler import (scheduler, set_deadline, current_priority, remaining_time,
+                                   PRIORITY_USER, LLMDeadlineExceeded)
+from services import circuit_breaker
+
+client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+
+# 동일 요청 합치기(single-flight) 설정
+SINGLE_FLIGHT_LOCK_TTL_MS = 60_000   # 대표 호출이 죽었을 때 락이 풀리는 시간
+SINGLE_FLIGHT_RESULT_TTL_MS = 5_000  # 대기 중인 다른 워커가 결과를 읽어갈 수 있는 시간
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+_inflight = {}  # 요청 키 -> Future (프로세스 내 진행 중인 호출)
+_inflight_lock = threading.Lock()
+
+
+def request_key(model, messages, params):
+    canonical = json.dumps({"model": model, "messages": messages, "params": params},
+                           ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _estimate_tokens(messages, params):
+    # 한국어 기준 대략 2글자당 1토큰 + 최대 출력 토큰
+    prompt_chars = sum(len(m.get("content", "")) for m in messages)
+    return prompt_chars // 2 + params.get("max_tokens", 256)
+
+
+def _call_upstream(model, messages, stage, params, priority=PRIORITY_USER):
+    def create(timeout):
+        # 재시도는 스케줄러가 담당하므로 SDK 자체 재시도는 끔
+        return client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+            model=model, messages=messages, **params)
+
+    # 회로가 열려 있으면 CircuitOpen으로 바로 실패 (라우트가 대체 응답으로 처리)
+    # 호출 결과는 스케줄러가 upstream 시도마다 회로 차단기에 기록
+    probe = circuit_breaker.before_call(model)
+    with span(stage, model=model, cache="miss") as s:
+        response = scheduler.call(model, create, est_tokens=_estimate_tokens(messages, params),
+                                  priority=priority, probe=probe)
+        usage = getattr(response, "usage", None)
+        if usage:
+            s.set(tokens_in=usage.prompt_tokens, tokens_out=usage.completion_tokens)
+    return response.choices[0].message.content.strip()
+
+
+def _call_after_wait(model, messages, stage, params, priority):
+    # 대표 호출을 기다리다 못 받았을 때: 마감 시간이 남았으면 직접 호출
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise LLMDeadlineExceeded(f"{model} 대표 호출 결과를 기다리는 중 요청 마감 시간이 지났습니다.")
+    return _call_upstream(model, messages, stage, params, priority)
+
+
+def _call_across_workers(key, model, messages, stage, params, priority):
+    """
+    Redis 락으로 워커 간에도 같은 요청은 한 번만 upstream으로 보냅니다.
+    락을 못 잡으면 대표 호출의 결과가 올라올 때까지(최대 락 TTL과 남은 마감 시간 중 짧은 쪽) 기다렸다가 그대로 사용합니다.
+    Redis 장애 시에는 그냥 직접 호출합니다. (대표 호출은 결과를 올리지 못해도 자기 결과를 돌려줌)
+    """
+    lock_key = f"llm:sf:lock:{key}"
+    result_key = f"llm:sf:result:{key}"
+    token = uuid.uuid4().hex
+    try:
+        acquired = redis_client.set(lock_key, token, nx=True, px=SINGLE_FLIGHT_LOCK_TTL_MS)
+    except Exception as e:
+        logging.warning(f"single-flight 락 획득 실패, 직접 호출합니다: {e}")
+        return _call_upstream(model, messages, stage, params, priority)
+
+    if acquired:
+        try:
+            result = _call_upstream(model, messages, stage, params, priority)
+            try:
+                redis_client.set(result_key, result.encode("utf-8"), px=SINGLE_FLIGHT_RESULT_TTL_MS)
+            except Exception as e:
+                # 기다리던 워커는 락이 풀리면 직접 호출함
+                logging.warning(f"single-flight 결과 공유 실패: {e}")
+            return result
+        finally:
+            try:
+                if redis_client.get(lock_key) == token.encode("utf-8"):
+                    redis_client.delete(lock_key)
+            except Exception:
+                pass
+
+    with span(stage, model=model, cache="coalesced"):
+        max_wait = SINGLE_FLIGHT_LOCK_TTL_MS / 1000
+        remaining = remaining_time()
+        if remaining is not None:
+            max_wait = min(max_wait, remaining)
+        deadline = time.monotonic() + max_wait
+        try:
+            while time.monotonic() < deadline:
+                cached, locked = redis_client.mget(result_key, lock_key)
+                if cached is not None:
+                    return cached.decode("utf-8")
+                if locked is None:
+                    # 대표 호출이 결과 없이 끝남 (실패) → 직접 호출
+                    break
+                time.sleep(max(0.0, min(SINGLE_FLIGHT_POLL_INTERVAL, deadline - time.monotonic())))
+        except Exception as e:
+            logging.warning(f"single-flight 결과 조회 실패, 직접 호출합니다: {e}")
+    return _call_after_wait(model, messages, stage, params, priority)
+
+
+def chat_completion(model, messages, stage="llm", priority=None, **params):
+    """
+    모든 라우트/서비스의 chat.completions 호출이 지나가는 공통 진입점.
+    응답 텍스트(strip)를 돌려주고, 단계별 시간과 토큰 사용량을 기록합니다.
+
+    동시에 들어온 동일한 (model, messages, params) 요청은 한 번의 upstream 호출 결과를 공유합니다.
+    (LLM_SINGLE_FLIGHT=local: 프로세스 내, redis: 워커 간까지)
+
+    실제 호출은 llm_scheduler를 거쳐 모델별 한도, 우선순위, 재시도, 요청 마감 시간을 따릅니다.
+    priority를 주지 않으면 현재 컨텍스트의 우선순위(기본: 사용자 요청)를 사용합니다.
+    """
+    if priority is None:
+        priority = current_priority()
+    if LLM_SINGLE_FLIGHT == "off":
+        return _call_upstream(model, messages, stage, params, priority)
+
+    key = request_key(model, messages, params)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        # 대표 호출(우선순위가 낮을 수도 있음)이 남은 마감 시간 안에 끝나지 않으면 직접 호출
+        # (LLMDeadlineExceeded도 TimeoutError라서 result(timeout=)의 예외로는 구분하지 않고 wait 사용)
+        with span(stage, model=model, cache="coalesced"):
+            done, _ = wait([future], timeout=remaining_time())
+        if done:
+            return future.result()
+        return _call_after_wait(model, messages, stage, params, priority)
+
+    try:
+        if LLM_SINGLE_FLIGHT == "redis":
+            result = _call_across_workers(key, model, messages, stage, params, priority)
+        else:
+            result = _call_upstream(model, messages, stage, params, priority)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def init_app(app):
+    """
+    요청마다 LLM 호출 마감 시간을 설정합니다. submit_with_context로 넘긴 스레드풀 작업에도 전파됩니다.
+    """
+    @app.before_request
+    def _set_llm_deadline():
+        set_deadline(LLM_REQUEST_DEADLINE)
@@ -0,0 +1,271 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import openai
+from config import (LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, LLM_TIMEOUT,
+                    LLM_HEDGE_ENABLED, LLM_RATE_LIMITS)
+from services.metrics import inc
+from services import circuit_breaker
+
+# 우선순위 (숫자가 작을수록 먼저)
+PRIORITY_USER = 0    # 사용자 응답 경로
+PRIORITY_BATCH = 10  # 미리 생성, 배치 작업 등
+
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError,
+                    openai.APIConnectionError, openai.InternalServerError)
+
+# 요청 단위 마감 시각 (time.monotonic 기준). 라우트 → 스레드풀 작업까지 전파됩니다.
+_deadline = contextvars.ContextVar("llm_deadline", default=None)
+# 현재 컨텍스트의 호출 우선순위 (백그라운드 작업은 PRIORITY_BATCH로 설정)
+_priority = contextvars.ContextVar("llm_priority", default=PRIORITY_USER)
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+def set_deadline(seconds):
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def set_priority(priority):
+    return _priority.set(priority)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def remaining_time():
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class TokenBucket:
+    """
+    분당 한도(rpm/tpm)를 초당 충전 속도로 바꾼 토큰 버킷.
+    reserve()는 즉시 차감하고(부채 허용) 기다려야 할 시간을 돌려줍니다.
+    """
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class PrioritySemaphore:
+    """
+    동시 호출 수 제한. 자리가 나면 우선순위가 높은(숫자가 작은) 대기자부터 들어갑니다.
+    """
+    def __init__(self, value):
+        self._value = value
+        self._waiters = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority, timeout=None):
+        with self._cond:
+            entry = (priority, next(self._counter))
+            heapq.heappush(self._waiters, entry)
+            end = None if timeout is None else time.monotonic() + timeout
+            while not (self._value > 0 and self._waiters[0] == entry):
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                    return False
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiters)
+            self._value -= 1
+            self._cond.notify_all()
+            return True
+
+    def release(self):
+        with self._cond:
+            self._value += 1
+            self._cond.notify_all()
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency, rate_limits, max_retries, hedge_enabled):
+        self.slots = PrioritySemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.hedge_enabled = hedge_enabled
+        self.request_buckets = {}
+        self.token_buckets = {}
+        for model, limits in rate_limits.items():
+            if limits.get("rpm"):
+                self.request_buckets[model] = TokenBucket(limits["rpm"])
+            if limits.get("tpm"):
+                self.token_buckets[model] = TokenBucket(limits["tpm"])
+        self.latencies = {}
+        self.latency_lock = threading.Lock()
+        self.hedge_pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-hedge") if hedge_enabled else None
+
+    def _buckets(self, model):
+        return (self.request_buckets.get(model) or self.request_buckets.get("default"),
+                self.token_buckets.get(model) or self.token_buckets.get("default"))
+
+    def _wait_for_budget(self, model, est_tokens):
+        request_bucket, token_bucket = self._buckets(model)
+        delay = 0.0
+        if request_bucket:
+            delay = max(delay, request_bucket.reserve(1))
+        if token_bucket:
+            delay = max(delay, token_bucket.reserve(est_tokens))
+        if delay <= 0:
+            return
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            if request_bucket:
+                request_bucket.refund(1)
+            if token_bucket:
+                token_bucket.refund(est_tokens)
+            raise LLMDeadlineExceeded(f"{model} 호출 한도 대기({delay:.1f}s)가 남은 시간을 초과합니다.")
+        inc("kmedi_llm_throttled_total", model=model)
+        time.sleep(delay)
+
+    def record_latency(self, model, elapsed):
+        with self.latency_lock:
+            self.latencies.setdefault(model, deque(maxlen=200)).append(elapsed)
+
+    def p95(self, model):
+        with self.latency_lock:
+            samples = sorted(self.latencies.get(model, ()))
+        if len(samples) < 20:
+            return None
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def _run_with_hedge(self, model, fn, timeout, priority):
+        threshold = self.p95(model) if self.hedge_enabled else None
+        if threshold is None or (timeout is not None and threshold >= timeout):
+            return fn(timeout)
+
+        # p95를 넘기도록 응답이 없으면 같은 요청을 하나 더 보내고 먼저 온 결과를 사용
+        primary = self.hedge_pool.submit(contextvars.copy_context().run, fn, timeout)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        # 헤지 요청도 동시 호출 수에 포함되도록 슬롯을 하나 더 잡고, 빈 슬롯이 없으면 헤지하지 않음
+        if not self.slots.acquire(priority, timeout=0):
+            inc("kmedi_llm_hedge_skipped_total", model=model)
+            return primary.result()
+        inc("kmedi_llm_hedged_total", model=model)
+        hedge_timeout = None if timeout is None else max(0.1, timeout - threshold)
+        hedged = self.hedge_pool.submit(contextvars.copy_context().run, fn, hedge_timeout)
+        self._release_when_done(primary, hedged)
+        pending = {primary, hedged}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    return f.result()
+                error = f.exception()
+        raise error
+
+    def _release_when_done(self, *futures):
+        # 헤지용 슬롯은 두 요청이 모두 끝났을 때 반환
+        # (call()이 먼저 끝난 쪽 결과로 자기 슬롯을 반환해도, 남은 요청이 도는 동안은 이 슬롯을 차지)
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.slots.release()
+
+        for f in futures:
+            f.add_done_callback(on_done)
+
+    def call(self, model, fn, est_tokens=0, priority=PRIORITY_USER, probe=False):
+        """
+        fn(timeout)을 한도/우선순위/재시도/마감 시간 규칙에 따라 실행합니다.
+        upstream 시도마다 fn 실행 시간과 결과만 모델별 회로 차단기에 기록합니다.
+        (한도/슬롯/재시도 대기와 로컬 마감 시간 초과는 OpenAI 상태와 무관하므로 회로 판단에서 제외)
+        probe=True(반열림 시험 호출)면 첫 시도 결과로 회로를 닫거나 다시 열고, 실패하면 재시도하지 않습니다.
+        """
+        attempt = 0
+        try:
+            while True:
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    raise LLMDeadlineExceeded(f"{model} 호출 전에 요청 마감 시간이 지났습니다.")
+
+                self._wait_for_budget(model, est_tokens)
+                remaining = remaining_time()
+                if not self.slots.acquire(priority, timeout=remaining):
+                    raise LLMDeadlineExceeded(f"{model} 호출 슬롯을 기다리는 중 마감 시간이 지났습니다.")
+
+                retry_after = None
+                ok = None  # 잘못된 요청 등 지연/가용성과 무관한 실패는 회로 판단에서 제외
+                started = time.monotonic()
+                try:
+                    remaining = remaining_time()
+                    timeout = LLM_TIMEOUT if remaining is None else max(0.1, min(LLM_TIMEOUT, remaining))
+                    result = self._run_with_hedge(model, fn, timeout, priority)
+                    ok = True
+                    self.record_latency(model, time.monotonic() - started)
+                    return result
+                except RETRYABLE_ERRORS as e:
+                    ok = False
+                    attempt += 1
+                    inc("kmedi_llm_retries_total", model=model, error=type(e).__name__)
+                    if probe or attempt > self.max_retries:
+                        raise
+                    response = getattr(e, "response", None)
+                    if response is not None and response.headers.get("retry-after"):
+                        try:
+                            retry_after = float(response.headers["retry-after"])
+                        except ValueError:
+                            retry_after = None
+                    logging.warning(f"{model} 호출 실패({type(e).__name__}), 재시도 {attempt}/{self.max_retries}")
+                finally:
+                    self.slots.release()
+                    circuit_breaker.record(model, time.monotonic() - started, ok, probe)
+                    probe = False
+
+                delay = retry_after if retry_after is not None else min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+                delay *= random.uniform(0.8, 1.2)
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise LLMDeadlineExceeded(f"{model} 재시도 대기({delay:.1f}s)가 남은 시간을 초과합니다.")
+                time.sleep(delay)
+        finally:
+            if probe:
+                # 시험 호출이 upstream까지 가지 못함 (로컬 한도/슬롯 대기 중 마감) → 다른 요청이 시험할 수 있게 예약만 풀어줌
+                circuit_breaker.record(model, 0.0, None, probe=True)
+
+
+scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_RATE_LIMITS, LLM_MAX_RETRIES, LLM_HEDGE_ENABLED)
@@ -0,0 +1,202 @@
+import contextvars
+import threading
+import time
+from flask import Response, request
+from config import METRICS_ENABLED, SERVER_TIMING_ENABLED
+
+# 단계별 지연 시간 히스토그램 버킷 (초)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+ENABLED = METRICS_ENABLED or SERVER_TIMING_ENABLED
+
+_lock = threading.Lock()
+_histograms = {}  # (metric, labels) -> [버킷별 count, sum, count]
+_counters = {}    # (metric, labels) -> value
+_gauges = {}      # (metric, labels) -> callable
+
+# 요청 단위 span 수집기 (Server-Timing 헤더용)
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def _label_key(labels):
+    # 라벨 값은 문자열로 맞춰서 저장 (None 등이 섞여도 /metrics 정렬이 깨지지 않도록)
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _observe(metric, labels, value):
+    key = (metric, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                entry[0][i] += 1
+        entry[1] += value
+        entry[2] += 1
+
+
+def inc(metric, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (metric, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def register_gauge(metric, func, **labels):
+    """
+    /metrics 수집 시점에 func()를 호출해서 값을 읽는 게이지를 등록합니다.
+    """
+    _gauges[(metric, _label_key(labels))] = func
+
+
+class Span:
+    __slots__ = ("stage", "labels", "started", "tokens_in", "tokens_out")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def set(self, tokens_in=None, tokens_out=None, **labels):
+        if tokens_in is not None:
+            self.tokens_in = tokens_in
+        if tokens_out is not None:
+            self.tokens_out = tokens_out
+        self.labels.update(labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        model = self.labels.get("model") or ""
+        cache = self.labels.get("cache") or ""
+        _observe("kmedi_stage_duration_seconds", (("cache", cache), ("model", model), ("stage", self.stage)), elapsed)
+        if self.tokens_in or self.tokens_out:
+            inc("kmedi_llm_tokens_total", self.tokens_in, model=model, kind="prompt")
+            inc("kmedi_llm_tokens_total", self.tokens_out, model=model, kind="completion")
+        if cache:
+            inc("kmedi_cache_requests_total", stage=self.stage, result=cache)
+        if exc_type is not None:
+            inc("kmedi_stage_errors_total", stage=self.stage, model=model)
+
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.stage, elapsed, model, cache))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage, **labels):
+    """
+    단계별 시간 측정. 비활성화 상태에서는 아무 일도 하지 않는 객체를 돌려줍니다.
+
+        with span("translate", model="gpt-4o-mini") as s:
+            ...
+            s.set(tokens_in=10, tokens_out=20, cache="miss")
+    """
+    if not ENABLED:
+        return _NOOP
+    return Span(stage, labels)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{str(v)}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        histograms = {k: ([*v[0]], v[1], v[2]) for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    seen = set()
+    for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} histogram")
+            seen.add(metric)
+        for bound, value in zip(BUCKETS, buckets):
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', bound),))} {value}")
+        lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+
+    for (metric, labels), value in sorted(counters.items()):
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} counter")
+            seen.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for (metric, labels), func in sorted(_gauges.items(), key=lambda x: x[0]):
+        if metric not in seen:
+            lines.append(f"# TYPE {metric} gauge")
+            seen.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {func()}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _server_timing_header(spans):
+    entries = []
+    counts = {}
+    for stage, elapsed, model, cache in spans:
+        counts[stage] = counts.get(stage, 0) + 1
+        name = stage if counts[stage] == 1 else f"{stage}_{counts[stage]}"
+        desc = " ".join(x for x in (model, cache) if x)
+        entry = f"{name};dur={elapsed * 1000:.1f}"
+        if desc:
+            entry += f';desc="{desc}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def init_app(app):
+    """
+    METRICS_ENABLED면 /metrics 엔드포인트와 요청 지연 히스토그램을,
+    SERVER_TIMING_ENABLED면 응답에 Server-Timing 헤더를 붙입니다.
+    둘 다 꺼져 있으면 아무 훅도 등록하지 않습니다.
+    """
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        request.environ["kmedi.started"] = time.perf_counter()
+        _request_spans.set([])
+
+    @app.after_request
+    def _finish_request_timer(response):
+        started = request.environ.get("kmedi.started")
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            route = request.url_rule.rule if request.url_rule else "unknown"
+            _observe("kmedi_http_request_duration_seconds", (("route", route), ("status", str(response.status_code))), elapsed)
+        spans = _request_spans.get()
+        if SERVER_TIMING_ENABLED and spans:
+            response.headers["Server-Timing"] = _server_timing_header(spans)
+        return response
+
+    if METRICS_ENABLED:
+        app.add_url_rule("/metrics", "metrics", lambda: Response(render_prometheus(), mimetype="text/plain; version=0.0.4"))
@@ -0,0 +1,151 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import PREFETCH_ENABLED, PREFETCH_MAX_PER_SESSION, PREFETCH_MAX_WORKERS, PREFETCH_TTL
+from services.redis_client import redis_client
+from services.metrics import inc
+from services.llm_scheduler import set_deadline, set_priority, PRIORITY_BATCH
+from services import circuit_breaker
+
+# 미리 생성(speculative prefetch) 작업
+# - 응답을 보낸 직후 다음 단계에서 쓸 생성 결과를 백그라운드에서 미리 만들어 세션 단위로 Redis에 저장
+# - 다음 라우트는 take()로 꺼내 쓰고, 없으면 평소처럼 생성 (진행 중이면 single-flight로 합쳐짐)
+# - 사용자가 다른 흐름으로 가면 cancel()로 세대 번호를 올려 진행 중인 작업을 중단
+# - 결과는 만든 언어별로 저장 (/start에서 언어를 바꾸면 이전 언어로 만든 결과를 쓰지 않음)
+
+PREFETCH_DEADLINE = 60  # 작업 하나가 LLM 호출에 쓸 수 있는 총 시간(초)
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+class PrefetchCancelled(Exception):
+    pass
+
+
+def _key(session_id, kind, item, lang):
+    return f"prefetch:{session_id}:{kind}:{(lang or 'ko').lower()}:{item}"
+
+
+def _generation(session_id):
+    value = redis_client.get(f"prefetch:{session_id}:gen")
+    return int(value) if value else 0
+
+
+def _within_session_budget(session_id):
+    # 세션당 미리 생성 횟수 제한 (비용 상한)
+    count_key = f"prefetch:{session_id}:count"
+    count = redis_client.incr(count_key)
+    if count == 1:
+        redis_client.expire(count_key, PREFETCH_TTL)
+    return count <= PREFETCH_MAX_PER_SESSION
+
+
+def schedule(session_id, kind, item, build, lang=None):
+    """
+    build(check_cancelled) -> str 을 백그라운드에서 실행하고 결과를 lang(사용자 언어)별로 저장합니다.
+    build 안에서 단계 사이마다 check_cancelled()를 호출하면 취소 시 중단됩니다.
+    """
+    global _pending
+    if not PREFETCH_ENABLED or not session_id:
+        return False
+
+    with _pending_lock:
+        if _pending >= PREFETCH_MAX_WORKERS * 2:
+            inc("kmedi_prefetch_total", kind=kind, result="skipped_busy")
+            return False
+        _pending += 1
+
+    try:
+        if not _within_session_budget(session_id):
+            inc("kmedi_prefetch_total", kind=kind, result="skipped_budget")
+            _done()
+            return False
+        generation = _generation(session_id)
+    except Exception as e:
+        logging.warning(f"미리 생성 예약 실패: {e}")
+        _done()
+        return False
+
+    # 요청 컨텍스트(마감 시간, 우선순위)를 물려받지 않도록 빈 컨텍스트에서 실행
+    _executor.submit(contextvars.Context().run, _run, session_id, kind, item, lang, build, generation)
+    return True
+
+
+def _done():
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _run(session_id, kind, item, lang, build, generation):
+    set_priority(PRIORITY_BATCH)
+    set_deadline(PREFETCH_DEADLINE)
+    circuit_breaker.track_degraded()
+
+    def check_cancelled():
+        if _generation(session_id) != generation:
+            raise PrefetchCancelled()
+
+    try:
+        check_cancelled()
+        value = build(check_cancelled)
+        check_cancelled()
+        if not isinstance(value, str):
+            raise ValueError(f"미리 생성 결과가 문자열이 아닙니다: {type(value).__name__}")
+        if circuit_breaker.degraded_reasons():
+            # 회로가 열려 대체 문구로 만든 결과는 저장하지 않음 (다음 라우트가 정상 경로로 다시 생성)
+            inc("kmedi_prefetch_total", kind=kind, result="degraded")
+            return
+        redis_client.set(_key(session_id, kind, item, lang), value.encode("utf-8"), ex=PREFETCH_TTL)
+        inc("kmedi_prefetch_total", kind=kind, result="stored")
+    except PrefetchCancelled:
+        inc("kmedi_prefetch_total", kind=kind, result="cancelled")
+    except circuit_breaker.CircuitOpen:
+        inc("kmedi_prefetch_total", kind=kind, result="circuit_open")
+    except Exception as e:
+        logging.warning(f"미리 생성 실패 ({kind}, {item}): {type(e).__name__}: {e}")
+        inc("kmedi_prefetch_total", kind=kind, result="error")
+    finally:
+        _done()
+
+
+def take(session_id, kind, item, lang=None, consume=True):
+    """
+    lang(사용자 언어)으로 저장된 미리 생성 결과를 꺼냅니다. 없으면 None.
+    """
+    if not PREFETCH_ENABLED or not session_id:
+        return None
+    key = _key(session_id, kind, item, lang)
+    try:
+        if consume:
+            pipe = redis_client.pipeline()
+            pipe.get(key)
+            pipe.delete(key)
+            value, _ = pipe.execute()
+        else:
+            value = redis_client.get(key)
+    except Exception as e:
+        logging.warning(f"미리 생성 결과 조회 실패: {e}")
+        return None
+    inc("kmedi_prefetch_lookups_total", kind=kind, result="hit" if value else "miss")
+    return value.decode("utf-8") if value else None
+
+
+def cancel(session_id):
+    """
+    해당 세션에서 진행 중인 미리 생성 작업을 모두 취소합니다. (다른 워커의 작업 포함)
+    """
+    if not PREFETCH_ENABLED or not session_id:
+        return
+    try:
+        # 다른 워커의 작업이 바로 멈추도록 요청 배치로 미루지 않고 즉시 실행 (명령 두 개는 한 번에 전송)
+        gen_key = f"prefetch:{session_id}:gen"
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(gen_key)
+        pipe.expire(gen_key, PREFETCH_TTL)
+        pipe.execute()
+    except Exception as e:
+        logging.warning(f"미리 생성 취소 실패: {e}")
@@ -0,0 +1,244 @@
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import resource
+import threading
+import time
+import tracemalloc
+import uuid
+from flask import request
+from config import (ADMIN_TOKEN, PROFILING_ENABLED, PROFILING_SAMPLE_RATE, PROFILING_MIN_MS,
+                    PROFILING_DIR, PROFILING_MAX_FILES, PROFILING_INTERVAL)
+
+# 운영 중인 워커의 요청 단위 프로파일링과 메모리 스냅샷
+# - PROFILING_ENABLED=true일 때만 요청 훅을 등록 (꺼져 있으면 훅 자체가 없어 오버헤드 없음)
+# - 대상 요청: X-Profile 헤더 + 관리자 토큰(X-Admin-Token)이 있거나, PROFILING_SAMPLE_RATE 비율로 무작위 선택
+# - pyinstrument가 설치돼 있으면 샘플링 프로파일러로 speedscope(flamegraph) JSON과 HTML을, 없으면 cProfile .prof를 저장
+#   (요청 스레드의 벽시계 시간이라 OpenAI 응답/스레드풀 결과를 기다린 시간도 그대로 보임)
+# - 프로세스 안에서는 한 번에 한 요청만 프로파일링 (다른 요청은 그대로 통과)
+# - tracemalloc은 관리자 API로 켤 때만 추적 (켜 있는 동안만 할당 비용이 듦)
+
+PROFILE_HEADER = "X-Profile"
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+_EXTENSIONS = (".speedscope.json", ".html", ".prof")
+
+_busy = threading.Lock()  # 동시에 하나만 프로파일링
+_baseline = None          # tracemalloc 비교 기준 스냅샷
+
+
+class _Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        try:
+            from pyinstrument import Profiler
+            self.kind = "pyinstrument"
+            self.profiler = Profiler(interval=PROFILING_INTERVAL)
+            self.profiler.start()
+        except ImportError:
+            self.kind = "cprofile"
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.kind == "pyinstrument":
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        return (time.perf_counter() - self.started) * 1000
+
+    def save(self, base):
+        """
+        base(확장자 없는 경로)에 결과를 저장하고 파일 이름 목록을 돌려줍니다.
+        """
+        if self.kind == "pyinstrument":
+            from pyinstrument.renderers import SpeedscopeRenderer
+            files = {f"{base}.speedscope.json": self.profiler.output(SpeedscopeRenderer()),
+                     f"{base}.html": self.profiler.output_html()}
+            for path, content in files.items():
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(content)
+            return [os.path.basename(path) for path in files]
+        self.profiler.dump_stats(f"{base}.prof")
+        return [os.path.basename(f"{base}.prof")]
+
+
+def _admin_request():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def _forced():
+    # 관리자 토큰과 함께 X-Profile을 보낸 요청만 항상 프로파일링 (PROFILING_MIN_MS 무시)
+    return bool(request.headers.get(PROFILE_HEADER)) and _admin_request()
+
+
+def _should_profile():
+    if request.blueprint == "admin" or request.endpoint in (None, "metrics", "static"):
+        return False
+    if _forced():
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def _prune():
+    names = list_profiles()
+    for entry in names[PROFILING_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILING_DIR, entry["name"]))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """
+    저장된 프로파일 목록, 최신 순
+    """
+    if not os.path.isdir(PROFILING_DIR):
+        return []
+    entries = []
+    for name in os.listdir(PROFILING_DIR):
+        if name.endswith(_EXTENSIONS):
+            stat = os.stat(os.path.join(PROFILING_DIR, name))
+            entries.append({"name": name, "bytes": stat.st_size, "created_at": stat.st_mtime})
+    entries.sort(key=lambda x: x["created_at"], reverse=True)
+    return entries
+
+
+def profile_path(name):
+    """
+    관리자 API에서 받은 이름을 PROFILING_DIR 안의 경로로 바꿉니다. 잘못된 이름이거나 없으면 None.
+    """
+    if not _PROFILE_NAME.match(name) or not name.endswith(_EXTENSIONS):
+        return None
+    path = os.path.join(PROFILING_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def profile_text(path, limit=40):
+    """
+    cProfile 결과(.prof)를 누적 시간순 표로 돌려줍니다.
+    """
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+    return out.getvalue()
+
+
+def init_app(app):
+    """
+    PROFILING_ENABLED면 요청 훅을 등록합니다. 꺼져 있으면 아무 훅도 등록하지 않습니다.
+    """
+    if not PROFILING_ENABLED:
+        return
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+
+    @app.before_request
+    def _start_profile():
+        if not _should_profile() or not _busy.acquire(blocking=False):
+            return
+        try:
+            request.environ["kmedi.profile"] = _Profile()
+        except Exception as e:
+            # 다른 프로파일러가 이미 켜져 있는 경우 등
+            _busy.release()
+            logging.warning(f"프로파일링 시작 실패: {type(e).__name__}: {e}")
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = request.environ.pop("kmedi.profile", None)
+        if profile is None:
+            return response
+        try:
+            elapsed_ms = profile.stop()
+            if _forced() or elapsed_ms >= PROFILING_MIN_MS:
+                endpoint = (request.endpoint or "unknown").replace(".", "-")
+                base = os.path.join(PROFILING_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}-{endpoint}-{elapsed_ms:.0f}ms")
+                files = profile.save(base)
+                response.headers["X-Profile-Files"] = ", ".join(files)
+                _prune()
+        except Exception as e:
+            logging.warning(f"프로파일 저장 실패: {type(e).__name__}: {e}")
+        finally:
+            _busy.release()
+        return response
+
+    @app.teardown_request
+    def _abort_profile(exc):
+        # after_request까지 가지 못한 요청의 프로파일러 정리
+        profile = request.environ.pop("kmedi.profile", None)
+        if profile is not None:
+            profile.stop()
+            _busy.release()
+
+
+def process_memory():
+    """
+    현재/최대 RSS (바이트). 현재 RSS는 /proc가 있는 리눅스에서만.
+    """
+    usage = {"peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, "rss_bytes": None}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    return usage
+
+
+def is_tracing():
+    return tracemalloc.is_tracing()
+
+
+def start_tracing(frames=1):
+    global _baseline
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _baseline = None
+
+
+def stop_tracing():
+    global _baseline
+    tracemalloc.stop()
+    _baseline = None
+
+
+def take_baseline():
+    global _baseline
+    if not tracemalloc.is_tracing():
+        return False
+    _baseline = tracemalloc.take_snapshot()
+    return True
+
+
+def tracemalloc_report(limit=25, key_type="lineno", include=None, compare=False):
+    """
+    추적 중인 할당을 key_type(filename/lineno/traceback)별로 묶어 큰 순서대로 돌려줍니다.
+    include: 경로 일부(예: "sentence_transformers", "rag_service")로 거르기. compare: 기준 스냅샷 대비 증가량.
+    """
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    if include:
+        filters.append(tracemalloc.Filter(True, f"*{include}*"))
+    snapshot = snapshot.filter_traces(filters)
+
+    if compare and _baseline is not None:
+        stats = snapshot.compare_to(_baseline.filter_traces(filters), key_type)
+        top = [{"where": str(stat.traceback), "bytes": stat.size, "bytes_diff": stat.size_diff,
+                "count": stat.count, "count_diff": stat.count_diff} for stat in stats[:limit]]
+    else:
+        stats = snapshot.statistics(key_type)
+        top = [{"where": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in stats[:limit]]
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "compared_to_baseline": bool(compare and _baseline is not None),
+        "top": top,
+    }
@@ -1,18 +1,81 @@
-from sentence_transformers import SentenceTransformer, util
-import json
 import os
-from glob import glob
-import re
+import sys
+import time
+import hashlib
 import logging
-from collections import Counter
+import threading
+from collections import defaultdict
+import numpy as np
+from services.metrics import span
+from rag.corpus_store import CorpusReader, list_corpora
+from rag.lexical_index import load_for_corpus, reciprocal_rank_fusion
+from rag import corpus_versions, embedding_store
+from config import (RAG_RETRIEVAL_MODE, RAG_LEXICAL_SHORTLIST, RAG_CORPUS_VERSIONS_DIR,
+                    RAG_EMBEDDING_DTYPE, RAG_RESCORE_CANDIDATES)
 
 # 로그 설정
 logging.basicConfig(level=logging.INFO)
 
-# 모델 로딩 (정확도 높은 검색 특화 모델)
-model = SentenceTransformer('multi-qa-mpnet-base-dot-v1')
+# 검색 모델 (정확도 높은 검색 특화 모델)
+# torch/sentence-transformers는 import만으로 수 초가 걸리므로 처음 쓸 때(또는 warm_up) 로드
+MODEL_NAME = 'multi-qa-mpnet-base-dot-v1'
 
+DEFAULT_CORPUS_DIR = 'rag/data/corpus'
+PASSAGE_EMBEDDINGS_DIR = 'passage_embeddings'  # 코퍼스 폴더 안 문단 임베딩 저장소 (rag/embedding_store.py 형식)
+
+_model = None
+_model_lock = threading.Lock()
 cached_corpus = None
+_load_lock = threading.Lock()
+
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                with span("model_load"):
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(MODEL_NAME)
+    return _model
+
+def is_ready():
+    return _model is not None and cached_corpus is not None
+
+def warm_up(background=False):
+    """
+    background=True(FAST_START): 검색 모델과 코퍼스를 백그라운드 스레드에서 미리 로드하고 바로 반환
+    background=False: 지금 스레드에서 검색 모델만 로드 (코퍼스는 첫 검색 때)
+    모델이 필요한 요청이 준비 전에 오면 get_model()에서 로드가 끝날 때까지 기다립니다.
+    """
+    def run():
+        started = time.perf_counter()
+        get_model()
+        if background:
+            try:
+                load_all_corpus()
+            except FileNotFoundError as e:
+                logging.warning(f"코퍼스 미리 로드 생략: {e}")
+        logging.info(f"검색 모델 준비 완료 ({time.perf_counter() - started:.1f}s)")
+
+    if not background:
+        run()
+        return
+    threading.Thread(target=run, name="rag-warmup", daemon=True).start()
+
+def memory_usage():
+    """
+    검색 모델 파라미터와 서비스 중인 코퍼스가 차지하는 대략적인 메모리 (바이트)
+    memory-map된 임베딩은 워커끼리 공유하는 페이지 캐시라 따로 표시합니다.
+    """
+    corpus = cached_corpus
+    embeddings = corpus["embeddings"] if corpus is not None else None
+    return {
+        "model_bytes": sum(p.numel() * p.element_size() for p in _model.parameters()) if hasattr(_model, "parameters") else 0,
+        "corpus_passages": len(corpus["contexts"]) if corpus is not None else 0,
+        "corpus_text_bytes": sum(sys.getsizeof(c) for c in corpus["contexts"]) if corpus is not None else 0,
+        "corpus_embedding_bytes": embeddings.nbytes if embeddings is not None else 0,
+        "corpus_embedding_mmap": isinstance(embeddings.vectors, np.memmap) if embeddings is not None else False,
+    }
 
 def preprocess_context(context):
     """
@@ -21,61 +84,159 @@ def preprocess_context(context):
     paragraphs = [p.strip() for p in context.split('\n') if len(p.strip().split()) >= 10]
     return paragraphs
 
-def load_all_corpus(corpus_dir='rag/data/corpus'):
+def active_corpus_dir():
+    """
+    서비스할 코퍼스 폴더: 버전 디렉터리의 CURRENT가 가리키는 버전, 없으면 기본 rag/data/corpus
+    """
+    version = corpus_versions.current_version(RAG_CORPUS_VERSIONS_DIR)
+    if version:
+        return os.path.join(corpus_versions.version_path(RAG_CORPUS_VERSIONS_DIR, version), "corpus"), version
+    return DEFAULT_CORPUS_DIR, None
+
+def passages_signature(contexts):
+    return hashlib.sha1("\x00".join(contexts).encode("utf-8")).hexdigest()
+
+def load_passage_embeddings(corpus_dir, contexts, dtype=RAG_EMBEDDING_DTYPE):
+    """
+    문단 임베딩 저장소를 memory-map으로 엽니다. (같은 파일을 여러 워커가 공유)
+    저장소가 없거나 문단/모델이 바뀌었으면 인코딩해서 저장하고, dtype만 바뀌었으면 float32 원본으로 다시 양자화합니다.
+    """
+    path = os.path.join(corpus_dir, PASSAGE_EMBEDDINGS_DIR)
+    info = {"model": MODEL_NAME, "passages": passages_signature(contexts)}
+    manifest = embedding_store.read_manifest(path)
+    if manifest is not None and all(manifest.get(k) == v for k, v in info.items()):
+        if manifest["dtype"] == dtype:
+            return embedding_store.load(path)
+        matrix = embedding_store.load_full(path)
+    else:
+        matrix = None
+
+    if matrix is None:
+        with span("passage_encode"):
+            matrix = get_model().encode([f"passage: {para}" for para in contexts], convert_to_numpy=True)
+    try:
+        embedding_store.save(path, matrix, dtype, **info)
+        return embedding_store.load(path)
+    except OSError as e:
+        # 읽기 전용 배포 등: 저장하지 못하면 이 워커 메모리에만 둠
+        logging.warning(f"문단 임베딩 저장 실패, 메모리에서만 사용합니다: {e}")
+        return embedding_store.EmbeddingStore.from_matrix(matrix, dtype, keep_full=RAG_RESCORE_CANDIDATES > 0, info=info)
+
+def build_corpus_cache(corpus_dir, version=None):
+    """
+    코퍼스의 문단, 검색 모델 임베딩 저장소, BM25 색인을 만들어 돌려줍니다. (서비스 중인 캐시는 건드리지 않음)
+    """
+    started = time.perf_counter()
+    corpus_paths = list_corpora(corpus_dir)
+    if not corpus_paths:
+        raise FileNotFoundError(f"{corpus_dir} 폴더에 corpus 파일이 없습니다. 파이프라인을 먼저 실행해주세요.")
+
+    logging.info(f"{len(corpus_paths)}개의 코퍼스를 로드 중입니다.")
+    contexts = []
+    filenames = []
+    record_passages = defaultdict(list)  # 코퍼스 레코드 번호 -> 문단 번호 목록
+    lexical_indexes = []                 # (BM25 색인, 레코드 번호 시작값)
+    offset = 0
+    for corpus_path in corpus_paths:
+        # 검색 모델 임베딩은 따로 계산하므로 메타데이터만 스트리밍으로 읽음
+        records = list(CorpusReader(corpus_path))
+        lexical_indexes.append((load_for_corpus(corpus_path, records), offset))
+        for i, item in enumerate(records):
+            filename = item.get("filename", os.path.basename(corpus_path))
+            for para in preprocess_context(item['context']):
+                record_passages[offset + i].append(len(contexts))
+                contexts.append(para)
+                filenames.append(filename)
+        offset += len(records)
+
+    embeddings = load_passage_embeddings(corpus_dir, contexts) if contexts else None
+
+    logging.info(f"총 {len(contexts)}개의 문단(context)이 로드되었습니다."
+                 + (f" (임베딩 {embeddings.dtype}, {embeddings.nbytes / 1024 ** 2:.1f}MB)" if embeddings is not None else ""))
+    return {
+        "contexts": contexts,
+        "filenames": filenames,
+        "embeddings": embeddings,
+        "record_passages": record_passages,
+        "lexical_indexes": lexical_indexes,
+        "version": version,
+        "path": corpus_dir,
+        "loaded_at": time.time(),
+        "load_seconds": round(time.perf_counter() - started, 3),
+    }
+
+def load_all_corpus(corpus_dir=None):
+    """
+    서비스 중인 코퍼스. 처음 호출될 때 active_corpus_dir()(또는 corpus_dir)에서 로드합니다.
+    """
     global cached_corpus
-    if cached_corpus is not None:
-        logging.info("코퍼스를 메모리에서 로드합니다.")
+    corpus = cached_corpus
+    if corpus is not None:
+        return corpus
+    with _load_lock:
+        if cached_corpus is None:
+            version = None
+            if corpus_dir is None:
+                corpus_dir, version = active_corpus_dir()
+            cached_corpus = build_corpus_cache(corpus_dir, version)
         return cached_corpus
 
-    corpus = []
-    file_paths = glob(os.path.join(corpus_dir, '*.json'))
-    if not file_paths:
-        raise FileNotFoundError(f"{corpus_dir} 폴더에 corpus 파일이 없습니다. 파이프라인을 먼저 실행해주세요.")
+def swap_corpus(corpus):
+    """
+    새로 만든 코퍼스로 교체하고 이전 코퍼스를 돌려줍니다.
+    요청 스레드는 load_all_corpus()로 받은 참조를 끝까지 쓰므로 교체 도중에도 일관된 코퍼스를 봅니다.
+    """
+    global cached_corpus
+    with _load_lock:
+        previous, cached_corpus = cached_corpus, corpus
+    return previous
 
-    logging.info(f"{len(file_paths)}개의 파일을 로드 중입니다.")
-    for file_path in file_paths:
-        with open(file_path, encoding='utf-8') as f:
-            data = json.load(f)
-            for item in data:
-                filename = item.get("filename", os.path.basename(file_path))
-                for para in preprocess_context(item['context']):
-                    embedding = model.encode(f"passage: {para}", convert_to_tensor=True)
-                    corpus.append({
-                        "context": para,
-                        "embedding": embedding,
-                        "filename": filename
-                    })
-
-    cached_corpus = corpus
-    logging.info(f"총 {len(corpus)}개의 문단(context)이 로드되었습니다.")
-    return corpus
-
-def extract_keywords(query, num_keywords=5):
-    words = re.findall(r'\w+', query.lower())
-    word_counts = Counter(words)
-    most_common = word_counts.most_common(num_keywords)
-    return [word for word, count in most_common]
+def lexical_search(corpus, query, top_n=None):
+    """
+    BM25 점수 순으로 정렬된 문단 번호 목록
+    """
+    hits = []
+    for index, offset in corpus["lexical_indexes"]:
+        hits.extend((offset + doc_id, score) for doc_id, score in index.search(query, top_n))
+    hits.sort(key=lambda x: x[1], reverse=True)
+    if top_n:
+        hits = hits[:top_n]
+    return [p for record_id, _ in hits for p in corpus["record_passages"].get(record_id, [])]
 
 def get_similar_contexts(query, top_k=3):
+    """
+    RAG_RETRIEVAL_MODE=hybrid: BM25(본문+요약 키워드)와 임베딩 유사도 순위를 RRF로 합쳐 상위 top_k 문단 반환.
+    코퍼스가 RAG_LEXICAL_SHORTLIST보다 크면 BM25 상위 후보에만 임베딩 점수를 계산합니다.
+    RAG_RETRIEVAL_MODE=dense: 임베딩 유사도만 사용.
+    임베딩 점수는 저장 dtype(RAG_EMBEDDING_DTYPE) 행렬에서 계산하고, 상위 RAG_RESCORE_CANDIDATES개는 float32 원본으로 다시 계산합니다.
+    """
     corpus = load_all_corpus()
-    query_keywords = extract_keywords(query)
-
-    query_embedding = model.encode(f"query: {query}", convert_to_tensor=True)
-
-    scored_contexts = []
-    for c in corpus:
-        context = c["context"]
-
-        score = util.cos_sim(query_embedding, c["embedding"]).item()
-
-        # 키워드가 몇 개 포함됐는지에 따른 점수 보정 (비율 기반)
-        keyword_matches = sum(1 for kw in query_keywords if kw in context.lower())
-        match_ratio = keyword_matches / len(query_keywords) if query_keywords else 0
-        score += 0.05 * match_ratio  # 가중치 강화
-
-        scored_contexts.append((score, context, c["filename"]))
-
-    top_contexts = sorted(scored_contexts, key=lambda x: x[0], reverse=True)[:top_k]
+    if not corpus["contexts"]:
+        return []
+
+    hybrid = RAG_RETRIEVAL_MODE == "hybrid"
+    lexical_ranking = []
+    candidates = None
+    if hybrid:
+        with span("lexical_search"):
+            lexical_ranking = lexical_search(corpus, query, RAG_LEXICAL_SHORTLIST or None)
+        if RAG_LEXICAL_SHORTLIST and len(corpus["contexts"]) > RAG_LEXICAL_SHORTLIST and len(lexical_ranking) >= top_k:
+            candidates = np.array(sorted(set(lexical_ranking)))
+
+    with span("embedding_encode"):
+        query_embedding = get_model().encode(f"query: {query}", convert_to_numpy=True)
+
+    with span("vector_scoring"):
+        passage_ids, scores = corpus["embeddings"].search(query_embedding, candidates, RAG_RESCORE_CANDIDATES)
+        dense_ranking = passage_ids.tolist()
+        dense_scores = dict(zip(dense_ranking, scores.tolist()))
+
+    if hybrid:
+        fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking])
+        ranked = sorted(fused.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    else:
+        ranked = [(i, dense_scores[i]) for i in dense_ranking[:top_k]]
+    top_contexts = [(score, corpus["contexts"][i], corpus["filenames"][i]) for i, score in ranked]
 
     for idx, (score, context, filename) in enumerate(top_contexts):
         preview = context.strip().replace("\n", " ")[:100]
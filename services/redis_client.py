@@ -0,0 +1,10 @@
+import redis
+from config import REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
+
+# 세션, 캐시, 분산 락 등에서 공유하는 Redis 클라이언트 (app.redis 와 같은 객체)
+redis_client = redis.StrictRedis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
+    password=REDIS_PASSWORD,
+    decode_responses = False
+)
@@ -0,0 +1,156 @@
+import json
+import logging
+import random
+import time
+import uuid
+import numpy as np
+from config import (SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL,
+                    SEMANTIC_CACHE_MAX_PER_SCOPE, SEMANTIC_CACHE_SAMPLE_RATE)
+from services.redis_client import redis_client
+from services.session_store import write_batch
+from services.metrics import inc, span
+from services import rag_service
+
+# /start 자유 질문 답변의 의미 기반 캐시
+# - 질문을 rag_service의 검색 모델로 임베딩하고, 같은 (언어, 약 이름) 범위에서
+#   이전에 답한 질문 중 코사인 유사도가 SEMANTIC_CACHE_THRESHOLD 이상인 가장 가까운 답변을 재사용
+# - 항목마다 TTL이 있고, 범위별 목록은 만료 시각을 점수로 한 sorted set으로 관리
+# - 적중/미스 횟수와 적중(및 아깝게 빗나간) 사례 표본을 Redis에 남겨 임계값 튜닝에 사용
+
+ENTRY_PREFIX = "semcache:entry:"
+SCOPE_PREFIX = "semcache:scope:v2:"  # v2: 답변을 사용자 언어로 저장 (이전에는 한국어 원문)
+STATS_KEY = "semcache:stats"
+SAMPLES_KEY = "semcache:samples"
+MAX_SAMPLES = 500
+NEAR_MISS_MARGIN = 0.05  # 임계값보다 이만큼 낮은 유사도까지는 표본으로 남김
+
+
+def _scope_key(lang, medicine):
+    return f"{SCOPE_PREFIX}{lang or 'ko'}:{medicine.strip().lower()}"
+
+
+def embed(query):
+    vector = rag_service.get_model().encode(f"query: {query}", convert_to_numpy=True).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _sample(kind, query, lang, medicine, similarity, matched):
+    if random.random() >= SEMANTIC_CACHE_SAMPLE_RATE:
+        return
+    sample = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "query": query,
+        "matched_query": matched.get("query"),
+        "answer": matched.get("answer"),
+        "lang": lang,
+        "medicine": medicine,
+        "similarity": round(similarity, 4),
+        "threshold": SEMANTIC_CACHE_THRESHOLD,
+        "time": int(time.time()),
+    }
+    with write_batch() as pipe:
+        pipe.lpush(SAMPLES_KEY, json.dumps(sample, ensure_ascii=False).encode("utf-8"))
+        pipe.ltrim(SAMPLES_KEY, 0, MAX_SAMPLES - 1)
+
+
+def lookup(query, lang, medicine):
+    """
+    (캐시된 답변 또는 None, 질문 임베딩)을 돌려줍니다. 캐시를 쓰지 않는 경우 (None, None).
+    """
+    if not SEMANTIC_CACHE_ENABLED or not isinstance(medicine, str):
+        return None, None
+    try:
+        with span("semantic_cache_lookup"):
+            embedding = embed(query)
+            scope_key = _scope_key(lang, medicine)
+            redis_client.zremrangebyscore(scope_key, "-inf", time.time())
+            entry_ids = redis_client.zrange(scope_key, 0, -1)
+            raw_entries = redis_client.mget([ENTRY_PREFIX + i.decode("utf-8") for i in entry_ids]) if entry_ids else []
+            entries = [json.loads(raw) for raw in raw_entries if raw]
+
+            best, best_similarity = None, -1.0
+            if entries:
+                matrix = np.array([e["embedding"] for e in entries], dtype=np.float32)
+                similarities = matrix @ embedding
+                i = int(np.argmax(similarities))
+                best, best_similarity = entries[i], float(similarities[i])
+    except Exception as e:
+        logging.warning(f"의미 캐시 조회 실패: {e}")
+        return None, None
+
+    hit = best is not None and best_similarity >= SEMANTIC_CACHE_THRESHOLD
+    result = "hit" if hit else "miss"
+    inc("kmedi_semantic_cache_total", result=result)
+    try:
+        with write_batch() as pipe:
+            pipe.hincrby(STATS_KEY, result, 1)
+        if best is not None and best_similarity >= SEMANTIC_CACHE_THRESHOLD - NEAR_MISS_MARGIN:
+            _sample(result if hit else "near_miss", query, lang, medicine, best_similarity, best)
+    except Exception as e:
+        logging.warning(f"의미 캐시 통계 기록 실패: {e}")
+    return (best["answer"] if hit else None), embedding
+
+
+def store(query, lang, medicine, embedding, answer):
+    if embedding is None or not answer:
+        return
+    entry_id = uuid.uuid4().hex
+    scope_key = _scope_key(lang, medicine)
+    entry = {"query": query, "answer": answer, "embedding": embedding.tolist()}
+    try:
+        with write_batch() as pipe:
+            pipe.set(ENTRY_PREFIX + entry_id, json.dumps(entry, ensure_ascii=False).encode("utf-8"), ex=SEMANTIC_CACHE_TTL)
+            pipe.zadd(scope_key, {entry_id: time.time() + SEMANTIC_CACHE_TTL})
+            # 범위당 항목 수 상한: 가장 먼저 만료될 항목부터 제거
+            pipe.zremrangebyrank(scope_key, 0, -SEMANTIC_CACHE_MAX_PER_SCOPE - 1)
+            pipe.expire(scope_key, SEMANTIC_CACHE_TTL)
+    except Exception as e:
+        logging.warning(f"의미 캐시 저장 실패: {e}")
+
+
+def stats():
+    raw = {k.decode("utf-8"): int(v) for k, v in redis_client.hgetall(STATS_KEY).items()}
+    hits, misses = raw.get("hit", 0), raw.get("miss", 0)
+    reviewed, false_hits = raw.get("reviewed", 0), raw.get("false_hit", 0)
+    return {
+        "enabled": SEMANTIC_CACHE_ENABLED,
+        "threshold": SEMANTIC_CACHE_THRESHOLD,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "reviewed_hits": reviewed,
+        "false_hits": false_hits,
+        "false_hit_rate": round(false_hits / reviewed, 4) if reviewed else None,
+    }
+
+
+def samples(limit=100):
+    return [json.loads(raw) for raw in redis_client.lrange(SAMPLES_KEY, 0, limit - 1)]
+
+
+def review_sample(sample_id, false_hit):
+    """
+    적중 표본을 사람이 검토한 결과를 기록합니다. 해당 표본이 없으면 False.
+    """
+    for i, raw in enumerate(redis_client.lrange(SAMPLES_KEY, 0, -1)):
+        sample = json.loads(raw)
+        if sample["id"] != sample_id:
+            continue
+        if sample["kind"] == "hit" and "false_hit" not in sample:
+            redis_client.hincrby(STATS_KEY, "reviewed", 1)
+            if false_hit:
+                redis_client.hincrby(STATS_KEY, "false_hit", 1)
+        sample["false_hit"] = bool(false_hit)
+        redis_client.lset(SAMPLES_KEY, i, json.dumps(sample, ensure_ascii=False).encode("utf-8"))
+        return True
+    return False
+
+
+def clear():
+    count = 0
+    for key in redis_client.scan_iter(match="semcache:*", count=500):
+        redis_client.delete(key)
+        count += 1
+    return count
@@ -0,0 +1,226 @@
+import json
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+import msgpack
+from flask import g, has_request_context
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from config import SESSION_TTL
+from services.redis_client import redis_client
+from services.metrics import inc
+
+# Redis 세션 저장소 (Flask-Session 대체)
+# - 세션 값은 짧은 키 이름(KEY_ALIASES) + msgpack으로 저장
+# - 요청이 끝날 때 직렬화 결과를 읽어 온 원본과 비교해 실제로 바뀐 경우에만 SET
+#   (같은 값을 다시 넣거나 바꾸지 않은 요청은 쓰기 없음, 남은 TTL이 절반 아래일 때만 PEXPIRE로 연장)
+# - 열 때는 GET + PTTL을 한 번의 왕복으로 읽음
+# - write_batch(): 캐시/통계처럼 같은 요청 안에서 다시 읽지 않는 쓰기를 모아 두었다가
+#   세션 저장과 함께 파이프라인 한 번으로 실행 (요청 밖이거나 이미 저장한 뒤면 바로 실행)
+
+KEY_PREFIX = "sess:"
+LEGACY_KEY_PREFIX = "session:"  # Flask-Session 시절 키. 새 키가 없을 때 한 번 읽어서 옮김
+SID_BYTES = 32
+
+# 세션 키 -> 저장용 짧은 이름 (목록에 없는 키는 그대로 저장)
+KEY_ALIASES = {
+    "session_id": "i",
+    "retry_count": "r",
+    "name_to_select": "n",
+    "language": "l",
+    "symptoms_ko": "s",
+    "results": "m",
+    "combined_name": "c",
+}
+_KEY_NAMES = {alias: name for name, alias in KEY_ALIASES.items()}
+
+
+def unpack_legacy(raw):
+    """
+    Flask-Session 값을 dict로 읽습니다. 0.8은 SESSION_SERIALIZER와 관계없이 msgpack으로 저장하고,
+    더 오래된 설정의 JSON 값도 읽습니다. (pickle로 저장된 값은 역직렬화 위험 때문에 읽지 않음)
+    """
+    try:
+        data = msgpack.unpackb(raw, raw=False)
+    except Exception:
+        data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError(f"dict가 아닌 세션 값입니다: {type(data).__name__}")
+    data.pop("_permanent", None)
+    return data
+
+
+def pack(data):
+    return msgpack.packb({KEY_ALIASES.get(k, k): v for k, v in data.items()}, use_bin_type=True)
+
+
+def unpack(raw):
+    return {_KEY_NAMES.get(k, k): v for k, v in msgpack.unpackb(raw, raw=False).items()}
+
+
+class RedisSession(CallbackDict, SessionMixin):
+    def __init__(self, sid, data=None, raw=None, pttl=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data or {}, on_update)
+        self.sid = sid
+        self.raw = raw    # 읽어 온 직렬화 값 (변경 여부 비교용)
+        self.pttl = pttl  # 읽을 때 남아 있던 TTL(ms)
+        self.new = new
+        self.modified = False
+
+
+class _RequestBatch:
+    def __init__(self):
+        self.pipe = redis_client.pipeline(transaction=False)
+        self.lock = threading.Lock()
+        self.closed = False
+
+
+def _request_batch():
+    if not has_request_context():
+        return None
+    batch = g.get("_redis_batch")
+    if batch is None:
+        batch = g._redis_batch = _RequestBatch()
+    return batch
+
+
+@contextmanager
+def write_batch():
+    """
+    요청이 끝날 때 세션 저장과 함께 실행할 Redis 파이프라인을 돌려줍니다.
+
+        with write_batch() as pipe:
+            pipe.hincrby(...)
+
+    요청 밖(백그라운드 스레드 등)이거나 세션을 이미 저장한 뒤면 블록이 끝날 때 바로 실행합니다.
+    같은 요청 안에서 곧바로 다시 읽어야 하는 쓰기에는 쓰지 마세요.
+    """
+    batch = _request_batch()
+    if batch is not None:
+        with batch.lock:
+            if not batch.closed:
+                yield batch.pipe
+                return
+    pipe = redis_client.pipeline(transaction=False)
+    yield pipe
+    pipe.execute()
+
+
+def _take_batch():
+    batch = g.pop("_redis_batch", None) if has_request_context() else None
+    if batch is None:
+        return None
+    with batch.lock:
+        batch.closed = True
+    return batch.pipe
+
+
+def flush_batch():
+    """
+    아직 실행하지 않은 요청 배치를 실행합니다. (세션 저장 없이 끝난 요청용)
+    """
+    pipe = _take_batch()
+    if pipe is not None and len(pipe):
+        try:
+            pipe.execute()
+        except Exception as e:
+            logging.warning(f"Redis 요청 배치 실행 실패: {e}")
+
+
+class RedisSessionInterface(SessionInterface):
+    def _key(self, sid):
+        return KEY_PREFIX + sid
+
+    def _load_legacy(self, sid):
+        raw = redis_client.get(LEGACY_KEY_PREFIX + sid)
+        if not raw:
+            return None
+        try:
+            return unpack_legacy(raw)
+        except Exception as e:
+            inc("kmedi_session_ops_total", op="legacy_unreadable")
+            logging.warning(f"이전 세션 값을 읽지 못해 새 세션으로 시작합니다: {type(e).__name__}: {e}")
+            return None
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > 128:
+            return RedisSession(secrets.token_urlsafe(SID_BYTES), new=True)
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.get(self._key(sid))
+            pipe.pttl(self._key(sid))
+            raw, pttl = pipe.execute()
+            if raw:
+                return RedisSession(sid, unpack(raw), raw, pttl)
+            legacy = self._load_legacy(sid)
+            if legacy:
+                session = RedisSession(sid, legacy)
+                session.modified = True
+                inc("kmedi_session_ops_total", op="migrate")
+                return session
+        except Exception as e:
+            logging.warning(f"세션 읽기 실패: {type(e).__name__}: {e}")
+        # 만료됐거나 처음 보는 세션 ID는 새 ID로 시작 (클라이언트가 고른 ID를 쓰지 않음)
+        return RedisSession(secrets.token_urlsafe(SID_BYTES), new=True)
+
+    def save_session(self, app, session, response):
+        pipe = _take_batch()
+        if session.accessed:
+            response.vary.add("Cookie")
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        ttl_ms = SESSION_TTL * 1000
+
+        write = cookie = False
+        if not session:
+            if not session.new and (session.raw or session.modified):
+                pipe = redis_client.pipeline(transaction=False) if pipe is None else pipe
+                pipe.delete(self._key(session.sid))
+                response.delete_cookie(name, domain=domain, path=path)
+                inc("kmedi_session_ops_total", op="delete")
+        else:
+            packed = pack(session)
+            pipe = redis_client.pipeline(transaction=False) if pipe is None else pipe
+            if packed != session.raw:
+                pipe.set(self._key(session.sid), packed, px=ttl_ms)
+                write = True
+                cookie = session.new
+                inc("kmedi_session_ops_total", op="write")
+            elif session.pttl is not None and session.pttl < ttl_ms // 2:
+                pipe.pexpire(self._key(session.sid), ttl_ms)
+                inc("kmedi_session_ops_total", op="touch")
+            else:
+                inc("kmedi_session_ops_total", op="skip")
+
+        if pipe is not None and len(pipe):
+            try:
+                pipe.execute()
+            except Exception as e:
+                logging.warning(f"세션/요청 배치 저장 실패: {type(e).__name__}: {e}")
+                if write:
+                    raise
+
+        if cookie:
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def init_app(app):
+    app.session_interface = RedisSessionInterface()
+
+    @app.teardown_request
+    def _flush_request_batch(exc):
+        flush_batch()
@@ -1,11 +1,8 @@
 import re
-from bs4 import BeautifulSoup
+import contextvars
 import numpy as np
 import tiktoken
-
-
-def clean_text(html):
-    return BeautifulSoup(html or "", "html.parser").get_text(strip=True).replace("\n", " ").replace("\r", " ")
+from services.html_text import clean_text  # BeautifulSoup get_text(strip=True)와 같은 결과의 경량 추출기
 
 # 소프트맥스 with temperature
 def softmax_with_temperature(weights, temperature):
@@ -14,6 +11,10 @@ def softmax_with_temperature(weights, temperature):
     exp_scaled = np.exp(scaled - np.max(scaled))
     return exp_scaled / np.sum(exp_scaled)
 
+# 현재 컨텍스트(요청 단위 계측 정보 등)를 유지한 채로 스레드풀에 작업 제출
+def submit_with_context(executor, fn, *args, **kwargs):
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
 def trim_to_token_limit(text, max_tokens, model="gpt-3.5-turbo"):
     enc = tiktoken.encoding_for_model(model)
     tokens = enc.encode(text)
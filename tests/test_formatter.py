@@ -0,0 +1,31 @@
+import pytest
+
+from services import formatter
+
+
+def bold_dosage(text):
+    return formatter._DOSAGE.sub(lambda m: f"**{m.group(0)}**", text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Take 2 glasses of water", "Take 2 glasses of water"),
+    ("5번째 날", "5번째 날"),
+    ("3회째 복용", "3회째 복용"),
+    ("1회 1~2정을 드세요", "**1회 1~2정**을 드세요"),
+    ("1일 3회, 500밀리그램", "**1일 3회**, **500밀리그램**"),
+    ("하루 4그램을 넘기지 마세요", "**하루 4그램**을 넘기지 마세요"),
+    ("0.5 mL를 드세요", "**0.5 mL**를 드세요"),
+    ("Take 2 tablets daily", "Take **2 tablets** daily"),
+    ("1回2錠", "**1回2錠**"),
+])
+def test_dosage_units_need_a_boundary(text, expected):
+    assert bold_dosage(text) == expected
+
+
+def test_split_sentences_keeps_abbreviations():
+    text = "Take with food, e.g. milk. Do not exceed 3 tablets, i.e. 900 mg. 1회 0.5 mL를 드세요."
+    assert formatter.split_sentences(text) == [
+        "Take with food, e.g. milk.",
+        "Do not exceed 3 tablets, i.e. 900 mg.",
+        "1회 0.5 mL를 드세요.",
+    ]
@@ -0,0 +1,79 @@
+import json
+
+import fakeredis
+import pytest
+from flask import Flask, session
+
+from services import session_store
+
+flask_session = pytest.importorskip("flask_session")
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(session_store, "redis_client", client)
+    return client
+
+
+def legacy_app(redis):
+    # 배포 전 app.py 설정 그대로 (Flask-Session 0.8은 SESSION_SERIALIZER를 무시하고 msgpack으로 저장)
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY="test", SESSION_TYPE="redis", SESSION_REDIS=redis,
+                      SESSION_PERMANENT=False, SESSION_USE_SIGNER=False, SESSION_SERIALIZER="json")
+    flask_session.Session(app)
+
+    @app.route("/write")
+    def write():
+        session["language"] = "en"
+        session["symptoms_ko"] = ["두통", "발열"]
+        session["retry_count"] = 2
+        return "ok"
+
+    return app
+
+
+def new_app():
+    app = Flask(__name__)
+    app.secret_key = "test"
+    session_store.init_app(app)
+
+    @app.route("/read")
+    def read():
+        return {"language": session.get("language"), "symptoms_ko": session.get("symptoms_ko"),
+                "retry_count": session.get("retry_count")}
+
+    return app
+
+
+def test_migrates_flask_session_08_payload(redis):
+    legacy = legacy_app(redis).test_client()
+    legacy.get("/write")
+    sid = legacy.get_cookie("session").value
+    raw = redis.get(session_store.LEGACY_KEY_PREFIX + sid)
+    with pytest.raises(UnicodeDecodeError):
+        json.loads(raw)
+
+    client = new_app().test_client()
+    client.set_cookie("session", sid)
+    response = client.get("/read")
+
+    assert response.json == {"language": "en", "symptoms_ko": ["두통", "발열"], "retry_count": 2}
+    assert session_store.unpack(redis.get(session_store.KEY_PREFIX + sid))["language"] == "en"
+
+
+def test_migrates_json_payload(redis):
+    redis.set(session_store.LEGACY_KEY_PREFIX + "old-json",
+              json.dumps({"_permanent": True, "language": "ja"}).encode("utf-8"))
+    client = new_app().test_client()
+    client.set_cookie("session", "old-json")
+
+    assert client.get("/read").json["language"] == "ja"
+
+
+def test_unreadable_legacy_payload_starts_new_session(redis):
+    redis.set(session_store.LEGACY_KEY_PREFIX + "old-pickle", b"\x80\x04\x95\x00garbage")
+    client = new_app().test_client()
+    client.set_cookie("session", "old-pickle")
+
+    assert client.get("/read").json["language"] is None